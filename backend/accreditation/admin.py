@@ -1,11 +1,7 @@
 from django.contrib import admin
 from .models import (
-    DataProcess,
-    FacultyCI,
-    ProgramCI,
-    AssessValidity,
-    AccredReport,
-    AnnualReport
+    Submission,
+    StudentResult,
 )
 
 # Register models with custom admin displays
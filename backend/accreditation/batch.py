@@ -0,0 +1,305 @@
+"""
+End-of-term batch uploads: a ZIP of assessment spreadsheets plus a manifest giving each file's form fields.
+
+The manifest is either a separate file or manifest.csv / manifest.json at the root of the archive.
+A CSV manifest has a header row; a JSON manifest is a list of objects. Each entry names its
+spreadsheet in a "file" column and carries the fields the multi-step form submits, under either
+the form field names (program, term, prog_term, ...) or the form's POST names (academicTerm, ...).
+
+Uploads from the web are stored as batch UploadJobs and processed by the `manage.py process_uploads`
+worker; `manage.py batch_upload` processes an archive directly. Spreadsheets are parsed in a process
+pool, fed a few members at a time; the parsed files are then stored one by one with bulk_upload_data()
+in the calling process, so each file succeeds or fails on its own and re-uploads are handled exactly
+as for single uploads.
+"""
+
+import csv
+import io
+import json
+import logging
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.utils import timezone
+
+from .database import bulk_upload_data
+from .models import Faculty, UploadJob
+from .utils import UnsupportedFileType, get_cohorts, parse_student_file, upload_form
+
+MANIFEST_NAMES = ("manifest.csv", "manifest.json")
+SPREADSHEET_SUFFIXES = (".csv", ".xlsx")
+
+# Guards against oversized and zip-bomb archives
+MAX_BATCH_FILES = 500
+MAX_BATCH_BYTES = 512 * 1024 * 1024
+
+# Files read from the archive and waiting in, or being parsed by, the pool per worker process
+FILES_IN_FLIGHT_PER_WORKER = 2
+
+logger = logging.getLogger(__name__)
+
+
+class BatchUploadError(ValueError):
+    """Raised when the archive or manifest as a whole cannot be used; nothing has been stored."""
+
+
+def read_manifest(name, data):
+    """Return the manifest entries as a list of dicts from CSV or JSON bytes."""
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise BatchUploadError("The manifest must be UTF-8 text.")
+    if name.lower().endswith(".json"):
+        try:
+            entries = json.loads(text)
+        except ValueError as e:
+            raise BatchUploadError(f"Manifest is not valid JSON: {e}")
+        if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+            raise BatchUploadError("A JSON manifest must be a list of objects.")
+    elif name.lower().endswith(".csv"):
+        entries = list(csv.DictReader(io.StringIO(text)))
+    else:
+        raise BatchUploadError("The manifest must be a .csv or .json file.")
+
+    if not entries:
+        raise BatchUploadError("The manifest lists no files.")
+    for number, entry in enumerate(entries, start=1):
+        if not str(entry.get("file") or "").strip():
+            raise BatchUploadError(f"Manifest entry {number} has no file name.")
+    return entries
+
+
+def open_archive(archive):
+    """Open a ZIP given as a path or file object and return (zipfile, {member name: ZipInfo}) for its spreadsheets."""
+    try:
+        zip_file = zipfile.ZipFile(archive)
+    except zipfile.BadZipFile:
+        raise BatchUploadError("The uploaded file is not a ZIP archive.")
+
+    members = {}
+    for info in zip_file.infolist():
+        path = PurePosixPath(info.filename)
+        if info.is_dir() or path.name.startswith(".") or "__MACOSX" in path.parts:
+            continue
+        members[info.filename] = info
+    if len(members) > MAX_BATCH_FILES:
+        raise BatchUploadError(f"The archive holds more than {MAX_BATCH_FILES} files.")
+    if sum(info.file_size for info in members.values()) > MAX_BATCH_BYTES:
+        raise BatchUploadError(f"The archive expands to more than {MAX_BATCH_BYTES // (1024 * 1024)} MB.")
+    return zip_file, members
+
+
+def load_manifest(zip_file, members, manifest=None):
+    """
+    Return the manifest entries for an open archive, removing any manifest.csv / manifest.json from members.
+    `manifest` is a (name, bytes) pair or a list of entries already read; without it the archive's own is used.
+    """
+    manifest_member = next((name for name in members if PurePosixPath(name).name.lower() in MANIFEST_NAMES), None)
+    if manifest_member is not None:
+        del members[manifest_member]
+    if manifest is None:
+        if manifest_member is None:
+            raise BatchUploadError("No manifest given and no manifest.csv or manifest.json in the archive.")
+        manifest = (manifest_member, zip_file.read(manifest_member))
+    return manifest if isinstance(manifest, list) else read_manifest(*manifest)
+
+
+def check_batch(archive, manifest=None):
+    """
+    Check an archive and its manifest without reading any spreadsheet and return the manifest entries.
+    Raises BatchUploadError as process_batch() would; the archive is left open at its start.
+    """
+    zip_file, members = open_archive(archive)
+    with zip_file:
+        entries = load_manifest(zip_file, members, manifest)
+    if hasattr(archive, "seek"):
+        archive.seek(0)
+    return entries
+
+
+def find_member(members, file_name):
+    """Match a manifest file name to an archive member, by full path or, failing that, by unique base name."""
+    if file_name in members:
+        return file_name
+    matches = [name for name in members if PurePosixPath(name).name == PurePosixPath(file_name).name]
+    return matches[0] if len(matches) == 1 else None
+
+
+def file_result(file_name, status, message, **extra):
+    return {"file": file_name, "status": status, "message": message, "rows": 0, "inserted": 0, "updated": 0,
+            "unchanged": 0, "submission_id": None, "form_errors": {}, "row_errors": [], **extra}
+
+
+def store_file(file_name, form, records):
+    """Store one parsed file and describe the outcome as a summary entry."""
+    if not records:
+        return file_result(file_name, "failed", "No valid student data found in file")
+
+    report = bulk_upload_data(records, **form)
+    counts = {key: report[key] for key in ("inserted", "updated", "unchanged", "submission_id")}
+    if not report["success"]:
+        return file_result(file_name, "failed", "Upload rejected, no data was saved for this file.",
+                           rows=len(records), form_errors=report["form_errors"], row_errors=report["row_errors"],
+                           **counts)
+    if report["duplicate"]:
+        return file_result(file_name, "duplicate", "Already uploaded; nothing was changed.", rows=len(records),
+                           **counts)
+    if report["updated"] or report["unchanged"]:
+        return file_result(file_name, "updated", "Existing assessment updated.", rows=len(records), **counts)
+    return file_result(file_name, "inserted", "Data saved successfully!", rows=len(records), **counts)
+
+
+def parse_files(pending, workers):
+    """
+    Yield (entry, records or exception) for each (entry, member name, read) in pending, in order,
+    where read() returns the member's bytes. Files are parsed in a pool of `workers` processes; a
+    single worker or file is parsed in-process. Each member is read only when it is handed to the
+    pool, at most FILES_IN_FLIGHT_PER_WORKER per process ahead of the results being consumed.
+    """
+    if workers <= 1 or len(pending) <= 1:
+        for entry, name, read in pending:
+            try:
+                yield entry, parse_student_file(name, read())
+            except Exception as e:
+                yield entry, e
+        return
+
+    def finished(entry, future):
+        try:
+            return entry, future.result()
+        except Exception as e:
+            return entry, e
+
+    workers = min(workers, len(pending))
+    in_flight = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for entry, name, read in pending:
+            if len(in_flight) >= workers * FILES_IN_FLIGHT_PER_WORKER:
+                yield finished(*in_flight.popleft())
+            try:
+                in_flight.append((entry, pool.submit(parse_student_file, name, read())))
+            except Exception as e:
+                # An unreadable member fails on its own once the files queued before it are done
+                while in_flight:
+                    yield finished(*in_flight.popleft())
+                yield entry, e
+        while in_flight:
+            yield finished(*in_flight.popleft())
+
+
+def process_batch(archive, manifest=None, user=None, workers=None, progress=None):
+    """
+    Store every spreadsheet listed in the manifest of a ZIP batch upload and return a summary report:
+    {"success", "files", "succeeded", "failed", "inserted", "updated", "unchanged", "results", "unlisted"},
+    where results holds one entry per manifest row, in manifest order, and unlisted names archive files
+    that the manifest does not mention.
+
+    `archive` is a path or file object; `manifest` is an optional (name, bytes) pair or list of entries,
+    otherwise the manifest is read from the archive. `progress`, if given, is called with the number of
+    manifest entries done and the rows inserted so far after each file is stored. Raises BatchUploadError
+    if the archive or manifest is unusable.
+    """
+    if workers is None:
+        workers = getattr(settings, "BATCH_UPLOAD_WORKERS", None) or os.cpu_count() or 1
+
+    zip_file, members = open_archive(archive)
+    with zip_file:
+        entries = load_manifest(zip_file, members, manifest)
+
+        results = [None] * len(entries)
+        pending = []
+        listed = set()
+        for index, entry in enumerate(entries):
+            file_name = str(entry["file"]).strip()
+            member = find_member(members, file_name)
+            if member is None:
+                results[index] = file_result(file_name, "failed", "File not found in the archive")
+                continue
+            listed.add(member)
+            if not member.lower().endswith(SPREADSHEET_SUFFIXES):
+                results[index] = file_result(file_name, "failed",
+                                             "Unsupported file type. Please upload a .csv or .xlsx file.")
+                continue
+            try:
+                form = upload_form(entry)
+            except (TypeError, ValueError) as e:
+                results[index] = file_result(file_name, "failed", f"Invalid form fields in manifest: {e}")
+                continue
+            pending.append(((index, file_name, form), member, partial(zip_file.read, member)))
+
+        # The files of a batch share a few (term, prog_term) pairs, so cohorts come from one lookup pass.
+        # If any pair is invalid, bulk_upload_data() derives and rejects each file's cohort itself.
+        forms = [form for (_, _, form), _, _ in pending]
+        try:
+            cohorts = get_cohorts([form["prog_term"] for form in forms], [form["term"] for form in forms])
+        except (TypeError, ValueError):
+            cohorts = [None] * len(forms)
+        for form, cohort in zip(forms, cohorts):
+            form["cohort"] = cohort
+
+        # Files are stored as their parses complete, each in its own transaction
+        done = len(entries) - len(pending)
+        for (index, file_name, form), parsed in parse_files(pending, workers):
+            if isinstance(parsed, UnsupportedFileType):
+                results[index] = file_result(file_name, "failed", str(parsed))
+            elif isinstance(parsed, Exception):
+                results[index] = file_result(file_name, "failed", f"Error reading file: {parsed}"[:500])
+            else:
+                results[index] = store_file(file_name, form, parsed)
+            done += 1
+            if progress is not None:
+                progress(done, sum(result["inserted"] for result in results if result is not None))
+
+    succeeded = [result for result in results if result["status"] != "failed"]
+    if user is not None and succeeded:
+        Faculty.objects.filter(user=user).update(last_uploaded=timezone.now())
+
+    return {
+        "success": len(succeeded) == len(results),
+        "files": len(results),
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "inserted": sum(result["inserted"] for result in results),
+        "updated": sum(result["updated"] for result in results),
+        "unchanged": sum(result["unchanged"] for result in results),
+        "results": results,
+        "unlisted": sorted(name for name in members if name not in listed),
+    }
+
+
+def run_batch_job(job):
+    """
+    Store the archive of a claimed batch UploadJob with process_batch(), recording progress in its
+    processed_rows / inserted_rows (counted in files and rows) and the summary report in job.report.
+    """
+    def progress(done, inserted):
+        UploadJob.objects.filter(pk=job.pk).update(processed_rows=done, inserted_rows=inserted)
+
+    try:
+        with job.file.open("rb") as archive:
+            report = process_batch(archive, manifest=job.form["manifest"], user=job.user, progress=progress)
+        job.report = report
+        job.total_rows = job.processed_rows = report["files"]
+        job.inserted_rows = report["inserted"]
+        job.status = UploadJob.SUCCEEDED if report["success"] else UploadJob.FAILED
+        job.message = (f"{report['succeeded']} of {report['files']} files stored: {report['inserted']} rows inserted, "
+                       f"{report['updated']} updated, {report['unchanged']} unchanged.")
+        if not report["success"]:
+            job.message += " Files that failed were not saved; correct them and upload them again."
+    except BatchUploadError as e:
+        job.status = UploadJob.FAILED
+        job.message = str(e)
+    except Exception as e:
+        logger.exception("Batch upload job %s failed", job.pk)
+        job.status = UploadJob.FAILED
+        job.message = f"Error saving data: {str(e)}"[:500]
+
+    job.finished_at = timezone.now()
+    job.file.delete(save=False)
+    job.save()
+    return job
@@ -0,0 +1,5 @@
+"""
+Performance benchmarks for the accreditation app.
+
+Run them with `python manage.py run_benchmarks`; see that command for options.
+"""
@@ -0,0 +1,104 @@
+"""
+Synthetic upload generator for benchmarks.
+
+Produces realistic form submissions spread across programs, terms, GAs and GAIs,
+with a recurring pool of students so per-student lookups return several rows.
+"""
+
+import io
+import random
+
+import openpyxl
+
+from ..models import (
+    ALIGNMENT_CHOICES,
+    ASSESSMENT_TYPE_CHOICES,
+    GAI_CHOICES,
+    PROGRAM_CHOICES,
+)
+from ..utils import FIRST_DATA_ROW
+
+PROGRAMS = [code for code, _ in PROGRAM_CHOICES]
+GAIS = [code for code, _ in GAI_CHOICES]
+ASSESSMENT_TYPES = [code for code, _ in ASSESSMENT_TYPE_CHOICES]
+ALIGNMENTS = [code for code, _ in ALIGNMENT_CHOICES]
+INSTRUCTIONAL_LEVELS = ["Introductory", "Intermediate Development", "Advanced Application"]
+TERMS = [f"{year}{term}" for year in range(2021, 2026) for term in (10, 20, 30)]
+FIRST_NAMES = ["Alex", "Jordan", "Sam", "Taylor", "Morgan", "Casey", "Riley", "Jamie"]
+LAST_NAMES = ["Chen", "Singh", "Martin", "Nguyen", "Brown", "Wilson", "Tremblay", "Roy"]
+
+# Average number of uploads each student appears in
+UPLOADS_PER_STUDENT = 20
+
+
+def student_ids(total_rows):
+    """Return the pool of student IDs that total_rows results are drawn from."""
+    return [f"A{number:08d}" for number in range(max(total_rows // UPLOADS_PER_STUDENT, 1))]
+
+
+def generate_form(rng):
+    """Return one upload's form fields, as accepted by bulk_upload_data()."""
+    program = rng.choice(PROGRAMS)
+    gai = rng.choice(GAIS)
+    question_max = rng.randint(5, 30)
+    return {
+        "program": program,
+        "course": f"{program} {rng.randint(1000, 4999)}",
+        "term": rng.choice(TERMS),
+        "prog_term": rng.randint(1, 8),
+        "instr_first_name": rng.choice(FIRST_NAMES),
+        "instr_last_name": rng.choice(LAST_NAMES),
+        "ga": f"GA{gai.split('.')[0]}",
+        "gai": gai,
+        "instr_level": rng.choice(INSTRUCTIONAL_LEVELS),
+        "alignment": rng.choice(ALIGNMENTS),
+        "clos": f"CLO{rng.randint(1, 9)}",
+        "assess_type": rng.choice(ASSESSMENT_TYPES),
+        "assess_weight": float(rng.randint(5, 40)),
+        "assess_max": rng.randint(question_max, 100),
+        "total_score": float(rng.randint(question_max, 100)),
+        "question_max": question_max,
+        "assess_title": f"Assessment {rng.randint(1, 9)}",
+        "assess_descript": "Synthetic assessment generated for benchmarking",
+        "quest_text": "Questions mapped to the graduate attribute indicator",
+        "instr_comments": "Generated by the benchmark data generator. " * rng.randint(1, 10),
+    }
+
+
+def generate_records(rng, students, size, question_max):
+    """Return size (student_id, gai_score) pairs with distinct students."""
+    # Scores are whole points, matching what the spreadsheet reader accepts
+    return [(student_id, float(rng.randint(1, question_max)))
+            for student_id in rng.sample(students, min(size, len(students)))]
+
+
+def generate_uploads(total_rows, seed=0, class_sizes=(20, 120)):
+    """
+    Yield (form, records) uploads until total_rows student results have been produced.
+    The same seed always yields the same data.
+    """
+    rng = random.Random(seed)
+    students = student_ids(total_rows)
+    produced = 0
+    while produced < total_rows:
+        form = generate_form(rng)
+        size = min(rng.randint(*class_sizes), total_rows - produced)
+        records = generate_records(rng, students, size, form["question_max"])
+        produced += len(records)
+        yield form, records
+
+
+def build_workbook(records):
+    """Return an in-memory XLSX laid out like the student assessment template."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["Assessment Data"])
+    ws.append(["", "Student ID", "GAI Points Achieved"])
+    for _ in range(FIRST_DATA_ROW - 3):
+        ws.append([])
+    for number, (student_id, gai_score) in enumerate(records, start=1):
+        ws.append([number, student_id, gai_score])
+    output = io.BytesIO()
+    wb.save(output)
+    output.seek(0)
+    return output
@@ -0,0 +1,145 @@
+"""
+Timed benchmark scenarios.
+
+Each scenario is a callable taking a BenchmarkContext; the runner times it and counts its queries.
+"""
+
+import random
+from dataclasses import dataclass, field
+
+from django.contrib.auth.models import User
+from django.test import Client
+from django.urls import reverse
+
+from ..database import (
+    UploadJobDAO,
+    bulk_upload_data,
+    get_flattened_data,
+    get_flattened_page,
+    upload_data,
+)
+from ..models import Faculty
+from ..utils import UPLOAD_FORM_FIELDS
+from .generator import build_workbook, generate_form, generate_records, student_ids
+
+# POST field names read by form_submit_view, keyed by bulk_upload_data() argument
+FORM_FIELD_NAMES = {field: post_name for field, post_name, _ in UPLOAD_FORM_FIELDS}
+
+# Students per upload in the ingestion scenarios
+UPLOAD_SIZE = 120
+
+
+@dataclass
+class BenchmarkContext:
+    """State shared by the scenarios of one dataset size."""
+    rows: int
+    seed: int = 0
+    client: Client = None
+    rng: random.Random = field(default=None)
+
+    def __post_init__(self):
+        self.rng = random.Random(self.seed)
+        user, _ = User.objects.get_or_create(username="benchmark", defaults={"is_superuser": True, "is_staff": True})
+        Faculty.objects.get_or_create(user=user)
+        self.client = Client()
+        self.client.force_login(user)
+        self.students = student_ids(self.rows)
+
+    def get(self, name, *args, **params):
+        response = self.client.get(reverse(name, args=args), params)
+        if response.status_code != 200:
+            raise RuntimeError(f"{name} returned {response.status_code}")
+        return response
+
+
+def upload_single_rows(ctx):
+    form = generate_form(ctx.rng)
+    for student_id, gai_score in generate_records(ctx.rng, ctx.students, UPLOAD_SIZE, form["question_max"]):
+        upload_data(student_id=student_id, gai_score=gai_score, **form)
+
+
+def upload_bulk(ctx):
+    form = generate_form(ctx.rng)
+    bulk_upload_data(generate_records(ctx.rng, ctx.students, UPLOAD_SIZE, form["question_max"]), **form)
+
+
+def form_submit(ctx):
+    form = generate_form(ctx.rng)
+    workbook = build_workbook(generate_records(ctx.rng, ctx.students, UPLOAD_SIZE, form["question_max"]))
+    workbook.name = "benchmark.xlsx"
+    data = {FORM_FIELD_NAMES[key]: value for key, value in form.items()}
+    response = ctx.client.post(reverse("form_submit"), {**data, "csv_file": workbook})
+    if not response.json().get("success"):
+        raise RuntimeError(f"form_submit failed: {response.json()}")
+    # Include the worker's share so the scenario still covers the whole upload
+    job = UploadJobDAO.run(UploadJobDAO.claim_next())
+    if job.status != job.SUCCEEDED:
+        raise RuntimeError(f"upload job failed: {job.message}")
+
+
+def flattened_data(ctx):
+    get_flattened_data()
+
+
+def api_first_page(ctx):
+    ctx.get("api_data", "data_process", page=1, page_size=10)
+
+
+def api_deep_page(ctx):
+    total_pages = max(ctx.rows // 100, 1)
+    ctx.get("api_data", "data_process", page=total_pages, page_size=100)
+
+
+def api_sorted_page(ctx):
+    ctx.get("api_data", "data_process", page=5, page_size=50, sort_by="student_id", sort_order="desc")
+
+
+def api_cursor_walk(ctx):
+    """Follow next_cursor through ten pages."""
+    cursor = get_flattened_page(page_size=50, sort_by="course")["next_cursor"]
+    for _ in range(10):
+        if not cursor:
+            break
+        cursor = ctx.get("api_data", "data_process", page_size=50, sort_by="course",
+                         after=cursor).json()["pagination"]["next_cursor"]
+
+
+def student_search(ctx):
+    ctx.get("api_student_search", student_id=ctx.rng.choice(ctx.students))
+
+
+def student_prefix_search(ctx):
+    ctx.get("api_student_search", student_id=ctx.rng.choice(ctx.students)[:7], match="prefix")
+
+
+def export_csv(ctx):
+    response = ctx.get("export", format="csv")
+    for _ in response.streaming_content:
+        pass
+
+
+def export_xlsx(ctx):
+    response = ctx.get("export")
+    for _ in response.streaming_content:
+        pass
+
+
+# Scenarios in run order; uploads come last so they do not change the data the reads see
+SCENARIOS = {
+    "get_flattened_data": flattened_data,
+    "api_data.first_page": api_first_page,
+    "api_data.deep_page": api_deep_page,
+    "api_data.sorted_page": api_sorted_page,
+    "api_data.cursor_walk": api_cursor_walk,
+    "student_search.exact": student_search,
+    "student_search.prefix": student_prefix_search,
+    "export.csv": export_csv,
+    "export.xlsx": export_xlsx,
+    "upload_data.120_rows": upload_single_rows,
+    "bulk_upload_data.120_rows": upload_bulk,
+    "form_submit_view.120_rows": form_submit,
+}
+
+# Scenarios that read every row; skipped above this many rows unless asked for explicitly
+FULL_SCAN_SCENARIOS = {"get_flattened_data", "export.csv", "export.xlsx"}
+FULL_SCAN_LIMIT = 100000
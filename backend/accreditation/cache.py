@@ -0,0 +1,121 @@
+"""
+Versioned caching of read results.
+
+Cache keys include the current DataVersion, which every write bumps inside its own transaction.
+A write therefore invalidates every cached result at once, in every worker process, without
+deleting anything: old entries are never read again and age out through the backend's eviction.
+
+The same version doubles as the HTTP validator of the read APIs (see data_version_condition).
+"""
+
+import functools
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import F
+from django.db.models.functions import Now
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .models import DataVersion
+
+# Cache alias holding read results (see settings.CACHES)
+RESULT_CACHE_ALIAS = "results"
+
+# The one DataVersion row
+DATA_VERSION_PK = 1
+
+
+def get_data_version():
+    """Return the current data version (one indexed single-row query)."""
+    return DataVersion.objects.filter(pk=DATA_VERSION_PK).values_list("version", flat=True).first() or 0
+
+
+def get_data_state():
+    """Return (version, last_rewrite) of the data, both 0 before the first write."""
+    return DataVersion.objects.filter(pk=DATA_VERSION_PK).values_list("version", "last_rewrite").first() or (0, 0)
+
+
+def bump_data_version(rewrite=False):
+    """
+    Invalidate every cached result. Call inside the transaction that writes the data,
+    so readers only see the new version once the write is visible.
+    Pass rewrite=True when stored rows were changed or deleted rather than only added.
+
+    Returns the new version. The update locks the row until the transaction ends, so versions
+    become visible in the order they were handed out and can stamp the rows being written.
+    """
+    # update() skips auto_now, so updated_at (the Last-Modified of the read APIs) is set explicitly
+    changes = {"version": F("version") + 1, "updated_at": Now()}
+    if rewrite:
+        changes["last_rewrite"] = F("version") + 1
+    if not DataVersion.objects.filter(pk=DATA_VERSION_PK).update(**changes):
+        DataVersion.objects.get_or_create(pk=DATA_VERSION_PK, defaults={"version": 1, "last_rewrite": int(rewrite)})
+    return get_data_version()
+
+
+def cache_key(name, version, args, kwargs):
+    arguments = repr((args, sorted(kwargs.items())))
+    digest = hashlib.sha1(arguments.encode()).hexdigest()
+    return f"accreditation:{name}:v{version}:{digest}"
+
+
+def versioned_cache(name):
+    """
+    Decorator caching a read function's result per data version and arguments.
+    Calls inside a transaction bypass the cache, since they may see writes that are later rolled back.
+    The undecorated function stays available as .uncached.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if connection.in_atomic_block:
+                return func(*args, **kwargs)
+            cache = caches[RESULT_CACHE_ALIAS]
+            key = cache_key(name, get_data_version(), args, kwargs)
+            result = cache.get(key)
+            if result is None:
+                result = func(*args, **kwargs)
+                cache.set(key, result, getattr(settings, "RESULT_CACHE_TIMEOUT", 300))
+            return result
+
+        wrapper.uncached = func
+        return wrapper
+
+    return decorator
+
+
+def data_version_validators(request):
+    """Return (version, updated_at) of the data, read once per request and kept on it."""
+    if not hasattr(request, "_data_validators"):
+        request._data_validators = (DataVersion.objects.filter(pk=DATA_VERSION_PK)
+                                    .values_list("version", "updated_at").first() or (0, None))
+    return request._data_validators
+
+
+def data_version_condition(view):
+    """
+    Decorator for read APIs whose response depends only on the request and the stored data.
+    Sends an ETag built from the data version and a Last-Modified of its last write, and answers
+    If-None-Match / If-Modified-Since with 304 before the view runs. Responses are marked
+    private and no-cache, so browsers revalidate every poll instead of reusing stale data.
+    """
+    conditional = condition(
+        etag_func=lambda request, *args, **kwargs: f'"data-v{data_version_validators(request)[0]}"',
+        last_modified_func=lambda request, *args, **kwargs: data_version_validators(request)[1],
+    )(view)
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = conditional(request, *args, **kwargs)
+        if response.status_code >= 400:
+            # Only successful responses may be revalidated
+            for header in ("ETag", "Last-Modified"):
+                if header in response:
+                    del response[header]
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    return wrapper
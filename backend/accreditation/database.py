@@ -3,15 +3,33 @@ This module houses the classes and methods to interact with the database.
 """
 
 from .models import (
-    DataProcess,
-    FacultyCI,
-    ProgramCI,
-    AssessValidity,
-    AccredReport,
-    AnnualReport,
+    Submission,
+    StudentResult,
+    Faculty,
+    GAIAchievementSummary,
+    UploadJob,
+    ResultTombstone,
+    StudentGAIProfile,
+    ACHIEVEMENT_THRESHOLDS,
 )
 from .utils import *
+from .cache import bump_data_version, get_data_version, versioned_cache
+from .validation import validate_result_rows
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from contextlib import contextmanager
+from itertools import islice
+import base64
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
 
 def upload_data(program: str,
                 course: str,
@@ -35,104 +53,599 @@ def upload_data(program: str,
                 quest_text: str,
                 student_id: str,
                 instr_comments: str):
+    """
+    Store a single student's result as its own submission. Returns the bulk_upload_data() report.
+    """
+    return bulk_upload_data([(student_id, gai_score)], program=program, course=course, term=term,
+                            prog_term=prog_term, instr_first_name=instr_first_name,
+                            instr_last_name=instr_last_name, ga=ga, gai=gai, instr_level=instr_level,
+                            alignment=alignment, clos=clos, assess_type=assess_type,
+                            assess_weight=assess_weight, assess_max=assess_max, total_score=total_score,
+                            question_max=question_max, assess_title=assess_title,
+                            assess_descript=assess_descript, quest_text=quest_text,
+                            instr_comments=instr_comments)
+
+
+# Rows written per INSERT statement by bulk_upload_data()
+BULK_BATCH_SIZE = 1000
+
+
+def bulk_upload_data(records, **form):
+    """
+    Store one upload as a Submission header plus one StudentResult per student, in a single transaction.
+
+    `records` is an iterable of (student_id, gai_score) pairs and `form` takes the same
+    keyword arguments as upload_data() minus student_id and gai_score. The shared form
+    fields are validated once; each student row is then checked only for its own columns.
+    Nothing is written unless every row is valid. `form` may also carry the cohort, precomputed
+    with get_cohorts() by batch callers; otherwise it is derived from prog_term and term.
+
+    Uploads are idempotent: an upload with the same fingerprint as a stored one writes nothing
+    (report["duplicate"] is True), and an upload for an assessment that already exists
+    (same SUBMISSION_NATURAL_KEY) only writes the header fields and student rows that changed.
+
+    Returns a report dict: {"success", "inserted", "updated", "unchanged", "duplicate", "submission_id",
+    "form_errors", "row_errors"}, where row_errors is a list of {"row", "student_id", "errors"}
+    with 1-based row numbers.
+    """
+    report = {"success": False, "inserted": 0, "updated": 0, "unchanged": 0, "duplicate": False,
+              "submission_id": None, "form_errors": {}, "row_errors": []}
+
     try:
-        cohort = get_cohort(prog_term, term)
-        #achievement_level = round(get_achievement_level(gai_score, question_max), 2)
-        from decimal import Decimal
-
-        achievement_level = Decimal(str(round(get_achievement_level(gai_score, question_max), 2)))
-
-
-        dp_result = DataProcessDAO.insert(term=term, program=program, course=course, gai=gai)
-        if isinstance(dp_result, dict) and not dp_result.get("success", True):
-            print("DataProcess insert failed:", dp_result["errors"])
-
-        fc_result = FacultyCIDAO.insert(course=course, term=term, instr_first_name=instr_first_name,
-                                        instr_last_name=instr_last_name, assess_title=assess_title,
-                                        gai_score=gai_score, total_score=total_score, cohort=cohort)
-        if isinstance(fc_result, dict) and not fc_result.get("success", True):
-            print("FacultyCI insert failed:", fc_result["errors"])
-
-        pc_result = ProgramCIDAO.insert(term=term, ga=ga, gai=gai, prog_term=prog_term, gai_score=gai_score, total_score=total_score,
-                                        achievement_level=achievement_level, cohort=cohort)
-        if isinstance(pc_result, dict) and not pc_result.get("success", True):
-            print("ProgramCI insert failed:", pc_result["errors"])
-
-        av_result = AssessValidityDAO.insert(gai=gai, ga=ga, course=course, question_max=question_max,
-                                             alignment=alignment, gai_score=gai_score, total_score=total_score,
-                                             assess_max=assess_max, assess_weight=assess_weight,
-                                             assess_descript=assess_descript, clos=clos)
-        if isinstance(av_result, dict) and not av_result.get("success", True):
-            print("AssessValidity insert failed:", av_result["errors"])
-
-        ar_result = AccredReportDAO.insert(program=program, term=term, ga=ga, gai=gai, assess_type=assess_type,
-                                           quest_text=quest_text, alignment=alignment, instr_level=instr_level,
-                                           achievement_level=achievement_level, student_id=student_id)
-        if isinstance(ar_result, dict) and not ar_result.get("success", True):
-            print("AccredReport insert failed:", ar_result["errors"])
-
-        anr_result = AnnualReportDAO.insert(program=program, term=term, course=course, ga=ga, gai=gai,
-                                            student_id=student_id, achievement_level=achievement_level,
-                                            assess_type=assess_type, instr_comments=instr_comments)
-        if isinstance(anr_result, dict) and not anr_result.get("success", True):
-            print("AnnualReport insert failed:", anr_result["errors"])
-
-    except Exception as e:
-        print("Unexpected error in upload_data():", str(e))
+        cohort = form.pop("cohort", None) or get_cohort(form["prog_term"], form["term"])
+    except (KeyError, TypeError, ValueError) as e:
+        report["form_errors"]["prog_term"] = [str(e)]
+        return report
+    if not form.get("question_max"):
+        report["form_errors"]["question_max"] = ["Maximum question score cannot be zero."]
+        return report
 
-def get_flattened_data():
-    ids = DataProcess.objects.values_list('id', flat=True).order_by('-id')
+    # Validate the shared columns once, on the header
+    submission = Submission(cohort=cohort, **form)
+    try:
+        submission.full_clean()
+    except ValidationError as e:
+        report["form_errors"] = e.message_dict
+        return report
+
+    # Per-row columns are checked for the whole upload at once
+    rows, report["row_errors"] = validate_result_rows(records, submission.question_max)
+    if report["row_errors"]:
+        return report
+
+    submission.fingerprint = upload_fingerprint(form, [(student_id, gai_score) for student_id, gai_score, _ in rows])
+    report["success"] = True
+
+    try:
+        store_submission(submission, rows, report)
+    except IntegrityError:
+        # A concurrent upload of the same assessment committed first (see the Submission unique
+        # constraints); the retry finds it and stores this upload as a re-upload of it
+        submission.pk = None
+        submission._state.adding = True
+        store_submission(submission, rows, report)
+    return report
+
+
+def store_submission(submission, rows, report):
+    """
+    Write a validated upload for bulk_upload_data(): acknowledge a duplicate, merge it into the
+    existing assessment, or insert it. Fills in report; raises IntegrityError if a concurrent
+    upload inserted the same assessment first, after rolling back its own writes.
+    """
+    with transaction.atomic():
+        # Identical re-uploads are acknowledged without writing anything
+        duplicate = Submission.objects.filter(fingerprint=submission.fingerprint).values_list("id", flat=True).first()
+        if duplicate is not None:
+            report["duplicate"] = True
+            report["unchanged"] = len(rows)
+            report["submission_id"] = duplicate
+            return
+
+        # A corrected upload of an existing assessment updates it in place
+        existing = (Submission.objects.select_for_update()
+                    .filter(**{field: getattr(submission, field) for field in SUBMISSION_NATURAL_KEY})
+                    .order_by("-id").first())
+        if existing is not None:
+            report.update(upsert_results(existing, submission, rows))
+            report["submission_id"] = existing.id
+            return
+
+        if not rows:
+            return
+        version = bump_data_version()
+        submission.save()
+        StudentResult.objects.bulk_create(
+            [StudentResult(submission=submission, student_id=student_id, gai_score=gai_score,
+                           achievement_level=achievement_level, data_version=version)
+             for student_id, gai_score, achievement_level in rows],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        GAISummaryDAO.apply(submission.program, submission.term, submission.ga, submission.gai,
+                            [achievement_level for _, _, achievement_level in rows])
+        StudentProfileDAO.refresh_submission(submission, [student_id for student_id, _, _ in rows])
+
+    report["inserted"] = len(rows)
+    report["submission_id"] = submission.id
+
+
+# Submission columns identifying an assessment across re-uploads; with student_id they key a StudentResult.
+# Each instructor's section of a course is its own assessment. Must match unique_submission_natural_key.
+SUBMISSION_NATURAL_KEY = ("program", "course", "term", "prog_term", "instr_last_name", "instr_first_name", "gai",
+                          "assess_title")
+
+
+def upsert_results(existing, submission, rows):
+    """
+    Merge a re-upload into an existing Submission: update header fields that changed, update the
+    StudentResult rows whose score changed and insert students that are new. Students missing from
+    the re-upload are kept; if question_max changed, their achievement levels are recomputed.
+    Must run inside a transaction; returns inserted/updated/unchanged counts. A re-upload that changes
+    nothing but the stored fingerprint records it without bumping the data version.
+    """
+    # Every re-upload that is not a duplicate has a new fingerprint; it is not data, so it is not a change
+    fields = [field.name for field in Submission._meta.concrete_fields
+              if field.name not in ("id", "created_at", "fingerprint")]
+    fingerprint_changed = existing.fingerprint != submission.fingerprint
+    existing.fingerprint = submission.fingerprint
+    previous_key = {field: getattr(existing, field) for field in SUMMARY_KEY_FIELDS}
+    changed_fields = [field for field in fields if getattr(existing, field) != getattr(submission, field)]
+    for field in changed_fields:
+        setattr(existing, field, getattr(submission, field))
+    key_changed = any(getattr(existing, field) != value for field, value in previous_key.items())
+
+    # Existing rows per student, oldest first, so repeated IDs pair up in file order
+    current = {}
+    for result in existing.results.order_by("id"):
+        current.setdefault(result.student_id, []).append(result)
+    old_levels = [result.achievement_level for results in current.values() for result in results]
+
+    created, updated, removed_levels, added_levels = [], [], [], []
+    unchanged = 0
+    for student_id, gai_score, achievement_level in rows:
+        matches = current.get(student_id)
+        if not matches:
+            created.append(StudentResult(submission=existing, student_id=student_id, gai_score=gai_score,
+                                         achievement_level=achievement_level))
+            added_levels.append(achievement_level)
+            continue
+        result = matches.pop(0)
+        if result.gai_score == gai_score and result.achievement_level == achievement_level:
+            unchanged += 1
+            continue
+        removed_levels.append(result.achievement_level)
+        added_levels.append(achievement_level)
+        result.gai_score, result.achievement_level = gai_score, achievement_level
+        updated.append(result)
+
+    if "question_max" in changed_fields:
+        # Levels of the students missing from the re-upload were computed against the old maximum
+        missing = [result for results in current.values() for result in results]
+        levels = levels_to_decimals(
+            get_achievement_levels([float(result.gai_score) for result in missing], existing.question_max))
+        for result, achievement_level in zip(missing, levels):
+            if result.achievement_level != achievement_level:
+                removed_levels.append(result.achievement_level)
+                added_levels.append(achievement_level)
+                result.achievement_level = achievement_level
+                updated.append(result)
+
+    if not (changed_fields or updated or created):
+        if fingerprint_changed:
+            # No read returns the fingerprint, so cached results stay valid
+            existing.save(update_fields=["fingerprint"])
+        return {"inserted": 0, "updated": 0, "unchanged": unchanged}
+
+    # Header columns that appear in the submission's rows; only a change to one of them changes every row
+    row_fields_changed = [field for field in changed_fields if field in SUBMISSION_FIELDS]
+
+    # Students that are only added leave the stored rows as they were, so it is not a rewrite
+    version = bump_data_version(rewrite=bool(row_fields_changed or updated))
+    for result in (*updated, *created):
+        result.data_version = version
+    if changed_fields or fingerprint_changed:
+        existing.save(update_fields=[*changed_fields, "fingerprint"])
+    if row_fields_changed:
+        existing.results.update(data_version=version)
+    StudentResult.objects.bulk_update(updated, ["gai_score", "achievement_level", "data_version"],
+                                      batch_size=BULK_BATCH_SIZE)
+    StudentResult.objects.bulk_create(created, batch_size=BULK_BATCH_SIZE)
+
+    if key_changed:
+        # Re-file every result of the submission under its new summary key
+        GAISummaryDAO.apply(levels=old_levels, sign=-1, **previous_key)
+        GAISummaryDAO.apply_results(existing, existing.results.values_list("achievement_level", flat=True))
+        StudentProfileDAO.refresh_submission(existing, list(current), key=previous_key)
+        StudentProfileDAO.refresh_submission(existing)
+    else:
+        GAISummaryDAO.apply_results(existing, removed_levels, sign=-1)
+        GAISummaryDAO.apply_results(existing, added_levels)
+        StudentProfileDAO.refresh_submission(existing, [result.student_id for result in (*updated, *created)])
+
+    return {"inserted": len(created), "updated": len(updated), "unchanged": unchanged}
+
+
+# Column order of a flattened submission row, as consumed by the admin views
+FLATTENED_FIELDS = [
+    "id", "program", "course", "term", "prog_term", "instr_first_name", "instr_last_name",
+    "ga", "gai", "instr_level", "alignment", "clos", "assess_type", "assess_weight",
+    "assess_max", "total_score", "question_max", "gai_score", "assess_title",
+    "assess_descript", "quest_text", "student_id", "instr_comments",
+]
+
+# Columns that can be requested, sorted and filtered on besides the flattened ones
+EXTRA_FIELDS = ["cohort", "achievement_level"]
+
+# Columns stored on StudentResult; every other column comes from its Submission
+RESULT_FIELDS = ("id", "student_id", "gai_score", "achievement_level")
+SUBMISSION_FIELDS = tuple(field for field in FLATTENED_FIELDS + EXTRA_FIELDS if field not in RESULT_FIELDS)
+
+# ORM path from StudentResult to each column
+FIELD_PATHS = {field: field if field in RESULT_FIELDS else f"submission__{field}"
+               for field in FLATTENED_FIELDS + EXTRA_FIELDS}
+
+# Columns of each admin table view, named after the original per-report tables
+TABLE_FIELDS = {
+    "all": FLATTENED_FIELDS,
+    "data_process": ["id", "term", "program", "course", "gai"],
+    "faculty_ci": ["id", "course", "term", "instr_first_name", "instr_last_name", "assess_title", "gai_score",
+                   "total_score", "cohort"],
+    "program_ci": ["id", "term", "ga", "gai", "gai_score", "total_score", "achievement_level", "cohort", "prog_term"],
+    "assess_validity": ["id", "gai", "ga", "course", "question_max", "alignment", "gai_score", "total_score",
+                        "assess_max", "assess_weight", "assess_descript", "clos"],
+    "accred_report": ["id", "program", "term", "ga", "gai", "assess_type", "quest_text", "alignment", "instr_level",
+                      "achievement_level", "student_id"],
+    "annual_report": ["id", "program", "term", "course", "ga", "gai", "student_id", "achievement_level",
+                      "assess_type", "instr_comments"],
+}
+
+# Low-cardinality columns that to_columnar() sends dictionary-encoded
+DICTIONARY_FIELDS = ("program", "term", "ga", "gai", "cohort", "instr_level", "alignment", "assess_type")
+
+# Response formats of the data and change feed APIs: one dict per row, or to_columnar()
+RESPONSE_FORMATS = ("rows", "columnar")
+
+# Number of ids hydrated per batch of queries
+FLATTEN_CHUNK_SIZE = 2000
+
+
+def hydrate_rows(ids, fields=FLATTENED_FIELDS):
+    """
+    Build rows of the given columns (flattened ones by default) for StudentResult ids, preserving their order.
+    Each chunk of ids costs one query for the results and one for any submissions not yet seen.
+    """
+    ids = list(ids)
     results = []
+    submissions = {}
+    result_fields = [field for field in RESULT_FIELDS if field == "id" or field in fields]
+    submission_fields = [field for field in SUBMISSION_FIELDS if field in fields]
+
+    for start in range(0, len(ids), FLATTEN_CHUNK_SIZE):
+        chunk = ids[start:start + FLATTEN_CHUNK_SIZE]
+        found = {values["id"]: values for values in
+                 StudentResult.objects.filter(id__in=chunk).values("submission_id", *result_fields)}
+
+        missing = {values["submission_id"] for values in found.values()} - submissions.keys()
+        if missing:
+            for values in Submission.objects.filter(id__in=missing).values("id", *submission_fields):
+                submissions[values.pop("id")] = values
+
+        for id in chunk:
+            result = found.get(id)
+            if result is not None:
+                row = {**result, **submissions[result["submission_id"]]}
+                results.append({field: row[field] for field in fields})
+
+    return results
+
+
+def to_columnar(rows, fields):
+    """
+    Convert hydrated rows to {"columns": {field: [values]}, "dictionaries": {field: [distinct values]}},
+    naming each column once instead of once per row. DICTIONARY_FIELDS columns hold indexes into
+    their dictionary; decimals are sent as JSON numbers rather than strings.
+    """
+    columns, dictionaries = {}, {}
+    for field in fields:
+        values = [row[field] for row in rows]
+        if field in DICTIONARY_FIELDS:
+            codes = {}
+            columns[field] = [codes.setdefault(value, len(codes)) for value in values]
+            dictionaries[field] = list(codes)
+        else:
+            columns[field] = [float(value) if isinstance(value, Decimal) else value for value in values]
+    return {"columns": columns, "dictionaries": dictionaries}
+
+
+def get_flattened_data():
+    """
+    Return every student result flattened with its submission fields, newest first.
+    """
+    ids = StudentResult.objects.values_list('id', flat=True).order_by('-id')
+    return hydrate_rows(ids)
+
+# Sortable flattened columns are the keys of FIELD_PATHS
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(value, id, offset):
+    """
+    Encode the sort value and id of the last row on a page, and the number of rows up to and
+    including it, as an opaque cursor string.
+    """
+    if value is not None and not isinstance(value, (int, str)):
+        value = str(value)
+    raw = json.dumps([value, id, offset]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor() into (value, id, offset). Raises ValueError if it is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, id, offset = json.loads(raw)
+        return value, int(id), max(int(offset), 0)
+    except Exception:
+        raise ValueError("Invalid cursor.")
+
+
+@versioned_cache("flattened_count")
+def count_flattened(filters=None):
+    """
+    Return the number of rows matching filters. Cached apart from the pages, so paging through
+    the same filters counts once per data version.
+    """
+    return StudentResult.objects.filter(flattened_filter(filters or {})).count()
+
+
+@versioned_cache("flattened_page")
+def get_flattened_page(page=1, page_size=10, sort_by="id", sort_order="asc", after=None, filters=None,
+                       fields=FLATTENED_FIELDS):
+    """
+    Return one page of rows, filtered, sorted and sliced in SQL.
+
+    `filters` is a dict as returned by parse_filters() and `fields` picks the returned columns
+    (see TABLE_FIELDS). Pages are addressed either by page number (OFFSET) or, when `after` is
+    given, by the keyset cursor returned as `next_cursor` on the previous page, which stays
+    O(page_size) however deep the page is. `offset` is the number of rows before the page; cursor
+    pages carry it in the cursor, so it does not follow rows written since the first page.
+    Raises ValueError for a malformed cursor.
+    """
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+    page = max(1, int(page))
+    if sort_by not in FIELD_PATHS:
+        sort_by = "id"
+    descending = sort_order == "desc"
 
-    for id in ids:
+    column = FIELD_PATHS[sort_by]
+    queryset = StudentResult.objects.filter(flattened_filter(filters or {}))
+
+    if after:
+        value, last_id, offset = decode_cursor(after)
+        if descending:
+            queryset = queryset.filter(Q(**{f"{column}__lt": value}) | Q(**{column: value, "id__lt": last_id}))
+        else:
+            queryset = queryset.filter(Q(**{f"{column}__gt": value}) | Q(**{column: value, "id__gt": last_id}))
+    else:
+        offset = (page - 1) * page_size
+
+    prefix = "-" if descending else ""
+    ordering = [f"{prefix}{column}", f"{prefix}id"] if column != "id" else [f"{prefix}id"]
+    skip = 0 if after else offset
+    keys = list(queryset.order_by(*ordering).values_list(column, "id")[skip:skip + page_size])
+
+    results = hydrate_rows((id for _, id in keys), fields=fields)
+    next_cursor = encode_cursor(*keys[-1], offset + len(keys)) if len(keys) == page_size else None
+
+    return {
+        "results": results,
+        "page": None if after else page,
+        "page_size": page_size,
+        "offset": offset,
+        "total_records": count_flattened(filters=filters),
+        "next_cursor": next_cursor,
+    }
+
+
+# Columns filtered on by exact match, all backed by Submission indexes
+FILTER_FIELDS = ("program", "term", "course", "ga", "gai", "cohort", "assess_type")
+
+# Every accepted filter parameter: FILTER_FIELDS, an instructor name and a created_at date range
+FILTER_PARAMS = (*FILTER_FIELDS, "instructor", "created_from", "created_to")
+
+
+def parse_datetime_param(name, value, end=False):
+    """
+    Parse an ISO date or datetime query parameter. A bare date is the start of that day,
+    or the start of the next day when it closes a range (end=True). Raises ValueError if invalid.
+    """
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"{name} must be a date (YYYY-MM-DD) or ISO datetime.")
+        moment = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_filters(params):
+    """
+    Pick the whitelisted filters out of a mapping of request parameters, ignoring blank values.
+    Raises ValueError for a malformed date.
+    """
+    filters = {}
+    for name in FILTER_PARAMS:
+        value = (params.get(name) or "").strip()
+        if not value:
+            continue
+        if name == "created_from":
+            value = parse_datetime_param(name, value)
+        elif name == "created_to":
+            value = parse_datetime_param(name, value, end=True)
+        filters[name] = value
+    return filters
+
+
+def flattened_filter(filters):
+    """
+    Translate parsed filters into a Q object over StudentResult.
+    Every predicate is an equality or range on an indexed column, so filtered queries
+    only touch matching rows.
+    """
+    q = Q()
+    for field, value in filters.items():
+        if value in (None, ""):
+            continue
+        if field in FILTER_FIELDS:
+            q &= Q(**{FIELD_PATHS[field]: value})
+        elif field == "instructor":
+            # "Last" matches a last name; "First Last" matches both names
+            first, _, last = value.rpartition(" ")
+            q &= Q(submission__instr_last_name=last)
+            if first:
+                q &= Q(submission__instr_first_name=first.strip())
+        elif field == "created_from":
+            q &= Q(created_at__gte=value)
+        elif field == "created_to":
+            q &= Q(created_at__lt=value)
+        else:
+            raise ValueError(f"Unknown filter {field!r}.")
+    return q
+
+
+def filter_flattened_ids(**filters):
+    """
+    Return a queryset of the StudentResult ids whose rows match every given filter.
+    """
+    return StudentResult.objects.filter(flattened_filter(filters)).values_list("id", flat=True)
+
+
+def iter_flattened_rows(chunk_size=FLATTEN_CHUNK_SIZE, **filters):
+    """
+    Lazily yield the flattened rows matching filters, newest first.
+    Ids are read through a server-side cursor and hydrated one chunk at a time,
+    so memory use does not grow with the number of rows.
+    """
+    ids = filter_flattened_ids(**filters).order_by("-id").iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(ids, chunk_size))
+        if not chunk:
+            break
+        yield from hydrate_rows(chunk)
+
+
+@versioned_cache("dashboard_stats")
+def get_dashboard_stats():
+    """
+    Return the admin dashboard counters, computed with COUNT(DISTINCT ...) in the database.
+    """
+    total_courses = Submission.objects.exclude(course="").aggregate(total=Count("course", distinct=True))["total"]
+    total_faculty = (Submission.objects
+                     .exclude(instr_first_name="")
+                     .exclude(instr_last_name="")
+                     .values("instr_first_name", "instr_last_name")
+                     .distinct()
+                     .count())
+    return {"total_courses": total_courses, "total_faculty": total_faculty}
+
+
+# Upper bound on rows returned by a prefix student search
+STUDENT_SEARCH_LIMIT = 500
+
+
+@versioned_cache("student_rows")
+def find_student_rows(student_id, prefix=False):
+    """
+    Return flattened rows for one student, newest first.
+    Ids are resolved through the student_id index before hydrating, so only matching rows are read.
+    With prefix=True, partial IDs match every student whose ID starts with them (capped at STUDENT_SEARCH_LIMIT).
+    """
+    if prefix:
+        ids = StudentResult.objects.filter(student_id__startswith=student_id)
+    else:
+        ids = StudentResult.objects.filter(student_id=student_id)
+    ids = ids.order_by('-id').values_list('id', flat=True)
+    if prefix:
+        ids = ids[:STUDENT_SEARCH_LIMIT]
+    return hydrate_rows(ids)
+
+
+# Largest number of changed rows returned per change feed page
+MAX_CHANGES_PAGE_SIZE = 5000
+
+
+def get_changes(since=None, cursor=None, page_size=1000, fields=FLATTENED_FIELDS):
+    """
+    Return the rows created or changed, and the ids of rows deleted, after data version `since`.
+
+    Rows are found through the (data_version, id) index and tombstones through their own, so the
+    cost follows the size of the change rather than of the table. Omit `since` for a full initial load.
+    The response holds:
+        rows         changed rows (the columns in `fields`), oldest change first
+        deleted      StudentResult ids deleted through the DAOs (first page of an incremental feed only)
+        watermark    the data version this feed is complete up to; pass it as `since` next time
+        next_cursor  set while more rows remain; pass it as `cursor` (with no `since`) to continue
+
+    Raises ValueError for a malformed `since` or `cursor`.
+    """
+    page_size = max(1, min(int(page_size), MAX_CHANGES_PAGE_SIZE))
+
+    if cursor:
         try:
-            dp = DataProcess.objects.get(id=id)
-            fc = FacultyCI.objects.get(id=id)
-            pc = ProgramCI.objects.get(id=id)
-            av = AssessValidity.objects.get(id=id)
-            ar = AccredReport.objects.get(id=id)
-            anr = AnnualReport.objects.get(id=id)
-
-            row = {
-                "id": id,
-                "program": dp.program,
-                "course": dp.course,
-                "term": dp.term,
-                "prog_term": pc.prog_term,
-                "instr_first_name": fc.instr_first_name,
-                "instr_last_name": fc.instr_last_name,
-                "ga": ar.ga,
-                "gai": ar.gai,
-                "instr_level": ar.instr_level,
-                "alignment": av.alignment,
-                "clos": av.clos,
-                "assess_type": ar.assess_type,
-                "assess_weight": av.assess_weight,
-                "assess_max": av.assess_max,
-                "total_score": fc.total_score,
-                "question_max": av.question_max,
-                "gai_score": fc.gai_score,
-                "assess_title": fc.assess_title,
-                "assess_descript": av.assess_descript,
-                "quest_text": ar.quest_text,
-                "student_id": ar.student_id,
-                "instr_comments": anr.instr_comments
-            }
-
-            results.append(row)
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            watermark, last_version, last_id = (int(value) for value in json.loads(raw))
         except Exception:
-            #
-            continue 
+            raise ValueError("Invalid cursor.")
+        deleted = []
+    else:
+        try:
+            since = -1 if since in (None, "") else int(since)
+        except (TypeError, ValueError):
+            raise ValueError("since must be a data version number.")
+        # Versions are handed out under a row lock, so every write at or below this is already visible
+        watermark = get_data_version()
+        last_version, last_id = since, None
+        deleted = [] if since < 0 else list(
+            ResultTombstone.objects.filter(data_version__gt=since, data_version__lte=watermark)
+            .order_by("data_version", "result_id").values_list("result_id", flat=True))
 
-    return results
+    changed = StudentResult.objects.filter(data_version__lte=watermark)
+    if last_id is None:
+        changed = changed.filter(data_version__gt=last_version)
+    else:
+        changed = changed.filter(Q(data_version__gt=last_version) | Q(data_version=last_version, id__gt=last_id))
+    keys = list(changed.order_by("data_version", "id").values_list("data_version", "id")[:page_size])
 
-class DataProcessDAO:
+    next_cursor = None
+    if len(keys) == page_size:
+        raw = json.dumps([watermark, *keys[-1]]).encode()
+        next_cursor = base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    return {
+        "rows": hydrate_rows((id for _, id in keys), fields=fields),
+        "deleted": deleted,
+        "watermark": watermark,
+        "next_cursor": next_cursor,
+    }
+
+
+# Submission columns that key GAIAchievementSummary rows
+SUMMARY_KEY_FIELDS = ("program", "term", "ga", "gai")
+
+
+class SubmissionDAO:
     @staticmethod
     def insert(**data):
         try:
-            instance = DataProcess(**data)
+            instance = Submission(**data)
             instance.full_clean()
-            instance.save()
+            with transaction.atomic():
+                instance.save()
+                bump_data_version()
             return instance
         except ValidationError as e:
             return {"success": False, "errors": e.message_dict}
@@ -141,22 +654,33 @@ class DataProcessDAO:
         
     @staticmethod
     def get_all():
-        return DataProcess.objects.all()
+        return Submission.objects.all()
     
     @staticmethod
     def filter_by(**kwargs):
-        return DataProcess.objects.filter(**kwargs) 
+        return Submission.objects.filter(**kwargs) 
     
     @staticmethod
     def update(pk, **kwargs):
         try:
-            obj = DataProcess.objects.get(pk=pk)
+            obj = Submission.objects.get(pk=pk)
+            previous = {field: getattr(obj, field) for field in SUMMARY_KEY_FIELDS}
             for key, value in kwargs.items():
                 setattr(obj, key, value)
             obj.full_clean()
-            obj.save()
+            with transaction.atomic():
+                version = bump_data_version(rewrite=True)
+                obj.save()
+                obj.results.update(data_version=version)
+                # Re-file this submission's results under its new summary key
+                if any(getattr(obj, field) != value for field, value in previous.items()):
+                    levels = list(obj.results.values_list("achievement_level", flat=True))
+                    GAISummaryDAO.apply(levels=levels, sign=-1, **previous)
+                    GAISummaryDAO.apply_results(obj, levels)
+                    StudentProfileDAO.refresh_submission(obj, key=previous)
+                    StudentProfileDAO.refresh_submission(obj)
             return obj
-        except DataProcess.DoesNotExist:
+        except Submission.DoesNotExist:
             return None
         except ValidationError as e:
             return {"success": False, "errors": e.message_dict}
@@ -164,19 +688,33 @@ class DataProcessDAO:
     @staticmethod
     def delete(pk):
         try:
-            obj = DataProcess.objects.get(pk=pk)
-            obj.delete()
+            obj = Submission.objects.get(pk=pk)
+            with transaction.atomic():
+                version = bump_data_version(rewrite=True)
+                ResultTombstone.objects.bulk_create(
+                    [ResultTombstone(result_id=result_id, submission_id=obj.pk, data_version=version)
+                     for result_id in obj.results.values_list("id", flat=True)],
+                    batch_size=BULK_BATCH_SIZE,
+                )
+                GAISummaryDAO.apply_results(obj, obj.results.values_list("achievement_level", flat=True), sign=-1)
+                student_ids = list(obj.results.values_list("student_id", flat=True))
+                obj.delete()
+                StudentProfileDAO.refresh_submission(obj, student_ids)
             return True
-        except DataProcess.DoesNotExist:
+        except Submission.DoesNotExist:
             return False
 
-class FacultyCIDAO:
+class StudentResultDAO:
     @staticmethod
     def insert(**data):
         try:
-            instance = FacultyCI(**data)
+            instance = StudentResult(**data)
             instance.full_clean()
-            instance.save()
+            with transaction.atomic():
+                instance.data_version = bump_data_version()
+                instance.save()
+                GAISummaryDAO.apply_results(instance.submission, [instance.achievement_level])
+                StudentProfileDAO.refresh_submission(instance.submission, [instance.student_id])
             return instance
         except ValidationError as e:
             return {"success": False, "errors": e.message_dict}
@@ -185,207 +723,457 @@ class FacultyCIDAO:
         
     @staticmethod
     def get_all():
-        return FacultyCI.objects.all()
+        return StudentResult.objects.all()
     
     @staticmethod
     def filter_by(**kwargs):
-        return FacultyCI.objects.filter(**kwargs) 
+        return StudentResult.objects.filter(**kwargs) 
     
     @staticmethod
     def update(pk, **kwargs):
         try:
-            obj = FacultyCI.objects.get(pk=pk)
+            obj = StudentResult.objects.select_related("submission").get(pk=pk)
+            previous_submission, previous_level, previous_student = obj.submission, obj.achievement_level, obj.student_id
             for key, value in kwargs.items():
                 setattr(obj, key, value)
             obj.full_clean()
-            obj.save()
+            with transaction.atomic():
+                obj.data_version = bump_data_version(rewrite=True)
+                obj.save()
+                GAISummaryDAO.apply_results(previous_submission, [previous_level], sign=-1)
+                GAISummaryDAO.apply_results(obj.submission, [obj.achievement_level])
+                StudentProfileDAO.refresh_submission(previous_submission, [previous_student])
+                StudentProfileDAO.refresh_submission(obj.submission, [obj.student_id])
             return obj
-        except FacultyCI.DoesNotExist:
+        except StudentResult.DoesNotExist:
             return None
         except ValidationError as e:
             return {"success": False, "errors": e.message_dict}
-
+    
     @staticmethod
     def delete(pk):
         try:
-            obj = FacultyCI.objects.get(pk=pk)
-            obj.delete()
+            obj = StudentResult.objects.select_related("submission").get(pk=pk)
+            with transaction.atomic():
+                version = bump_data_version(rewrite=True)
+                ResultTombstone.objects.create(result_id=obj.pk, submission_id=obj.submission_id, data_version=version)
+                GAISummaryDAO.apply_results(obj.submission, [obj.achievement_level], sign=-1)
+                obj.delete()
+                StudentProfileDAO.refresh_submission(obj.submission, [obj.student_id])
             return True
-        except FacultyCI.DoesNotExist:
+        except StudentResult.DoesNotExist:
             return False
-        
-class ProgramCIDAO:
+
+
+def achievement_bucket(level):
+    """
+    Return the GAIAchievementSummary bucket column that an achievement level falls into.
+    """
+    marginal, meets, exceeds = ACHIEVEMENT_THRESHOLDS
+    if level >= exceeds:
+        return "exceeds_count"
+    if level >= meets:
+        return "meets_count"
+    if level >= marginal:
+        return "marginal_count"
+    return "below_count"
+
+
+class GAISummaryDAO:
+    # Rows of StudentResult aggregated per statement by rebuild()
+    REBUILD_CHUNK_SIZE = 50000
+
     @staticmethod
-    def insert(**data):
-        try:
-            instance = ProgramCI(**data)
-            instance.full_clean()
-            instance.save()
-            return instance
-        except ValidationError as e:
-            return {"success": False, "errors": e.message_dict}
-        except Exception as e:
-            return {"success": False, "errors": str(e)}
-        
+    def apply(program, term, ga, gai, levels, sign=1):
+        """
+        Add (sign=1) or remove (sign=-1) achievement levels from one summary row.
+        """
+        deltas = {"count": 0, "total": Decimal(0), "total_sq": Decimal(0), "below_count": 0,
+                  "marginal_count": 0, "meets_count": 0, "exceeds_count": 0}
+        for level in levels:
+            level = Decimal(str(level))
+            deltas["count"] += 1
+            deltas["total"] += level
+            deltas["total_sq"] += level * level
+            deltas[achievement_bucket(level)] += 1
+        if not deltas["count"]:
+            return
+
+        with transaction.atomic():
+            summary, _ = GAIAchievementSummary.objects.get_or_create(program=program, term=term, ga=ga, gai=gai)
+            GAIAchievementSummary.objects.filter(pk=summary.pk).update(
+                updated_at=timezone.now(),
+                **{field: F(field) + sign * delta for field, delta in deltas.items() if delta},
+            )
+
+    @staticmethod
+    def apply_results(submission, levels, sign=1):
+        """
+        Add or remove achievement levels under the summary key of a submission.
+        """
+        GAISummaryDAO.apply(submission.program, submission.term, submission.ga, submission.gai,
+                            levels, sign=sign)
+
     @staticmethod
     def get_all():
-        return ProgramCI.objects.all()
-    
+        return GAIAchievementSummary.objects.all()
+
     @staticmethod
     def filter_by(**kwargs):
-        return ProgramCI.objects.filter(**kwargs) 
-    
-    @staticmethod
-    def update(pk, **kwargs):
-        try:
-            obj = ProgramCI.objects.get(pk=pk)
-            for key, value in kwargs.items():
-                setattr(obj, key, value)
-            obj.full_clean()
-            obj.save()
-            return obj
-        except ProgramCI.DoesNotExist:
-            return None
-        except ValidationError as e:
-            return {"success": False, "errors": e.message_dict}
-    
+        return GAIAchievementSummary.objects.filter(**kwargs)
+
     @staticmethod
-    def delete(pk):
-        try:
-            obj = ProgramCI.objects.get(pk=pk)
-            obj.delete()
-            return True
-        except ProgramCI.DoesNotExist:
-            return False
+    def rebuild(chunk_size=None):
+        """
+        Recompute every summary row from StudentResult in one transaction, aggregating one id range
+        per query. Returns the number of summary rows written.
+        """
+        chunk_size = chunk_size or GAISummaryDAO.REBUILD_CHUNK_SIZE
+        marginal, meets, exceeds = ACHIEVEMENT_THRESHOLDS
+        level = F("achievement_level")
+        aggregates = {
+            "count": Count("id"),
+            "total": Sum(level),
+            "total_sq": Sum(level * level),
+            "below_count": Count("id", filter=Q(achievement_level__lt=marginal)),
+            "marginal_count": Count("id", filter=Q(achievement_level__gte=marginal, achievement_level__lt=meets)),
+            "meets_count": Count("id", filter=Q(achievement_level__gte=meets, achievement_level__lt=exceeds)),
+            "exceeds_count": Count("id", filter=Q(achievement_level__gte=exceeds)),
+        }
+
+        with transaction.atomic():
+            # Every writer bumps first, so holding the version row lock keeps uploads from
+            # committing rows between the aggregation and the swap; they wait and then apply on top
+            bump_data_version()
+            totals = {}
+            last_id = 0
+            max_id = StudentResult.objects.aggregate(max_id=Max("id"))["max_id"] or 0
+            while last_id < max_id:
+                groups = (StudentResult.objects
+                          .filter(id__gt=last_id, id__lte=last_id + chunk_size)
+                          .values(**{field: F(f"submission__{field}") for field in SUMMARY_KEY_FIELDS})
+                          .annotate(**aggregates)
+                          .order_by())
+                for group in groups:
+                    key = (group["program"], group["term"], group["ga"], group["gai"])
+                    merged = totals.setdefault(key, dict.fromkeys(aggregates, 0))
+                    for field in aggregates:
+                        merged[field] += group[field] or 0
+                last_id += chunk_size
+
+            GAIAchievementSummary.objects.all().delete()
+            GAIAchievementSummary.objects.bulk_create(
+                [GAIAchievementSummary(program=program, term=term, ga=ga, gai=gai, **values)
+                 for (program, term, ga, gai), values in totals.items()],
+                batch_size=BULK_BATCH_SIZE,
+            )
+        return len(totals)
+
+
+@versioned_cache("achievement_summary")
+def get_achievement_summaries(**filters):
+    """
+    Return mean, standard deviation and bucket counts for each non-empty summary row matching filters.
+    """
+    results = []
+    for summary in GAISummaryDAO.filter_by(count__gt=0, **filters).order_by("program", "term", "ga", "gai"):
+        results.append({
+            "program": summary.program,
+            "term": summary.term,
+            "ga": summary.ga,
+            "gai": summary.gai,
+            "count": summary.count,
+            "mean": round(float(summary.mean), 4),
+            "std_dev": round(float(summary.variance) ** 0.5, 4),
+            "below_count": summary.below_count,
+            "marginal_count": summary.marginal_count,
+            "meets_count": summary.meets_count,
+            "exceeds_count": summary.exceeds_count,
+        })
+    return results
+
+
+class StudentProfileDAO:
+    """
+    Maintains StudentGAIProfile rows. Writes name the summary key and the students they touched;
+    those profile rows are recomputed from StudentResult, so updates and deletes are handled the
+    same way as inserts and the cost follows the size of the write.
+    """
 
-class AssessValidityDAO:
     @staticmethod
-    def insert(**data):
-        try:
-            instance = AssessValidity(**data)
-            instance.full_clean()
-            instance.save()
-            return instance
-        except ValidationError as e:
-            return {"success": False, "errors": e.message_dict}
-        except Exception as e:
-            return {"success": False, "errors": str(e)}
-        
+    def refresh(program, term, ga, gai, student_ids):
+        """
+        Recompute the profile rows of the given students under one summary key. Must run inside the
+        transaction of the write, after it. Lookups use the student_id and submission key indexes.
+        """
+        student_ids = sorted(set(student_ids))
+        key = {"program": program, "term": term, "ga": ga, "gai": gai}
+        for start in range(0, len(student_ids), FLATTEN_CHUNK_SIZE):
+            chunk = student_ids[start:start + FLATTEN_CHUNK_SIZE]
+            groups = list(StudentResult.objects
+                          .filter(student_id__in=chunk, **{f"submission__{field}": value for field, value in key.items()})
+                          .values("student_id")
+                          .annotate(count=Count("id"), total=Sum("achievement_level"), latest_result_id=Max("id"))
+                          .order_by())
+            latest = dict(StudentResult.objects.filter(id__in=[group["latest_result_id"] for group in groups])
+                          .values_list("id", "achievement_level"))
+            StudentGAIProfile.objects.filter(student_id__in=chunk, **key).delete()
+            StudentGAIProfile.objects.bulk_create(
+                [StudentGAIProfile(latest_level=latest[group["latest_result_id"]], **key, **group) for group in groups],
+                batch_size=BULK_BATCH_SIZE,
+            )
+
     @staticmethod
-    def get_all():
-        return AssessValidity.objects.all()
-    
+    def refresh_submission(submission, student_ids=None, key=None):
+        """
+        Refresh the profiles under a submission's summary key (or `key`, a dict of SUMMARY_KEY_FIELDS),
+        for `student_ids` or else every student with a result on the submission.
+        """
+        if student_ids is None:
+            student_ids = submission.results.values_list("student_id", flat=True)
+        key = key or {field: getattr(submission, field) for field in SUMMARY_KEY_FIELDS}
+        StudentProfileDAO.refresh(student_ids=student_ids, **key)
+
     @staticmethod
     def filter_by(**kwargs):
-        return AssessValidity.objects.filter(**kwargs) 
-    
-    @staticmethod
-    def update(pk, **kwargs):
-        try:
-            obj = AssessValidity.objects.get(pk=pk)
-            for key, value in kwargs.items():
-                setattr(obj, key, value)
-            obj.full_clean()
-            obj.save()
-            return obj
-        except AssessValidity.DoesNotExist:
-            return None
-        except ValidationError as e:
-            return {"success": False, "errors": e.message_dict}
-        
-    @staticmethod
-    def delete(pk):
-        try:
-            obj = AssessValidity.objects.get(pk=pk)
-            obj.delete()
-            return True
-        except AssessValidity.DoesNotExist:
-            return False
-    
-class AccredReportDAO:
+        return StudentGAIProfile.objects.filter(**kwargs)
+
     @staticmethod
-    def insert(**data):
-        try:
-            instance = AccredReport(**data)
-            instance.full_clean()
-            instance.save()
-            return instance
-        except ValidationError as e:
-            return {"success": False, "errors": e.message_dict}
-        except Exception as e:
-            return {"success": False, "errors": str(e)}
-        
+    def rebuild(chunk_size=None):
+        """
+        Recompute every profile row from StudentResult in one transaction, aggregating one id range
+        per query. Returns the number of profile rows written.
+        """
+        chunk_size = chunk_size or GAISummaryDAO.REBUILD_CHUNK_SIZE
+        key_fields = {field: F(f"submission__{field}") for field in SUMMARY_KEY_FIELDS}
+
+        with transaction.atomic():
+            # Taken first, as by every writer, so no upload commits between the aggregation and the swap
+            bump_data_version()
+            totals = {}
+            last_id = 0
+            max_id = StudentResult.objects.aggregate(max_id=Max("id"))["max_id"] or 0
+            while last_id < max_id:
+                groups = (StudentResult.objects
+                          .filter(id__gt=last_id, id__lte=last_id + chunk_size)
+                          .values("student_id", **key_fields)
+                          .annotate(count=Count("id"), total=Sum("achievement_level"), latest_result_id=Max("id"))
+                          .order_by())
+                for group in groups:
+                    key = (group["student_id"], *(group[field] for field in SUMMARY_KEY_FIELDS))
+                    merged = totals.setdefault(key, {"count": 0, "total": 0, "latest_result_id": 0})
+                    merged["count"] += group["count"]
+                    merged["total"] += group["total"] or 0
+                    merged["latest_result_id"] = max(merged["latest_result_id"], group["latest_result_id"])
+                last_id += chunk_size
+
+            latest_ids = [values["latest_result_id"] for values in totals.values()]
+            latest = {}
+            for start in range(0, len(latest_ids), FLATTEN_CHUNK_SIZE):
+                latest.update(StudentResult.objects.filter(id__in=latest_ids[start:start + FLATTEN_CHUNK_SIZE])
+                              .values_list("id", "achievement_level"))
+
+            StudentGAIProfile.objects.all().delete()
+            StudentGAIProfile.objects.bulk_create(
+                [StudentGAIProfile(student_id=student_id, program=program, term=term, ga=ga, gai=gai,
+                                   latest_level=latest[values["latest_result_id"]], **values)
+                 for (student_id, program, term, ga, gai), values in totals.items()],
+                batch_size=BULK_BATCH_SIZE,
+            )
+        return len(totals)
+
+
+def ga_sort_key(ga):
+    """Order GA1..GA12 numerically rather than as strings."""
+    return int(ga[2:]) if ga[2:].isdigit() else 0, ga
+
+
+def gai_sort_key(gai):
+    """Order GAIs numerically, so 10.1 follows 9.4."""
+    return tuple(int(part) if part.isdigit() else 0 for part in gai.split(".")), gai
+
+
+@versioned_cache("student_profile")
+def get_student_profile(student_id):
+    """
+    Return one student's achievement per GA and GAI with a by-term trajectory, from StudentGAIProfile.
+    Each GAI reports count, mean and latest level overall (latest = most recent result of the latest
+    term) and the same figures per term, oldest term first. Returns None for an unknown student.
+    """
+    profiles = list(StudentProfileDAO.filter_by(student_id=student_id))
+    if not profiles:
+        return None
+
+    gais = {}
+    for profile in profiles:
+        gais.setdefault((profile.ga, profile.gai), []).append(profile)
+
+    gas = {}
+    for (ga, gai), rows in sorted(gais.items(), key=lambda item: (ga_sort_key(item[0][0]), gai_sort_key(item[0][1]))):
+        rows.sort(key=lambda row: (row.term, row.latest_result_id))
+        count = sum(row.count for row in rows)
+        latest = rows[-1]
+        gas.setdefault(ga, []).append({
+            "gai": gai,
+            "count": count,
+            "mean": round(float(sum(row.total for row in rows) / count), 4),
+            "latest": float(latest.latest_level),
+            "latest_term": latest.term,
+            "terms": [{"term": row.term, "program": row.program, "count": row.count,
+                       "mean": round(float(row.mean), 4), "latest": float(row.latest_level)} for row in rows],
+        })
+
+    return {
+        "student_id": student_id,
+        "programs": sorted({profile.program for profile in profiles}),
+        "terms": sorted({profile.term for profile in profiles}),
+        "gas": [{"ga": ga, "gais": entries} for ga, entries in gas.items()],
+    }
+
+
+class UploadJobDAO:
+    # Parsed rows between progress updates
+    PROGRESS_INTERVAL = 1000
+    # Times a job is retried after its worker disappeared before it is failed
+    MAX_ATTEMPTS = 3
+    # Seconds between heartbeats of a running job; requeue_stale() should allow several missed beats
+    HEARTBEAT_INTERVAL = 30
+
     @staticmethod
-    def get_all():
-        return AccredReport.objects.all()
-    
+    def enqueue(uploaded_file, form, user=None):
+        """
+        Store an uploaded file with its bulk_upload_data() form fields and queue it for a worker.
+        """
+        return UploadJob.objects.create(user=user, file=uploaded_file, file_name=uploaded_file.name, form=form)
+
     @staticmethod
-    def filter_by(**kwargs):
-        return AccredReport.objects.filter(**kwargs) 
-    
+    def enqueue_batch(archive, entries, user=None):
+        """
+        Store a ZIP batch upload with its manifest entries (see batch.py) and queue it for a worker.
+        """
+        return UploadJob.objects.create(user=user, kind=UploadJob.BATCH, file=archive, file_name=archive.name,
+                                        form={"manifest": entries}, total_rows=len(entries))
+
     @staticmethod
-    def update(pk, **kwargs):
+    def get(pk):
         try:
-            obj = AccredReport.objects.get(pk=pk)
-            for key, value in kwargs.items():
-                setattr(obj, key, value)
-            obj.full_clean()
-            obj.save()
-            return obj
-        except AccredReport.DoesNotExist:
+            return UploadJob.objects.get(pk=pk)
+        except UploadJob.DoesNotExist:
             return None
-        except ValidationError as e:
-            return {"success": False, "errors": e.message_dict}
-    
+
     @staticmethod
-    def delete(pk):
-        try:
-            obj = AccredReport.objects.get(pk=pk)
-            obj.delete()
-            return True
-        except AccredReport.DoesNotExist:
-            return False
+    def claim_next(worker=""):
+        """
+        Mark the oldest queued job as running and return it, or return None if the queue is empty.
+        Concurrent workers skip rows locked by each other; the conditional update keeps claims
+        exclusive on databases without row locks (SQLite).
+        """
+        while True:
+            with transaction.atomic():
+                job = (UploadJob.objects.select_for_update(skip_locked=True)
+                       .filter(status=UploadJob.QUEUED).order_by("id").first())
+                if job is None:
+                    return None
+                now = timezone.now()
+                claimed = UploadJob.objects.filter(pk=job.pk, status=UploadJob.QUEUED).update(
+                    status=UploadJob.RUNNING, worker=worker, started_at=now, heartbeat_at=now,
+                    attempts=F("attempts") + 1)
+            if claimed:
+                job.refresh_from_db()
+                return job
 
-class AnnualReportDAO:
     @staticmethod
-    def insert(**data):
+    def run(job):
+        """
+        Parse a claimed job's file and store it with bulk_upload_data(), recording progress and the outcome.
+        """
         try:
-            instance = AnnualReport(**data)
-            instance.full_clean()
-            instance.save()
-            return instance
-        except ValidationError as e:
-            return {"success": False, "errors": e.message_dict}
+            records = []
+            with job.file.open("rb") as uploaded_file:
+                for record in iter_student_records(uploaded_file):
+                    records.append(record)
+                    if len(records) % UploadJobDAO.PROGRESS_INTERVAL == 0:
+                        UploadJob.objects.filter(pk=job.pk).update(processed_rows=len(records))
+            job.total_rows = job.processed_rows = len(records)
+
+            if not records:
+                job.status = UploadJob.FAILED
+                job.message = "No valid student data found in uploaded file"
+            else:
+                job.save(update_fields=["total_rows", "processed_rows"])
+                report = bulk_upload_data(records, **job.form)
+                if report["success"]:
+                    job.status = UploadJob.SUCCEEDED
+                    if report["duplicate"]:
+                        job.message = "This file was already uploaded; nothing was changed."
+                    elif report["updated"] or report["unchanged"]:
+                        job.message = (f"Existing assessment updated: {report['inserted']} rows added, "
+                                       f"{report['updated']} changed, {report['unchanged']} unchanged.")
+                    else:
+                        job.message = "Data saved successfully!"
+                    job.inserted_rows = report["inserted"]
+                    job.submission_id = report["submission_id"]
+                    if job.user_id:
+                        Faculty.objects.filter(user_id=job.user_id).update(last_uploaded=timezone.now())
+                else:
+                    job.status = UploadJob.FAILED
+                    job.message = "Upload rejected, no data was saved. Please correct the errors and try again."
+                    job.form_errors = report["form_errors"]
+                    job.row_errors = report["row_errors"]
+        except UnsupportedFileType as e:
+            job.status = UploadJob.FAILED
+            job.message = str(e)
         except Exception as e:
-            return {"success": False, "errors": str(e)}
-        
-    @staticmethod
-    def get_all():
-        return AnnualReport.objects.all()
-    
-    @staticmethod
-    def filter_by(**kwargs):
-        return AnnualReport.objects.filter(**kwargs) 
-    
+            logger.exception("Upload job %s failed", job.pk)
+            job.status = UploadJob.FAILED
+            job.message = f"Error saving data: {str(e)}"[:500]
+
+        job.finished_at = timezone.now()
+        job.file.delete(save=False)
+        job.save()
+        return job
+
     @staticmethod
-    def update(pk, **kwargs):
+    @contextmanager
+    def heartbeat(job, interval=None):
+        """
+        Touch the job's heartbeat_at every `interval` seconds from a background thread while the block runs,
+        so a long upload is not mistaken for an abandoned one.
+        """
+        interval = interval or UploadJobDAO.HEARTBEAT_INTERVAL
+        stopped = threading.Event()
+
+        def beat():
+            try:
+                while not stopped.wait(interval):
+                    try:
+                        UploadJob.objects.filter(pk=job.pk, status=UploadJob.RUNNING, worker=job.worker).update(
+                            heartbeat_at=timezone.now())
+                    except Exception:
+                        # A busy database delays a beat; the next one catches up
+                        logger.warning("Heartbeat of upload job %s failed", job.pk, exc_info=True)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=beat, name=f"upload-job-{job.pk}-heartbeat", daemon=True)
+        thread.start()
         try:
-            obj = AnnualReport.objects.get(pk=pk)
-            for key, value in kwargs.items():
-                setattr(obj, key, value)
-            obj.full_clean()
-            obj.save()
-            return obj
-        except AnnualReport.DoesNotExist:
-            return None
-        except ValidationError as e:
-            return {"success": False, "errors": e.message_dict}
-    
+            yield job
+        finally:
+            stopped.set()
+            thread.join()
+
     @staticmethod
-    def delete(pk):
-        try:
-            obj = AnnualReport.objects.get(pk=pk)
-            obj.delete()
-            return True
-        except AnnualReport.DoesNotExist:
-            return False
+    def requeue_stale(older_than):
+        """
+        Requeue running jobs whose heartbeat is older than older_than (a timedelta), i.e. whose worker
+        stopped, failing those that have used up MAX_ATTEMPTS. Returns the number of jobs touched.
+        """
+        cutoff = timezone.now() - older_than
+        stale = UploadJob.objects.filter(Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+                                         status=UploadJob.RUNNING)
+        failed = stale.filter(attempts__gte=UploadJobDAO.MAX_ATTEMPTS).update(
+            status=UploadJob.FAILED, finished_at=timezone.now(),
+            message="Upload could not be processed. Please try again.")
+        requeued = stale.filter(attempts__lt=UploadJobDAO.MAX_ATTEMPTS).update(status=UploadJob.QUEUED)
+        return failed + requeued
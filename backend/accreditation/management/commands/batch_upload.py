@@ -0,0 +1,50 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accreditation.batch import BatchUploadError, process_batch
+from accreditation.snapshot import refresh_snapshot
+
+
+class Command(BaseCommand):
+    help = "Store a ZIP of assessment spreadsheets described by a manifest (CSV or JSON) and print a summary"
+
+    def add_arguments(self, parser):
+        parser.add_argument("archive", help="ZIP file of .csv/.xlsx spreadsheets")
+        parser.add_argument("--manifest", help="Manifest file; defaults to manifest.csv or manifest.json in the ZIP")
+        parser.add_argument("--workers", type=int, help="Parsing processes (default: settings.BATCH_UPLOAD_WORKERS)")
+        parser.add_argument("--output", help="Also write the full JSON report to this file")
+
+    def handle(self, *args, **options):
+        manifest = None
+        if options["manifest"]:
+            path = Path(options["manifest"])
+            manifest = (path.name, path.read_bytes())
+        try:
+            report = process_batch(options["archive"], manifest=manifest, workers=options["workers"])
+        except BatchUploadError as e:
+            raise CommandError(str(e))
+
+        for result in report["results"]:
+            line = (f"{result['file']}: {result['status']} ({result['rows']} rows, {result['inserted']} inserted, "
+                    f"{result['updated']} updated) {result['message']}")
+            self.stdout.write(line if result["status"] != "failed" else self.style.ERROR(line))
+            for error in result["row_errors"][:5]:
+                self.stdout.write(f"    row {error['row']} {error['student_id']}: {error['errors']}")
+            for field, errors in result["form_errors"].items():
+                self.stdout.write(f"    {field}: {' '.join(errors)}")
+        for name in report["unlisted"]:
+            self.stdout.write(self.style.WARNING(f"{name}: not in the manifest, skipped"))
+
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(report, indent=2, default=str))
+
+        if report["succeeded"] and settings.ANALYTICS_SNAPSHOT_AUTO_REFRESH:
+            snapshot = refresh_snapshot()
+            self.stdout.write(f"Analytics snapshot: {snapshot['mode']}, {snapshot['rows']} rows")
+
+        summary = (f"{report['succeeded']} of {report['files']} files stored: {report['inserted']} rows inserted, "
+                   f"{report['updated']} updated, {report['unchanged']} unchanged")
+        self.stdout.write(self.style.SUCCESS(summary) if report["success"] else self.style.WARNING(summary))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from accreditation.snapshot import refresh_snapshot, snapshot_dir
+
+
+class Command(BaseCommand):
+    help = "Build or incrementally refresh the columnar analytics snapshot (flattened.npz and flattened.csv.gz)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Rebuild from scratch instead of appending new rows")
+
+    def handle(self, *args, **options):
+        meta = refresh_snapshot(full=options["full"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot {meta['mode']}: {meta['rows']} rows at data version {meta['version']} in {snapshot_dir()}"))
@@ -0,0 +1,53 @@
+import os
+import socket
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from accreditation.batch import run_batch_job
+from accreditation.database import UploadJobDAO
+from accreditation.snapshot import refresh_snapshot
+
+
+class Command(BaseCommand):
+    help = "Process queued uploads; run one or more of these alongside the web workers"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit once the queue is empty")
+        parser.add_argument("--poll-interval", type=float, default=2.0,
+                            help="Seconds to wait between checks of an empty queue")
+        parser.add_argument("--stale-after", type=int, default=10 * UploadJobDAO.HEARTBEAT_INTERVAL,
+                            help="Seconds without a heartbeat after which a running job is assumed abandoned "
+                                 "and requeued")
+
+    def handle(self, *args, **options):
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        stale_after = timedelta(seconds=options["stale_after"])
+        processed = 0
+        while True:
+            requeued = UploadJobDAO.requeue_stale(stale_after)
+            if requeued:
+                self.stderr.write(f"Requeued or failed {requeued} abandoned jobs")
+
+            job = UploadJobDAO.claim_next(worker)
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+                continue
+
+            with UploadJobDAO.heartbeat(job):
+                job = run_batch_job(job) if job.kind == job.BATCH else UploadJobDAO.run(job)
+            processed += 1
+            self.stdout.write(f"Job {job.pk} ({job.file_name}): {job.status}, {job.inserted_rows} rows inserted")
+
+            if job.status == job.SUCCEEDED and settings.ANALYTICS_SNAPSHOT_AUTO_REFRESH:
+                try:
+                    snapshot = refresh_snapshot()
+                    self.stdout.write(f"Analytics snapshot: {snapshot['mode']}, {snapshot['rows']} rows")
+                except Exception as e:
+                    self.stderr.write(f"Analytics snapshot refresh failed: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} upload jobs"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from accreditation.database import GAISummaryDAO, StudentProfileDAO
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-student GA/GAI profile table from StudentResult"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=GAISummaryDAO.REBUILD_CHUNK_SIZE,
+            help="Number of StudentResult ids aggregated per query",
+        )
+
+    def handle(self, *args, **options):
+        rows = StudentProfileDAO.rebuild(chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} student profile rows"))
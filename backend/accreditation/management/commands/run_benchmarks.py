@@ -0,0 +1,144 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import django
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+
+from accreditation.benchmarks.generator import generate_uploads
+from accreditation.benchmarks.scenarios import FULL_SCAN_LIMIT, FULL_SCAN_SCENARIOS, SCENARIOS, BenchmarkContext
+from accreditation.cache import RESULT_CACHE_ALIAS
+from accreditation.database import bulk_upload_data
+from accreditation.models import StudentResult
+
+
+class Command(BaseCommand):
+    help = ("Time the upload, listing, search and export paths against synthetic data "
+            "in a throwaway test database and write the results as JSON")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[10000],
+                            help="Dataset sizes to benchmark, e.g. --rows 10000 100000 1000000")
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per scenario")
+        parser.add_argument("--seed", type=int, default=0, help="Seed for the data generator")
+        parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                            help="Only run the given scenario (may be repeated)")
+        parser.add_argument("--cold", action="store_true",
+                            help="Clear the result cache before every run instead of measuring cache hits")
+        parser.add_argument("--output", help="Write the JSON results to this file instead of stdout")
+        parser.add_argument("--compare", help="Earlier results file to print median changes against")
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1.")
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)
+
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            results = self.run_sizes(sorted(options["rows"]), options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {"meta": self.meta(options), "results": results}
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(results)} results to {options['output']}"))
+        else:
+            self.stdout.write(output)
+        if baseline:
+            self.print_comparison(baseline, results)
+
+    def run_sizes(self, sizes, options):
+        """Grow one dataset through each size in turn and run every scenario at each."""
+        results = []
+        uploads = generate_uploads(sizes[-1], seed=options["seed"])
+        for rows in sizes:
+            self.load(uploads, rows)
+            ctx = BenchmarkContext(rows=rows, seed=options["seed"])
+            for name in options["scenario"] or SCENARIOS:
+                if not options["scenario"] and name in FULL_SCAN_SCENARIOS and rows > FULL_SCAN_LIMIT:
+                    continue
+                results.append(self.run_scenario(name, ctx, options["repeat"], options["cold"]))
+                self.stderr.write(f"{rows:>9} rows  {name:<28} {results[-1]['median_ms']:>10.1f} ms")
+        return results
+
+    def load(self, uploads, rows):
+        """Insert generated uploads until the database holds at least rows results."""
+        started = time.perf_counter()
+        loaded = StudentResult.objects.count()
+        for form, records in uploads:
+            if loaded >= rows:
+                break
+            report = bulk_upload_data(records, **form)
+            if not report["success"]:
+                raise CommandError(f"Generated upload was rejected: {report}")
+            loaded += report["inserted"]
+        self.stderr.write(f"Loaded {loaded} rows in {time.perf_counter() - started:.1f}s")
+
+    def run_scenario(self, name, ctx, repeat, cold=False):
+        scenario = SCENARIOS[name]
+        # The first run warms caches and records the query count; it is not timed
+        if cold:
+            caches[RESULT_CACHE_ALIAS].clear()
+        # The query log is capped, and loading the dataset fills it; counts taken at the cap read zero
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            scenario(ctx)
+        timings = []
+        for _ in range(repeat):
+            if cold:
+                caches[RESULT_CACHE_ALIAS].clear()
+            started = time.perf_counter()
+            scenario(ctx)
+            timings.append((time.perf_counter() - started) * 1000)
+        return {
+            "scenario": name,
+            "rows": ctx.rows,
+            "repeat": repeat,
+            "cold": cold,
+            "queries": len(queries),
+            "min_ms": round(min(timings), 3),
+            "median_ms": round(statistics.median(timings), 3),
+            "max_ms": round(max(timings), 3),
+        }
+
+    def meta(self, options):
+        try:
+            revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                      text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            revision = None
+        return {
+            "git_revision": revision,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "seed": options["seed"],
+            "repeat": options["repeat"],
+            "cold": options["cold"],
+        }
+
+    def print_comparison(self, baseline, results):
+        previous = {(r["scenario"], r["rows"]): r for r in baseline.get("results", [])}
+        for result in results:
+            before = previous.get((result["scenario"], result["rows"]))
+            if not before or not before["median_ms"]:
+                continue
+            change = (result["median_ms"] - before["median_ms"]) / before["median_ms"] * 100
+            self.stdout.write(f"{result['rows']:>9} rows  {result['scenario']:<28} "
+                              f"{before['median_ms']:>10.1f} -> {result['median_ms']:>10.1f} ms ({change:+.1f}%)")
@@ -0,0 +1,204 @@
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; without it responses are gzip-compressed only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Number of slowest SQL statements included in a slow-request log entry
+WORST_QUERIES = 5
+
+
+class TimingStats:
+    """
+    Rolling wall-time samples per URL name, kept in memory by each worker process.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def record(self, url_name, wall_ms, db_ms, queries):
+        with self._lock:
+            self._samples[url_name].append((wall_ms, db_ms, queries))
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    @staticmethod
+    def percentile(ordered, pct):
+        """Nearest-rank percentile of an already sorted list."""
+        return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+    def summary(self):
+        """Return p50/p95/p99 wall time plus mean DB time and query count for each URL name."""
+        with self._lock:
+            samples = {name: list(values) for name, values in self._samples.items()}
+        results = {}
+        for name, values in sorted(samples.items()):
+            walls = sorted(wall for wall, _, _ in values)
+            results[name] = {
+                "count": len(values),
+                "p50_ms": round(self.percentile(walls, 50), 3),
+                "p95_ms": round(self.percentile(walls, 95), 3),
+                "p99_ms": round(self.percentile(walls, 99), 3),
+                "mean_db_ms": round(sum(db for _, db, _ in values) / len(values), 3),
+                "mean_queries": round(sum(queries for _, _, queries in values) / len(values), 2),
+            }
+        return results
+
+
+timing_stats = TimingStats()
+
+
+class QueryTimer:
+    """
+    Database execute wrapper that totals query time and keeps the slowest statements.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.worst = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.total += duration
+            entry = (duration, self.count, sql)
+            if len(self.worst) < WORST_QUERIES:
+                heapq.heappush(self.worst, entry)
+            elif duration > self.worst[0][0]:
+                heapq.heapreplace(self.worst, entry)
+
+    def slowest(self):
+        return [(duration, sql) for duration, _, sql in sorted(self.worst, reverse=True)]
+
+
+class RequestTimingMiddleware:
+    """
+    Opt-in per-request instrumentation, enabled with settings.REQUEST_TIMING_ENABLED.
+
+    Adds a Server-Timing header with wall time and DB time, logs requests slower than
+    settings.SLOW_REQUEST_MS with their worst SQL statements, and feeds timing_stats.
+    When disabled the middleware removes itself from the chain, so it costs nothing.
+    Streaming responses are timed up to the point the response is returned, not until the body is sent.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_TIMING_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, "SLOW_REQUEST_MS", 500)
+        timing_stats.window = getattr(settings, "REQUEST_TIMING_WINDOW", timing_stats.window)
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        wall_ms = (time.perf_counter() - started) * 1000
+        db_ms = timer.total * 1000
+
+        match = request.resolver_match
+        url_name = match.view_name if match and match.url_name else "<unresolved>"
+        timing_stats.record(url_name, wall_ms, db_ms, timer.count)
+
+        response.headers["Server-Timing"] = (
+            f'total;dur={wall_ms:.1f}, db;dur={db_ms:.1f};desc="{timer.count} queries"')
+
+        if wall_ms >= self.slow_ms:
+            worst = "".join(f"\n  {duration * 1000:.1f} ms: {sql}" for duration, sql in timer.slowest())
+            logger.warning("Slow request %s %s (%s): %.1f ms total, %.1f ms in %d queries%s",
+                           request.method, request.path, url_name, wall_ms, db_ms, timer.count, worst)
+        return response
+
+
+# Accept-Encoding lists br without q=0
+re_accepts_brotli = re.compile(r"\bbr\b(?!\s*;\s*q=0(?:\.0+)?\s*(?:,|$))")
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware that prefers Brotli for JSON and CSV responses when the client accepts it
+    and the brotli package is installed. HTML pages stay on gzip, which pads its output
+    against BREACH; they may carry CSRF tokens, the API responses do not. Content that is
+    already compressed (XLSX, ZIP, gzip, NumPy archives, raw downloads) is passed through.
+    """
+
+    # Dynamic responses trade a little ratio for speed; 11 is meant for static assets
+    brotli_quality = 5
+    brotli_types = ("application/json", "text/csv")
+    incompressible_types = (
+        "application/gzip", "application/x-gzip", "application/zip", "application/x-zip-compressed",
+        "application/octet-stream", "application/x-npz", "application/vnd.openxmlformats-officedocument.",
+        "image/", "audio/", "video/",
+    )
+    incompressible_suffixes = (".gz", ".zip", ".npz", ".xlsx", ".br", ".bz2", ".xz")
+
+    def process_response(self, request, response):
+        if self.is_compressed(response):
+            return response
+        if (brotli is None or response.has_header("Content-Encoding")
+                or not re_accepts_brotli.search(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+                or not response.get("Content-Type", "").startswith(self.brotli_types)
+                or getattr(response, "is_async", False)):
+            return super().process_response(request, response)
+
+        if not response.streaming and len(response.content) < 200:
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        if response.streaming:
+            response.streaming_content = self.compress_sequence(response.streaming_content)
+            del response.headers["Content-Length"]
+        else:
+            compressed = brotli.compress(response.content, quality=self.brotli_quality)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "br"
+        return response
+
+    def is_compressed(self, response):
+        """Whether the response body is already compressed, by its content type or download file name."""
+        if response.get("Content-Type", "").lower().startswith(self.incompressible_types):
+            return True
+        match = re.search(r'filename="?([^";]+)', response.get("Content-Disposition", ""))
+        return bool(match) and match.group(1).strip().lower().endswith(self.incompressible_suffixes)
+
+    def compress_sequence(self, sequence):
+        compressor = brotli.Compressor(quality=self.brotli_quality)
+        for chunk in sequence:
+            data = compressor.process(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:31
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accreditation', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='accredreport',
+            name='student_id',
+            field=models.CharField(db_index=True, max_length=9, validators=[django.core.validators.MinLengthValidator(8)]),
+        ),
+        migrations.AlterField(
+            model_name='annualreport',
+            name='student_id',
+            field=models.CharField(db_index=True, max_length=9, validators=[django.core.validators.MinLengthValidator(8)]),
+        ),
+    ]
@@ -0,0 +1,126 @@
+"""
+Convert the six per-student legacy tables into Submission headers and StudentResult rows.
+
+Legacy rows were joined on their shared id. Rows whose per-upload fields are identical become
+one Submission, and each id is kept as the StudentResult id. Ids missing from any of the six
+tables never appeared in the flattened views and are not carried over.
+"""
+
+from django.core.management.color import no_style
+from django.db import migrations
+
+CHUNK_SIZE = 2000
+
+# Columns of each legacy table
+LEGACY_FIELDS = {
+    'DataProcess': ('term', 'program', 'course', 'gai'),
+    'FacultyCI': ('course', 'term', 'instr_first_name', 'instr_last_name', 'assess_title', 'gai_score',
+                  'total_score', 'cohort'),
+    'ProgramCI': ('term', 'ga', 'gai', 'gai_score', 'total_score', 'achievement_level', 'cohort', 'prog_term'),
+    'AssessValidity': ('gai', 'ga', 'course', 'question_max', 'alignment', 'gai_score', 'total_score',
+                       'assess_max', 'assess_weight', 'assess_descript', 'clos'),
+    'AccredReport': ('program', 'term', 'ga', 'gai', 'assess_type', 'quest_text', 'alignment', 'instr_level',
+                     'achievement_level', 'student_id'),
+    'AnnualReport': ('program', 'term', 'course', 'ga', 'gai', 'student_id', 'achievement_level', 'assess_type',
+                     'instr_comments'),
+}
+
+# Legacy table each new column is read from (the same sources the flattened views used)
+FORWARD_SOURCES = {
+    'DataProcess': ('program', 'course', 'term', 'created_at'),
+    'ProgramCI': ('prog_term', 'cohort'),
+    'FacultyCI': ('instr_first_name', 'instr_last_name', 'assess_title', 'total_score', 'gai_score'),
+    'AccredReport': ('ga', 'gai', 'instr_level', 'assess_type', 'quest_text', 'student_id', 'achievement_level'),
+    'AssessValidity': ('alignment', 'clos', 'assess_weight', 'assess_max', 'question_max', 'assess_descript'),
+    'AnnualReport': ('instr_comments',),
+}
+
+SUBMISSION_FIELDS = ('program', 'course', 'term', 'prog_term', 'cohort', 'instr_first_name', 'instr_last_name',
+                     'ga', 'gai', 'instr_level', 'alignment', 'clos', 'assess_type', 'assess_weight', 'assess_max',
+                     'total_score', 'question_max', 'assess_title', 'assess_descript', 'quest_text', 'instr_comments')
+RESULT_FIELDS = ('student_id', 'gai_score', 'achievement_level')
+
+
+def keep_timestamps(*models):
+    """Stop auto_now_add from overwriting the created_at values copied across."""
+    for model in models:
+        model._meta.get_field('created_at').auto_now_add = False
+
+
+def reset_sequences(schema_editor, models):
+    """Move id sequences past rows inserted with explicit ids."""
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+
+
+def forwards(apps, schema_editor):
+    legacy = {name: apps.get_model('accreditation', name) for name in FORWARD_SOURCES}
+    Submission = apps.get_model('accreditation', 'Submission')
+    StudentResult = apps.get_model('accreditation', 'StudentResult')
+    keep_timestamps(Submission, StudentResult)
+
+    submissions = {}
+    last_id = 0
+    while True:
+        chunk = list(legacy['DataProcess'].objects.filter(id__gt=last_id).order_by('id')
+                     .values_list('id', flat=True)[:CHUNK_SIZE])
+        if not chunk:
+            break
+        last_id = chunk[-1]
+
+        rows = {id: {} for id in chunk}
+        for name, columns in FORWARD_SOURCES.items():
+            found = {values.pop('id'): values
+                     for values in legacy[name].objects.filter(id__in=chunk).values('id', *columns)}
+            rows = {id: {**row, **found[id]} for id, row in rows.items() if id in found}
+
+        results = []
+        for id in chunk:
+            row = rows.get(id)
+            if row is None:
+                continue
+            key = tuple(row[field] for field in SUBMISSION_FIELDS)
+            if key not in submissions:
+                # Ids are visited in ascending order, so the first row seen is the oldest
+                submissions[key] = Submission.objects.create(
+                    created_at=row['created_at'], **dict(zip(SUBMISSION_FIELDS, key))).id
+            results.append(StudentResult(id=id, submission_id=submissions[key], created_at=row['created_at'],
+                                         **{field: row[field] for field in RESULT_FIELDS}))
+        StudentResult.objects.bulk_create(results)
+
+    reset_sequences(schema_editor, [StudentResult])
+
+
+def backwards(apps, schema_editor):
+    legacy = {name: apps.get_model('accreditation', name) for name in LEGACY_FIELDS}
+    StudentResult = apps.get_model('accreditation', 'StudentResult')
+    keep_timestamps(*legacy.values())
+
+    columns = ['id', 'created_at', *RESULT_FIELDS, *(f'submission__{field}' for field in SUBMISSION_FIELDS)]
+    last_id = 0
+    while True:
+        chunk = list(StudentResult.objects.filter(id__gt=last_id).order_by('id').values(*columns)[:CHUNK_SIZE])
+        if not chunk:
+            break
+        last_id = chunk[-1]['id']
+
+        rows = [{key.replace('submission__', ''): value for key, value in values.items()} for values in chunk]
+        for name, fields in LEGACY_FIELDS.items():
+            legacy[name].objects.bulk_create(
+                [legacy[name](id=row['id'], created_at=row['created_at'], **{field: row[field] for field in fields})
+                 for row in rows])
+
+    reset_sequences(schema_editor, list(legacy.values()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accreditation', '0004_submission_studentresult'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
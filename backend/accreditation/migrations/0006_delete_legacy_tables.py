@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:36
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accreditation', '0005_convert_legacy_rows'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='AccredReport',
+        ),
+        migrations.DeleteModel(
+            name='AnnualReport',
+        ),
+        migrations.DeleteModel(
+            name='AssessValidity',
+        ),
+        migrations.DeleteModel(
+            name='DataProcess',
+        ),
+        migrations.DeleteModel(
+            name='FacultyCI',
+        ),
+        migrations.DeleteModel(
+            name='ProgramCI',
+        ),
+    ]
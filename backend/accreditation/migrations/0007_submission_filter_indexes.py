@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accreditation', '0006_delete_legacy_tables'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['program', 'term', 'ga', 'gai'], name='submission_prog_term_ga_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['course', 'term'], name='submission_course_term_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['cohort', 'program'], name='submission_cohort_prog_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accreditation', '0010_submission_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataversion',
+            name='last_rewrite',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
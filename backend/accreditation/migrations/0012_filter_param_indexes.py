@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accreditation', '0011_dataversion_last_rewrite'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studentresult',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['instr_last_name', 'instr_first_name'], name='submission_instructor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['assess_type', 'program'], name='submission_assess_type_idx'),
+        ),
+    ]
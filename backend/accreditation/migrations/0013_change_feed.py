@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accreditation', '0012_filter_param_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('result_id', models.BigIntegerField()),
+                ('submission_id', models.BigIntegerField()),
+                ('data_version', models.PositiveBigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='studentresult',
+            name='data_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='studentresult',
+            index=models.Index(fields=['data_version', 'id'], name='result_data_version_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resulttombstone',
+            index=models.Index(fields=['data_version', 'result_id'], name='tombstone_data_version_idx'),
+        ),
+    ]
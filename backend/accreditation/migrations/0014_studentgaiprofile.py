@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accreditation', '0013_change_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentGAIProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('student_id', models.CharField(max_length=9)),
+                ('program', models.CharField(choices=[('ELEX', 'ELEX'), ('CIVL', 'CIVL'), ('MECH', 'MECH'), ('MINE', 'MINE')], max_length=4)),
+                ('term', models.CharField(max_length=6)),
+                ('ga', models.CharField(max_length=4)),
+                ('gai', models.CharField(choices=[('1.1', '1.1'), ('1.2', '1.2'), ('1.3', '1.3'), ('1.4', '1.4'), ('2.1', '2.1'), ('2.2', '2.2'), ('2.3', '2.3'), ('3.1', '3.1'), ('3.2', '3.2'), ('3.3', '3.3'), ('3.4', '3.4'), ('4.1', '4.1'), ('4.2', '4.2'), ('4.3', '4.3'), ('4.4', '4.4'), ('5.1', '5.1'), ('5.2', '5.2'), ('5.3', '5.3'), ('5.4', '5.4'), ('6.1', '6.1'), ('6.2', '6.2'), ('6.3', '6.3'), ('6.4', '6.4'), ('6.5', '6.5'), ('7.1', '7.1'), ('7.2', '7.2'), ('7.3', '7.3'), ('7.4', '7.4'), ('8.1', '8.1'), ('8.2', '8.2'), ('8.3', '8.3'), ('9.1', '9.1'), ('9.2', '9.2'), ('9.3', '9.3'), ('9.4', '9.4'), ('10.1', '10.1'), ('10.2', '10.2'), ('10.3', '10.3'), ('11.1', '11.1'), ('11.2', '11.2'), ('11.3', '11.3'), ('12.1', '12.1'), ('12.2', '12.2'), ('12.3', '12.3'), ('12.4', '12.4')], max_length=4)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('latest_level', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('latest_result_id', models.BigIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('student_id', 'program', 'term', 'ga', 'gai'), name='unique_student_gai_profile_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accreditation', '0014_studentgaiprofile'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='submission',
+            constraint=models.UniqueConstraint(condition=models.Q(('fingerprint', ''), _negated=True), fields=('fingerprint',), name='unique_submission_fingerprint'),
+        ),
+        migrations.AddConstraint(
+            model_name='submission',
+            constraint=models.UniqueConstraint(condition=models.Q(('fingerprint', ''), _negated=True), fields=('program', 'course', 'term', 'prog_term', 'instr_last_name', 'instr_first_name', 'gai', 'assess_title'), name='unique_submission_natural_key'),
+        ),
+    ]
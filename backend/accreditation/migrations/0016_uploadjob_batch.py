@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accreditation', '0015_submission_unique_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadjob',
+            name='kind',
+            field=models.CharField(choices=[('file', 'Single file'), ('batch', 'ZIP batch')], default='file', max_length=5),
+        ),
+        migrations.AddField(
+            model_name='uploadjob',
+            name='report',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
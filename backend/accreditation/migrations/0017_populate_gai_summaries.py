@@ -0,0 +1,67 @@
+"""
+Populate GAIAchievementSummary from the stored results.
+
+The summary table was created empty and is only maintained incrementally by later uploads, so rows
+converted from the legacy tables (and any uploaded before this migration) were never counted. The
+table is recomputed from StudentResult, as `manage.py rebuild_achievement_summary` does.
+"""
+
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Count, F, Max, Q, Sum
+
+CHUNK_SIZE = 50000
+
+# Bucket lower bounds as of this migration (models.ACHIEVEMENT_THRESHOLDS)
+MARGINAL, MEETS, EXCEEDS = Decimal('0.50'), Decimal('0.65'), Decimal('0.80')
+
+KEY_FIELDS = ('program', 'term', 'ga', 'gai')
+
+
+def forwards(apps, schema_editor):
+    StudentResult = apps.get_model('accreditation', 'StudentResult')
+    GAIAchievementSummary = apps.get_model('accreditation', 'GAIAchievementSummary')
+
+    level = F('achievement_level')
+    aggregates = {
+        'count': Count('id'),
+        'total': Sum(level),
+        'total_sq': Sum(level * level),
+        'below_count': Count('id', filter=Q(achievement_level__lt=MARGINAL)),
+        'marginal_count': Count('id', filter=Q(achievement_level__gte=MARGINAL, achievement_level__lt=MEETS)),
+        'meets_count': Count('id', filter=Q(achievement_level__gte=MEETS, achievement_level__lt=EXCEEDS)),
+        'exceeds_count': Count('id', filter=Q(achievement_level__gte=EXCEEDS)),
+    }
+
+    totals = {}
+    last_id = 0
+    max_id = StudentResult.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+    while last_id < max_id:
+        groups = (StudentResult.objects
+                  .filter(id__gt=last_id, id__lte=last_id + CHUNK_SIZE)
+                  .values(**{field: F(f'submission__{field}') for field in KEY_FIELDS})
+                  .annotate(**aggregates)
+                  .order_by())
+        for group in groups:
+            merged = totals.setdefault(tuple(group[field] for field in KEY_FIELDS), dict.fromkeys(aggregates, 0))
+            for field in aggregates:
+                merged[field] += group[field] or 0
+        last_id += CHUNK_SIZE
+
+    GAIAchievementSummary.objects.all().delete()
+    GAIAchievementSummary.objects.bulk_create(
+        [GAIAchievementSummary(**dict(zip(KEY_FIELDS, key)), **values) for key, values in totals.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accreditation', '0016_uploadjob_batch'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
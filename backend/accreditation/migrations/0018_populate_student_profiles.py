@@ -0,0 +1,62 @@
+"""
+Populate StudentGAIProfile from the stored results.
+
+0014 created the table empty and it is only maintained by later writes, so students whose results
+predate it had no profile. The table is recomputed from StudentResult, as
+`manage.py rebuild_student_profiles` does.
+"""
+
+from django.db import migrations
+from django.db.models import Count, F, Max, Sum
+
+CHUNK_SIZE = 50000
+LOOKUP_CHUNK_SIZE = 2000
+
+KEY_FIELDS = ('program', 'term', 'ga', 'gai')
+
+
+def forwards(apps, schema_editor):
+    StudentResult = apps.get_model('accreditation', 'StudentResult')
+    StudentGAIProfile = apps.get_model('accreditation', 'StudentGAIProfile')
+
+    totals = {}
+    last_id = 0
+    max_id = StudentResult.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+    while last_id < max_id:
+        groups = (StudentResult.objects
+                  .filter(id__gt=last_id, id__lte=last_id + CHUNK_SIZE)
+                  .values('student_id', **{field: F(f'submission__{field}') for field in KEY_FIELDS})
+                  .annotate(count=Count('id'), total=Sum('achievement_level'), latest_result_id=Max('id'))
+                  .order_by())
+        for group in groups:
+            key = (group['student_id'], *(group[field] for field in KEY_FIELDS))
+            merged = totals.setdefault(key, {'count': 0, 'total': 0, 'latest_result_id': 0})
+            merged['count'] += group['count']
+            merged['total'] += group['total'] or 0
+            merged['latest_result_id'] = max(merged['latest_result_id'], group['latest_result_id'])
+        last_id += CHUNK_SIZE
+
+    latest_ids = [values['latest_result_id'] for values in totals.values()]
+    latest = {}
+    for start in range(0, len(latest_ids), LOOKUP_CHUNK_SIZE):
+        latest.update(StudentResult.objects.filter(id__in=latest_ids[start:start + LOOKUP_CHUNK_SIZE])
+                      .values_list('id', 'achievement_level'))
+
+    StudentGAIProfile.objects.all().delete()
+    StudentGAIProfile.objects.bulk_create(
+        [StudentGAIProfile(student_id=key[0], **dict(zip(KEY_FIELDS, key[1:])),
+                           latest_level=latest[values['latest_result_id']], **values)
+         for key, values in totals.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accreditation', '0017_populate_gai_summaries'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
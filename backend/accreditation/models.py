@@ -1,6 +1,7 @@
 from django.db import models
 from django.core.validators import MinLengthValidator, MinValueValidator, MaxValueValidator
 from django.contrib.auth.models import User
+from decimal import Decimal
 
 
 GAI_CHOICES = [
@@ -38,40 +39,17 @@ ALIGNMENT_CHOICES = [("Perfectly", "Perfectly"),
 PROGRAM_CHOICES = [('ELEX', 'ELEX'), ('CIVL', 'CIVL'), ('MECH', 'MECH'),('MINE', 'MINE')]
 
 
-class DataProcess(models.Model):
-    term = models.CharField(max_length=6, validators=[MinLengthValidator(6)])
+class Submission(models.Model):
+    """
+    One uploaded assessment: the form fields shared by every student row of an upload.
+    """
     program = models.CharField(max_length=4, choices=PROGRAM_CHOICES)
-
-    course = models.CharField(max_length=9, validators=[MinLengthValidator(9)])
-    gai = models.CharField(
-        max_length=4,
-        choices=GAI_CHOICES
-    )
-    created_at = models.DateTimeField(auto_now_add=True)
-
-    def __str__(self):
-        return f"Term: {self.term} | Program: {self.program} | Course: {self.course} | GAI: {self.gai}"
-
-
-class FacultyCI(models.Model):
     course = models.CharField(max_length=9, validators=[MinLengthValidator(9)])
     term = models.CharField(max_length=6, validators=[MinLengthValidator(6)])
+    prog_term = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(9)])
+    cohort = models.CharField(max_length=11)
     instr_first_name = models.CharField(max_length=20)
     instr_last_name = models.CharField(max_length=20)
-    assess_title = models.CharField(max_length=12)
-    gai_score = models.DecimalField(max_digits=5, decimal_places=2, validators=[MinValueValidator(0.01), MaxValueValidator(999.99)])
-    total_score = models.DecimalField(max_digits=5, decimal_places=2, validators=[MinValueValidator(0.01), MaxValueValidator(999.99)])
-    cohort = models.CharField(max_length=11)
-    created_at = models.DateTimeField(auto_now_add=True)
-
-    def __str__(self):
-        return (f"Course: {self.course} | Term: {self.term} | Instructor First Name: {self.instr_first_name} | "
-                f"Instructor Last Name: {self.instr_last_name} | Assessment Title: {self.assess_title} | "
-                f"Total Score: {self.total_score} | Cohort: {self.cohort} | GAI Score: {self.gai_score}")
-
-
-class ProgramCI(models.Model):
-    term = models.CharField(max_length=6, validators=[MinLengthValidator(6)])
     ga = models.CharField(
         max_length=4,
         choices=[(f'GA{i}', f'GA{i}') for i in range(1, 13)]
@@ -80,77 +58,167 @@ class ProgramCI(models.Model):
         max_length=4,
         choices=GAI_CHOICES
     )
-    gai_score = models.DecimalField(max_digits=5, decimal_places=2, validators=[MinValueValidator(0.01), MaxValueValidator(999.99)])
+    instr_level = models.CharField(max_length=24, choices=[("Introductory", "Introductory"),
+                                                           ("Intermediate Development", "Intermediate Development"),
+                                                           ("Advanced Application", "Advanced Application")])
+    alignment = models.CharField(max_length=9, choices=ALIGNMENT_CHOICES)
+    clos = models.CharField(max_length=100)
+    assess_type = models.CharField(max_length=15, choices=ASSESSMENT_TYPE_CHOICES)
+    assess_weight = models.DecimalField(max_digits=5, decimal_places=2, validators=[MinValueValidator(0.01), MaxValueValidator(100.00)])
+    assess_max = models.IntegerField()
     total_score = models.DecimalField(max_digits=5, decimal_places=2, validators=[MinValueValidator(0.01), MaxValueValidator(999.99)])
-    achievement_level = models.DecimalField(max_digits=5, decimal_places=2)
-    cohort = models.CharField(max_length=11)
-    prog_term = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(9)])
+    question_max = models.IntegerField()
+    assess_title = models.CharField(max_length=12)
+    assess_descript = models.CharField(max_length=200)
+    quest_text = models.CharField(max_length=400)
+    instr_comments = models.CharField(max_length=800)
+    # SHA-256 of the form fields and student rows of the last upload stored here; see upload_fingerprint()
+    fingerprint = models.CharField(max_length=64, blank=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Match the filter axes of the flattened views, exports and reports
+        indexes = [
+            models.Index(fields=['program', 'term', 'ga', 'gai'], name='submission_prog_term_ga_idx'),
+            models.Index(fields=['course', 'term'], name='submission_course_term_idx'),
+            models.Index(fields=['cohort', 'program'], name='submission_cohort_prog_idx'),
+            models.Index(fields=['instr_last_name', 'instr_first_name'], name='submission_instructor_idx'),
+            models.Index(fields=['assess_type', 'program'], name='submission_assess_type_idx'),
+        ]
+        # Uploads always carry a fingerprint; rows converted from the legacy tables do not and may repeat
+        constraints = [
+            models.UniqueConstraint(fields=['fingerprint'], condition=~models.Q(fingerprint=''),
+                                    name='unique_submission_fingerprint'),
+            models.UniqueConstraint(fields=['program', 'course', 'term', 'prog_term', 'instr_last_name',
+                                            'instr_first_name', 'gai', 'assess_title'],
+                                    condition=~models.Q(fingerprint=''), name='unique_submission_natural_key'),
+        ]
+
     def __str__(self):
-        return (f"Term: {self.term} | GA: {self.ga} | GAI: {self.gai} | Total Score: "
-                f"{self.total_score} | Achievement Level: {self.achievement_level} | Cohort: {self.cohort} | "
-                f"GAI Score: {self.gai_score}")
+        return (f"Program: {self.program} | Course: {self.course} | Term: {self.term} | GA: {self.ga} | "
+                f"GAI: {self.gai} | Assessment Title: {self.assess_title} | Instructor: "
+                f"{self.instr_first_name} {self.instr_last_name}")
 
 
-class AssessValidity(models.Model):
-    gai = models.CharField(
-        max_length=4,
-        choices=GAI_CHOICES
-    )
-    ga = models.CharField(
-        max_length=4,
-        choices=[(f'GA{i}', f'GA{i}') for i in range(1, 13)]
-    )
-    course = models.CharField(max_length=9, validators=[MinLengthValidator(9)])
-    question_max = models.IntegerField()
-    alignment = models.CharField(max_length=9, choices=ALIGNMENT_CHOICES)
+class StudentResult(models.Model):
+    """
+    One student's score on a Submission.
+    """
+    submission = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='results')
+    student_id = models.CharField(max_length=9, validators=[MinLengthValidator(8)], db_index=True)
     gai_score = models.DecimalField(max_digits=5, decimal_places=2, validators=[MinValueValidator(0.01), MaxValueValidator(999.99)])
-    total_score = models.DecimalField(max_digits=5, decimal_places=2, validators=[MinValueValidator(0.01), MaxValueValidator(999.99)])
-    assess_max = models.IntegerField()
-    assess_weight = models.DecimalField(max_digits=5, decimal_places=2, validators=[MinValueValidator(0.01), MaxValueValidator(100.00)])
-    assess_descript = models.CharField(max_length=200)
-    clos = models.CharField(max_length=100)
-    created_at = models.DateTimeField(auto_now_add=True)
+    achievement_level = models.DecimalField(max_digits=5, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # DataVersion of the write that last created or changed this row (or its submission); drives the change feed
+    data_version = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['data_version', 'id'], name='result_data_version_idx'),
+        ]
 
     def __str__(self):
-        return (f"GAI: {self.gai} | GA: {self.ga} | Course: {self.course} | Question Max: {self.question_max} | "
-                f"Alignment: {self.alignment} | Total Score: {self.total_score} | "
-                f"Assess Max: {self.assess_max} | Assess Weight: {self.assess_weight} | GAI Scores: {self.gai_score}")
+        return (f"Submission: {self.submission_id} | Student ID: {self.student_id} | GAI Score: {self.gai_score} | "
+                f"Achievement Level: {self.achievement_level}")
 
 
-class AccredReport(models.Model):
-    program = models.CharField(max_length=4, choices=PROGRAM_CHOICES)
-    term = models.CharField(max_length=6, validators=[MinLengthValidator(6)])
-    ga = models.CharField(
-        max_length=4,
-        choices=[(f'GA{i}', f'GA{i}') for i in range(1, 13)]
-    )
-    gai = models.CharField(
-        max_length=4,
-        choices=GAI_CHOICES
-    )
-    assess_type = models.CharField(max_length=15, choices=ASSESSMENT_TYPE_CHOICES)
-    quest_text = models.CharField(max_length=400)
-    alignment = models.CharField(max_length=9, choices=ALIGNMENT_CHOICES)
-    instr_level = models.CharField(max_length=24, choices=[("Introductory", "Introductory"),
-                                                           ("Intermediate Development", "Intermediate Development"),
-                                                           ("Advanced Application", "Advanced Application")])
-    achievement_level = models.DecimalField(max_digits=5, decimal_places=2)
-    student_id = models.CharField(max_length=9, validators=[MinLengthValidator(8)])
+class ResultTombstone(models.Model):
+    """
+    Record of a StudentResult deleted through the DAOs, so change feed clients can drop it too.
+    """
+    result_id = models.BigIntegerField()
+    submission_id = models.BigIntegerField()
+    data_version = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['data_version', 'result_id'], name='tombstone_data_version_idx'),
+        ]
+
+    def __str__(self):
+        return f"Deleted result {self.result_id} at data version {self.data_version}"
+
+
+class Faculty(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE)
+    last_uploaded = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.user.username
+
+
+class UploadJob(models.Model):
+    """
+    A stored upload waiting for, or processed by, the `manage.py process_uploads` worker.
+    A batch job holds a ZIP archive; its row counts are counts of files and its per-file results go in report.
+    """
+    FILE = 'file'
+    BATCH = 'batch'
+    KIND_CHOICES = [(FILE, 'Single file'), (BATCH, 'ZIP batch')]
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (SUCCEEDED, 'Succeeded'), (FAILED, 'Failed')]
+
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    kind = models.CharField(max_length=5, choices=KIND_CHOICES, default=FILE)
+    status = models.CharField(max_length=9, choices=STATUS_CHOICES, default=QUEUED)
+    file = models.FileField(upload_to='upload_jobs/%Y/%m/', blank=True)
+    file_name = models.CharField(max_length=255)
+    form = models.JSONField()
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    inserted_rows = models.PositiveIntegerField(default=0)
+    message = models.CharField(max_length=500, blank=True)
+    form_errors = models.JSONField(default=dict, blank=True)
+    row_errors = models.JSONField(default=list, blank=True)
+    report = models.JSONField(default=dict, blank=True)
+    submission = models.ForeignKey(Submission, on_delete=models.SET_NULL, null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Touched periodically by the worker running the job; a stale heartbeat means the worker is gone
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id'], name='upload_job_status_idx'),
+        ]
 
     def __str__(self):
-        return (f"Program: {self.program} | Term: {self.term} | GA: {self.ga} | GAI: {self.gai} | Assessment Type: "
-                f"{self.assess_type} | Question Text: {self.quest_text} | Alignment: {self.alignment} | Instructional "
-                f"Level: {self.instr_level} | Achievement Level: {self.achievement_level} | "
-                f"Student ID: {self.student_id}")
+        return f"Upload job {self.pk} | {self.file_name} | {self.status}"
 
 
-class AnnualReport(models.Model):
+class DataVersion(models.Model):
+    """
+    Single-row counter bumped by every write to Submission or StudentResult.
+    Cached read results are keyed by it, so every worker sees a change as soon as it commits.
+    """
+    version = models.PositiveBigIntegerField(default=0)
+    # Version of the last write that changed or deleted existing rows instead of only adding new ones
+    last_rewrite = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Data version {self.version}"
+
+
+# Lower bounds of the "marginal", "meets" and "exceeds" achievement buckets; anything lower is "below"
+ACHIEVEMENT_THRESHOLDS = (Decimal('0.50'), Decimal('0.65'), Decimal('0.80'))
+
+
+class GAIAchievementSummary(models.Model):
+    """
+    Running achievement_level totals per program, term, GA and GAI.
+    Maintained incrementally as uploads arrive; rebuild with `manage.py rebuild_achievement_summary`.
+    """
     program = models.CharField(max_length=4, choices=PROGRAM_CHOICES)
     term = models.CharField(max_length=6, validators=[MinLengthValidator(6)])
-    course = models.CharField(max_length=9, validators=[MinLengthValidator(9)])
     ga = models.CharField(
         max_length=4,
         choices=[(f'GA{i}', f'GA{i}') for i in range(1, 13)]
@@ -159,20 +227,64 @@ class AnnualReport(models.Model):
         max_length=4,
         choices=GAI_CHOICES
     )
-    student_id = models.CharField(max_length=9, validators=[MinLengthValidator(8)])
-    achievement_level = models.DecimalField(max_digits=5, decimal_places=2)
-    assess_type = models.CharField(max_length=15, choices=ASSESSMENT_TYPE_CHOICES)
-    instr_comments = models.CharField(max_length=800)
-    created_at = models.DateTimeField(auto_now_add=True)
+    count = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_sq = models.DecimalField(max_digits=18, decimal_places=4, default=0)
+    below_count = models.PositiveIntegerField(default=0)
+    marginal_count = models.PositiveIntegerField(default=0)
+    meets_count = models.PositiveIntegerField(default=0)
+    exceeds_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['program', 'term', 'ga', 'gai'], name='unique_gai_summary_key'),
+        ]
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    @property
+    def variance(self):
+        if not self.count:
+            return None
+        mean = self.total / self.count
+        return max(self.total_sq / self.count - mean * mean, Decimal(0))
 
     def __str__(self):
-        return (f"Program: {self.program} | Term: {self.term} | Course: {self.course} | GA: {self.ga} | GAI: {self.gai}"
-                f" | Achievement Level: {self.achievement_level} | Assessment Type: {self.assess_type} | Instructor "
-                f"Comments: {self.instr_comments} | Student ID: {self.student_id}")
-    
-class Faculty(models.Model):
-    user = models.OneToOneField(User, on_delete=models.CASCADE)
-    last_uploaded = models.DateTimeField(null=True, blank=True)
+        return (f"Program: {self.program} | Term: {self.term} | GA: {self.ga} | GAI: {self.gai} | "
+                f"Count: {self.count} | Mean: {self.mean}")
+
+
+class StudentGAIProfile(models.Model):
+    """
+    One student's achievement_level totals per program, term, GA and GAI, for longitudinal profiles.
+    Refreshed for the affected students as uploads arrive; rebuild with `manage.py rebuild_student_profiles`.
+    """
+    student_id = models.CharField(max_length=9)
+    program = models.CharField(max_length=4, choices=PROGRAM_CHOICES)
+    term = models.CharField(max_length=6)
+    ga = models.CharField(max_length=4)
+    gai = models.CharField(max_length=4, choices=GAI_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Level of the student's most recently stored result under this key
+    latest_level = models.DecimalField(max_digits=5, decimal_places=2)
+    latest_result_id = models.BigIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # Leads with student_id, so it also serves profile lookups for one student
+            models.UniqueConstraint(fields=['student_id', 'program', 'term', 'ga', 'gai'],
+                                    name='unique_student_gai_profile_key'),
+        ]
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
 
     def __str__(self):
-        return self.user.username
+        return (f"Student ID: {self.student_id} | Term: {self.term} | GA: {self.ga} | GAI: {self.gai} | "
+                f"Count: {self.count} | Mean: {self.mean}")
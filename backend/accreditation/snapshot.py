@@ -0,0 +1,246 @@
+"""
+Columnar snapshot of the flattened data for BI tools (the Tableau analysis page).
+
+Two files are kept in settings.ANALYTICS_SNAPSHOT_DIR:
+
+flattened.npz
+    One array per column. String columns are dictionary-encoded as `<column>__codes` plus
+    `<column>__categories`; numeric columns are stored as plain numpy arrays.
+flattened.csv.gz
+    The same rows as CSV, for tools that cannot read .npz.
+
+snapshot.json records the data version the files were built at. When rows have only been added
+since then, refresh_snapshot() appends the new rows; a full rebuild happens only after existing
+rows were changed or deleted (see DataVersion.last_rewrite).
+
+Snapshots are refreshed by the process_uploads worker and the build_analytics_snapshot and
+batch_upload commands, one at a time under an exclusive lock on snapshot.lock; the API only
+serves the files as last built.
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .cache import get_data_state
+from .database import EXTRA_FIELDS, FIELD_PATHS, FLATTEN_CHUNK_SIZE, FLATTENED_FIELDS
+from .models import StudentResult
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+    import msvcrt
+
+# Snapshot columns: the flattened view plus the columns BI dashboards group and average on
+SNAPSHOT_FIELDS = [*FLATTENED_FIELDS, *EXTRA_FIELDS]
+
+# Numeric columns and their array types; every other column is a dictionary-encoded string
+NUMERIC_DTYPES = {
+    "id": np.int64,
+    "prog_term": np.int16,
+    "assess_weight": np.float64,
+    "assess_max": np.int32,
+    "total_score": np.float64,
+    "question_max": np.int32,
+    "gai_score": np.float64,
+    "achievement_level": np.float64,
+}
+
+# Low-cardinality columns BI tools filter on; always dictionary-encoded, listed for consumers
+CATEGORICAL_FIELDS = ("program", "term", "ga", "gai", "assess_type")
+
+NPZ_NAME = "flattened.npz"
+CSV_NAME = "flattened.csv.gz"
+META_NAME = "snapshot.json"
+LOCK_NAME = "snapshot.lock"
+
+
+def snapshot_dir():
+    return Path(getattr(settings, "ANALYTICS_SNAPSHOT_DIR", Path(settings.BASE_DIR) / "snapshots"))
+
+
+def read_meta():
+    try:
+        with open(snapshot_dir() / META_NAME) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+@contextmanager
+def snapshot_lock():
+    """Hold the exclusive lock that serialises snapshot refreshes across processes."""
+    directory = snapshot_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / LOCK_NAME, "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def iter_snapshot_chunks(after_id=0):
+    """Yield lists of value tuples in SNAPSHOT_FIELDS order for results with id > after_id, oldest first."""
+    paths = [FIELD_PATHS[field] for field in SNAPSHOT_FIELDS]
+    rows = (StudentResult.objects.filter(id__gt=after_id).order_by("id").values_list(*paths)
+            .iterator(chunk_size=FLATTEN_CHUNK_SIZE))
+    while True:
+        chunk = list(islice(rows, FLATTEN_CHUNK_SIZE))
+        if not chunk:
+            break
+        yield chunk
+
+
+class ColumnEncoder:
+    """
+    Accumulates rows chunk by chunk into the npz arrays, optionally continuing a previous snapshot.
+    Existing dictionary codes are kept stable; new strings are appended to the categories.
+    """
+
+    def __init__(self, previous=None):
+        self.parts = {field: [] for field in SNAPSHOT_FIELDS}
+        self.categories = {field: [] for field in SNAPSHOT_FIELDS if field not in NUMERIC_DTYPES}
+        if previous is not None:
+            for field in SNAPSHOT_FIELDS:
+                if field in NUMERIC_DTYPES:
+                    self.parts[field].append(previous[field])
+                else:
+                    self.parts[field].append(previous[f"{field}__codes"].astype(np.int64))
+                    self.categories[field] = previous[f"{field}__categories"].tolist()
+        self.lookups = {field: {category: code for code, category in enumerate(categories)}
+                        for field, categories in self.categories.items()}
+
+    def append(self, rows):
+        for field, values in zip(SNAPSHOT_FIELDS, zip(*rows)):
+            dtype = NUMERIC_DTYPES.get(field)
+            if dtype is np.float64:
+                self.parts[field].append(np.array([np.nan if value is None else float(value) for value in values],
+                                                  dtype=dtype))
+            elif dtype is not None:
+                self.parts[field].append(np.array(values, dtype=dtype))
+            else:
+                lookup, categories = self.lookups[field], self.categories[field]
+                codes = np.empty(len(values), dtype=np.int64)
+                for index, value in enumerate(values):
+                    value = "" if value is None else str(value)
+                    code = lookup.get(value)
+                    if code is None:
+                        code = lookup[value] = len(categories)
+                        categories.append(value)
+                    codes[index] = code
+                self.parts[field].append(codes)
+
+    def arrays(self):
+        arrays = {}
+        for field in SNAPSHOT_FIELDS:
+            parts = self.parts[field] or [np.array([], dtype=NUMERIC_DTYPES.get(field, np.int64))]
+            column = np.concatenate(parts)
+            if field in NUMERIC_DTYPES:
+                arrays[field] = column
+            else:
+                categories = self.categories[field]
+                arrays[f"{field}__codes"] = column.astype(np.min_scalar_type(max(len(categories) - 1, 0)))
+                arrays[f"{field}__categories"] = np.array(categories, dtype=str)
+        return arrays
+
+
+def csv_member(rows, header=False):
+    """Return rows as one gzip member; gzip readers treat concatenated members as a single stream."""
+    text = io.StringIO()
+    writer = csv.writer(text)
+    if header:
+        writer.writerow(SNAPSHOT_FIELDS)
+    writer.writerows(rows)
+    return gzip.compress(text.getvalue().encode(), compresslevel=6)
+
+
+def temp_path(path):
+    fd, name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    os.close(fd)
+    return Path(name)
+
+
+def refresh_snapshot(full=False):
+    """
+    Bring the snapshot files up to date with the database. Returns the new snapshot metadata,
+    including "mode": "unchanged", "append" or "full". A refresh already running elsewhere is
+    waited for; this one then finds the snapshot current or appends only what came after it.
+    """
+    with snapshot_lock():
+        return build_snapshot(full)
+
+
+def build_snapshot(full):
+    directory = snapshot_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    npz_path, csv_path, meta_path = directory / NPZ_NAME, directory / CSV_NAME, directory / META_NAME
+
+    version, last_rewrite = get_data_state()
+    meta = None if full else read_meta()
+    if meta and not (npz_path.exists() and csv_path.exists()):
+        meta = None
+    if meta and meta["version"] == version:
+        return {**meta, "mode": "unchanged"}
+
+    # Appending is only valid if no stored rows changed and none committed late below last_id
+    append = (meta is not None and last_rewrite <= meta["version"]
+              and StudentResult.objects.filter(id__lte=meta["last_id"]).count() == meta["rows"])
+
+    new_npz, new_csv = temp_path(npz_path), temp_path(csv_path)
+    try:
+        if append:
+            with np.load(npz_path) as previous:
+                encoder = ColumnEncoder({key: previous[key] for key in previous.files})
+            shutil.copyfile(csv_path, new_csv)
+        else:
+            encoder = ColumnEncoder()
+            new_csv.write_bytes(csv_member([], header=True))
+
+        with open(new_csv, "ab") as csv_file:
+            for chunk in iter_snapshot_chunks(after_id=meta["last_id"] if append else 0):
+                encoder.append(chunk)
+                csv_file.write(csv_member(chunk))
+
+        arrays = encoder.arrays()
+        with open(new_npz, "wb") as npz_file:
+            np.savez_compressed(npz_file, **arrays)
+        os.replace(new_npz, npz_path)
+        os.replace(new_csv, csv_path)
+    finally:
+        for path in (new_npz, new_csv):
+            if path.exists():
+                path.unlink()
+
+    meta = {
+        "version": version,
+        "last_id": int(arrays["id"][-1]) if len(arrays["id"]) else 0,
+        "rows": int(len(arrays["id"])),
+        "fields": SNAPSHOT_FIELDS,
+        "categorical_fields": list(CATEGORICAL_FIELDS),
+        "built_at": timezone.now().isoformat(),
+    }
+    new_meta = temp_path(meta_path)
+    new_meta.write_text(json.dumps(meta, indent=2))
+    os.replace(new_meta, meta_path)
+    return {**meta, "mode": "append" if append else "full"}
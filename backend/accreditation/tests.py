@@ -1,3 +1,1032 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from importlib import import_module
+from pathlib import Path
+import zipfile
+from unittest import mock
 
-# Create your tests here.
+import openpyxl
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection
+from django.db.models import F
+from django.db.migrations.executor import MigrationExecutor
+from decimal import Decimal
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.utils.http import parse_http_date
+
+from bcit_accreditation.db_profiles import database_settings
+
+from . import batch, database, snapshot, utils
+from .batch import process_batch
+from .database import (FLATTENED_FIELDS, TABLE_FIELDS, GAISummaryDAO, StudentProfileDAO, StudentResultDAO, SubmissionDAO,
+                       UploadJobDAO, bulk_upload_data, filter_flattened_ids, get_changes, get_student_profile,
+                       parse_filters)
+from .middleware import CompressionMiddleware, TimingStats, timing_stats
+from .models import DataVersion, Faculty, GAIAchievementSummary, StudentGAIProfile, StudentResult, Submission, UploadJob
+from .validation import validate_result_rows
+from .utils import get_achievement_level, get_achievement_levels, get_cohort, get_cohorts, levels_to_decimals
+
+UPLOAD_FORM = {
+    "program": "ELEX", "course": "ELEX 1111", "term": "202410", "prog_term": 1,
+    "instr_first_name": "Alex", "instr_last_name": "Chen", "ga": "GA1", "gai": "1.1",
+    "instr_level": "Introductory", "alignment": "Highly", "clos": "CLO1", "assess_type": "Quiz",
+    "assess_weight": 10, "assess_max": 20, "total_score": 20, "question_max": 10,
+    "assess_title": "Quiz 1", "assess_descript": "Quiz", "quest_text": "Question", "instr_comments": "None",
+}
+
+
+def student_csv(count):
+    lines = ["Assessment Data", ",Student ID,GAI Points Achieved", ""]
+    lines += [f"{number},A{number:08d},5" for number in range(count)]
+    return SimpleUploadedFile("students.csv", "\n".join(lines).encode())
+
+
+class FlattenTests(TestCase):
+
+    def setUp(self):
+        bulk_upload_data([(f"A{number:08d}", number + 1) for number in range(3)], **UPLOAD_FORM)
+        bulk_upload_data([("B00000001", 7), ("B00000002", 4)],
+                         **{**UPLOAD_FORM, "course": "ELEX 2222", "assess_title": "Lab 1", "ga": "GA2", "gai": "2.1"})
+
+    def expected_rows(self, results):
+        """Rows built the row-by-row way, reading each result and its submission separately."""
+        rows = []
+        for result in results:
+            submission = Submission.objects.get(pk=result.submission_id)
+            rows.append({field: getattr(result if field in ("id", "student_id", "gai_score") else submission, field)
+                         for field in FLATTENED_FIELDS})
+        return rows
+
+    def test_chunked_rows_match_row_by_row_flattening(self):
+        expected = self.expected_rows(StudentResult.objects.order_by("-id"))
+        with mock.patch.object(database, "FLATTEN_CHUNK_SIZE", 2):
+            # One query for the ids, then per chunk of two one for the results and one for unseen submissions
+            with self.assertNumQueries(6):
+                rows = database.get_flattened_data()
+        self.assertEqual(rows, expected)
+        self.assertEqual(list(rows[0]), FLATTENED_FIELDS)
+
+    def test_hydration_keeps_the_requested_order_and_columns(self):
+        ids = list(StudentResult.objects.order_by("?").values_list("id", flat=True)) + [999999]
+        fields = TABLE_FIELDS["faculty_ci"]
+        rows = database.hydrate_rows(ids, fields=fields)
+        self.assertEqual([row["id"] for row in rows], ids[:-1])
+        self.assertEqual([list(row) for row in rows], [fields] * len(rows))
+
+
+class StudentSearchTests(TestCase):
+
+    def setUp(self):
+        bulk_upload_data([("A00000001", 5), ("A00000002", 6), ("A00000012", 7), ("B00000001", 8)], **UPLOAD_FORM)
+        bulk_upload_data([("A00000001", 9)], **{**UPLOAD_FORM, "assess_title": "Quiz 2"})
+        self.client.force_login(User.objects.create_superuser("admin", password="pass"))
+
+    def search(self, **params):
+        response = self.client.get("/api/student-search/", params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()["results"]
+
+    def test_exact_id_returns_that_students_rows_newest_first(self):
+        results = self.search(student_id="A00000001")
+        self.assertEqual([(row["student_id"], row["assess_title"]) for row in results],
+                         [("A00000001", "Quiz 2"), ("A00000001", "Quiz 1")])
+        self.assertEqual(list(results[0]), FLATTENED_FIELDS)
+        self.assertEqual(self.search(student_id="A000000"), [])
+
+    def test_prefix_matches_partial_ids(self):
+        results = self.search(student_id=" A0000000 ", match="prefix")
+        self.assertEqual(sorted(row["student_id"] for row in results), ["A00000001", "A00000001", "A00000002"])
+        self.assertEqual(len(self.search(student_id="A", match="prefix")), 4)
+
+        with mock.patch.object(database, "STUDENT_SEARCH_LIMIT", 2):
+            results = database.find_student_rows.__wrapped__("A", prefix=True)
+        self.assertEqual([row["id"] for row in results],
+                         list(StudentResult.objects.filter(student_id__startswith="A").order_by("-id")
+                              .values_list("id", flat=True)[:2]))
+
+    def test_missing_id_is_rejected(self):
+        self.assertEqual(self.client.get("/api/student-search/").status_code, 400)
+
+
+class SpreadsheetParsingTests(SimpleTestCase):
+    # Rows 1-3 are the template's title, header and blank row, even when they look like data
+    ROWS = [
+        ["Assessment Data", "A99999999", "9"],
+        ["", "Student ID", "GAI Points Achieved"],
+        ["", "A99999998", "9"],
+        ["1", "A00000001", "5"],
+        ["2", "A0000002", "6"],            # ID too short
+        ["3", "A00000003", "absent"],      # score not a number
+        [],
+        ["4", "A00000004"],                # no score column
+        ["5", " A00000005 ", "7.6"],       # padded ID, decimal score
+        ["6", "", "8"],
+    ]
+    EXPECTED = [("A00000001", 5), ("A00000005", 7)]
+
+    def csv_file(self, rows):
+        text = "\n".join(",".join(row) for row in rows)
+        return SimpleUploadedFile("scores.csv", text.encode())
+
+    def xlsx_file(self, rows):
+        workbook = openpyxl.Workbook()
+        for row in rows:
+            workbook.active.append([float(value) if value.replace(".", "").isdigit() else value for value in row]
+                                   if row else [None])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        return SimpleUploadedFile("scores.xlsx", buffer.getvalue())
+
+    def test_csv_rows_start_at_row_four_and_bad_rows_are_skipped(self):
+        self.assertEqual(list(utils.iter_student_records(self.csv_file(self.ROWS))), self.EXPECTED)
+
+    def test_xlsx_rows_start_at_row_four_and_bad_rows_are_skipped(self):
+        self.assertEqual(list(utils.iter_student_records(self.xlsx_file(self.ROWS))), self.EXPECTED)
+        self.assertEqual(utils.parse_student_file("scores.xlsx", self.xlsx_file(self.ROWS).read()), self.EXPECTED)
+
+    def test_csv_is_read_lazily(self):
+        class Lines:
+            name = "scores.csv"
+
+            def __iter__(self):
+                yield from (",".join(row).encode() + b"\n" for row in SpreadsheetParsingTests.ROWS[:4])
+                raise AssertionError("read past the first student row")
+
+        self.assertEqual(next(utils.iter_student_records(Lines())), ("A00000001", 5))
+
+    def test_other_file_types_are_rejected(self):
+        upload = SimpleUploadedFile("scores.txt", b"1,A00000001,5")
+        with self.assertRaises(utils.UnsupportedFileType):
+            list(utils.iter_student_records(upload))
+        self.assertEqual(utils.read_csv(upload), ([], "Unsupported file type. Please upload a .csv or .xlsx file."))
+        records, error = utils.read_csv(self.csv_file(self.ROWS[:3]))
+        self.assertEqual(records, [])
+        self.assertIn("No valid student data found", error)
+
+
+class ExportTests(TestCase):
+
+    def setUp(self):
+        bulk_upload_data([("A00000001", 5), ("A00000002", 8)], **UPLOAD_FORM)
+        bulk_upload_data([("A00000003", 6)], **{**UPLOAD_FORM, "course": "ELEX 2222", "assess_title": "Lab, part 1"})
+        self.client.force_login(User.objects.create_superuser("admin", password="pass"))
+
+    def expected_rows(self, **filters):
+        return [[str(row[field]) for field in FLATTENED_FIELDS]
+                for row in database.get_flattened_data() if all(row[key] == value for key, value in filters.items())]
+
+    def test_csv_streams_the_filtered_rows(self):
+        response = self.client.get("/export/", {"format": "csv", "course": "ELEX 1111"})
+        self.assertTrue(response.streaming)
+        self.assertIn(".csv", response["Content-Disposition"])
+        rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], FLATTENED_FIELDS)
+        self.assertEqual(rows[1:], self.expected_rows(course="ELEX 1111"))
+        self.assertEqual([row[FLATTENED_FIELDS.index("student_id")] for row in rows[1:]], ["A00000002", "A00000001"])
+
+    def test_xlsx_holds_every_row(self):
+        response = self.client.get("/export/")
+        self.assertIn(".xlsx", response["Content-Disposition"])
+        workbook = openpyxl.load_workbook(io.BytesIO(b"".join(response.streaming_content)), read_only=True)
+        rows = [[str(value) for value in row] for row in workbook["Exported Data"].iter_rows(values_only=True)]
+        self.assertEqual(rows[0], FLATTENED_FIELDS)
+        # Decimals are written as numbers; compare them numerically
+        decimals = [FLATTENED_FIELDS.index(field) for field in ("assess_weight", "total_score", "gai_score")]
+
+        def normalise(row):
+            return [float(value) if index in decimals else value for index, value in enumerate(row)]
+
+        self.assertEqual([normalise(row) for row in rows[1:]], [normalise(row) for row in self.expected_rows()])
+
+    def test_invalid_filter_is_rejected(self):
+        self.assertEqual(self.client.get("/export/", {"created_from": "yesterday"}).status_code, 400)
+
+
+class DashboardTests(TestCase):
+
+    def setUp(self):
+        bulk_upload_data([("A00000001", 5)], **UPLOAD_FORM)
+        bulk_upload_data([("A00000002", 6)], **{**UPLOAD_FORM, "assess_title": "Quiz 2"})
+        bulk_upload_data([("A00000003", 7)], **{**UPLOAD_FORM, "course": "ELEX 2222", "instr_first_name": "Sam"})
+        self.admin = User.objects.create_superuser("admin", password="pass")
+        self.client.force_login(self.admin)
+
+    def test_counts_are_distinct_courses_and_instructors(self):
+        self.assertEqual(database.get_dashboard_stats.__wrapped__(), {"total_courses": 2, "total_faculty": 2})
+
+    def test_dashboard_shows_counts_users_and_first_page(self):
+        uploaded = timezone.now() - timedelta(days=2)
+        Faculty.objects.create(user=User.objects.create_user("bob", password="pass"), last_uploaded=uploaded)
+        User.objects.create_user("carol", password="pass")
+
+        # Session, user, users with their last uploads, first page (count, ids, rows, submissions), two counters
+        with self.assertNumQueries(9):
+            response = self.client.get("/admin-dashboard/")
+        context = response.context
+        self.assertEqual((context["total_courses"], context["total_faculty"]), (2, 2))
+        self.assertEqual([(user.username, user.last_upload) for user in context["users"]],
+                         [("bob", uploaded.strftime("%Y-%m-%d")), ("carol", None)])
+        self.assertEqual([row["student_id"] for row in context["database_entries"]],
+                         ["A00000001", "A00000002", "A00000003"])
+
+
+class LegacyConversionTests(TransactionTestCase):
+    """Migration 0005 turns the six joined legacy tables into Submission headers and StudentResult rows."""
+
+    before = [("accreditation", "0004_submission_studentresult")]
+    after = [("accreditation", "0005_convert_legacy_rows")]
+
+    def setUp(self):
+        self.migration = import_module("accreditation.migrations.0005_convert_legacy_rows")
+        executor = MigrationExecutor(connection)
+        self.addCleanup(self.migrate_to_latest)
+        executor.migrate(self.before)
+        self.old_apps = executor.loader.project_state(self.before).apps
+
+    def migrate_to_latest(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def add_legacy_row(self, id, student_id, skip=(), **changes):
+        values = {**UPLOAD_FORM, "cohort": "ELEX 202410", "student_id": student_id, "gai_score": Decimal("5.00"),
+                  "achievement_level": Decimal("0.50"), **changes}
+        for name, fields in self.migration.LEGACY_FIELDS.items():
+            if name not in skip:
+                self.old_apps.get_model("accreditation", name).objects.create(
+                    id=id, **{field: values[field] for field in fields})
+
+    def test_rows_are_grouped_into_submissions_keeping_their_ids(self):
+        self.add_legacy_row(1, "A00000001")
+        self.add_legacy_row(2, "A00000002", gai_score=Decimal("8.00"), achievement_level=Decimal("0.80"))
+        self.add_legacy_row(3, "A00000001", assess_title="Quiz 2")
+        # Missing from one table, so it never appeared in the flattened views
+        self.add_legacy_row(4, "A00000004", skip=("AnnualReport",))
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        new_apps = executor.loader.project_state(self.after).apps
+        Submission = new_apps.get_model("accreditation", "Submission")
+        StudentResult = new_apps.get_model("accreditation", "StudentResult")
+
+        self.assertEqual(sorted(Submission.objects.values_list("assess_title", flat=True)), ["Quiz 1", "Quiz 2"])
+        results = list(StudentResult.objects.order_by("id").values_list(
+            "id", "student_id", "gai_score", "achievement_level", "submission__assess_title"))
+        self.assertEqual(results, [
+            (1, "A00000001", Decimal("5.00"), Decimal("0.50"), "Quiz 1"),
+            (2, "A00000002", Decimal("8.00"), Decimal("0.80"), "Quiz 1"),
+            (3, "A00000001", Decimal("5.00"), Decimal("0.50"), "Quiz 2"),
+        ])
+        submission = Submission.objects.get(assess_title="Quiz 1")
+        self.assertEqual({field: getattr(submission, field) for field in ("course", "instr_last_name", "cohort",
+                                                                          "quest_text", "instr_comments")},
+                         {"course": "ELEX 1111", "instr_last_name": "Chen", "cohort": "ELEX 202410",
+                          "quest_text": "Question", "instr_comments": "None"})
+
+
+class FilterIndexPlanTests(TestCase):
+    """
+    The filtered flattened views, exports and student search should be served by indexes.
+    Postgres is told to avoid sequential scans so the small test tables do not hide a missing index.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        report = bulk_upload_data([(f"A{number:08d}", 5) for number in range(20)], **UPLOAD_FORM)
+        assert report["success"], report
+
+    def setUp(self):
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def index_name(self, model, columns):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+        for name, info in constraints.items():
+            if info["index"] and info["columns"] == columns:
+                return name
+        self.fail(f"No index on {model._meta.db_table}{tuple(columns)}")
+
+    def assertUsesIndex(self, queryset, model, columns):
+        plan = queryset.explain()
+        self.assertIn(self.index_name(model, columns), plan)
+
+    def test_program_term_filter_uses_composite_index(self):
+        self.assertUsesIndex(filter_flattened_ids(program="ELEX", term="202410"),
+                             Submission, ["program", "term", "ga", "gai"])
+
+    def test_gai_filter_uses_composite_index(self):
+        self.assertUsesIndex(filter_flattened_ids(program="ELEX", term="202410", ga="GA1", gai="1.1"),
+                             Submission, ["program", "term", "ga", "gai"])
+
+    def test_course_filter_uses_course_term_index(self):
+        self.assertUsesIndex(filter_flattened_ids(course="ELEX 1111"), Submission, ["course", "term"])
+
+    def test_cohort_filter_uses_cohort_index(self):
+        self.assertUsesIndex(Submission.objects.filter(cohort="ELEX 202410"), Submission, ["cohort", "program"])
+
+    def test_instructor_filter_uses_instructor_index(self):
+        self.assertUsesIndex(filter_flattened_ids(instructor="Alex Chen"),
+                             Submission, ["instr_last_name", "instr_first_name"])
+
+    def test_created_range_uses_created_at_index(self):
+        filters = parse_filters({"created_from": "2024-01-01", "created_to": "2024-01-31"})
+        self.assertUsesIndex(filter_flattened_ids(**filters), StudentResult, ["created_at"])
+
+    def test_student_search_uses_student_id_index(self):
+        self.assertUsesIndex(StudentResult.objects.filter(student_id="A00000001").order_by("-id"),
+                             StudentResult, ["student_id"])
+
+
+@override_settings(REQUEST_TIMING_ENABLED=True, SLOW_REQUEST_MS=60000)
+class RequestTimingTests(TestCase):
+
+    def setUp(self):
+        timing_stats.clear()
+        self.addCleanup(timing_stats.clear)
+        bulk_upload_data([("A00000001", 5)], **UPLOAD_FORM)
+        self.admin = User.objects.create_superuser("admin", password="pass")
+
+    def test_percentiles_use_nearest_rank(self):
+        stats = TimingStats(window=100)
+        for wall_ms in range(100, 0, -1):
+            stats.record("api_data", wall_ms, wall_ms / 10, 3)
+        stats.record("export", 7, 1, 2)
+        self.assertEqual(stats.summary(), {
+            "api_data": {"count": 100, "p50_ms": 50, "p95_ms": 95, "p99_ms": 99, "mean_db_ms": 5.05,
+                         "mean_queries": 3},
+            "export": {"count": 1, "p50_ms": 7, "p95_ms": 7, "p99_ms": 7, "mean_db_ms": 1, "mean_queries": 2},
+        })
+
+    def test_window_keeps_the_latest_samples(self):
+        stats = TimingStats(window=3)
+        for wall_ms in (1000, 1, 2, 3):
+            stats.record("api_data", wall_ms, 0, 0)
+        self.assertEqual((stats.summary()["api_data"]["count"], stats.summary()["api_data"]["p99_ms"]), (3, 3))
+
+    def test_responses_carry_server_timing_and_feed_the_stats(self):
+        self.client.force_login(self.admin)
+        response = self.client.get("/api/data/all/")
+        self.assertRegex(response["Server-Timing"], r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries"$')
+        queries = int(response["Server-Timing"].rsplit('"', 2)[1].split()[0])
+        self.assertGreater(queries, 0)
+
+        results = self.client.get("/api/request-timing/").json()["results"]
+        self.assertEqual(results["api_data"]["count"], 1)
+        self.assertEqual(results["api_data"]["mean_queries"], queries)
+
+    def test_slow_requests_are_logged_with_their_queries(self):
+        self.client.force_login(self.admin)
+        with override_settings(SLOW_REQUEST_MS=0), self.assertLogs("accreditation.middleware", "WARNING") as logs:
+            self.client.get("/api/data/all/")
+        self.assertIn("Slow request GET /api/data/all/ (api_data)", logs.output[0])
+        self.assertIn("SELECT", logs.output[0])
+
+    def test_disabled_middleware_adds_no_header(self):
+        self.client.force_login(self.admin)
+        with override_settings(REQUEST_TIMING_ENABLED=False):
+            self.assertFalse(self.client.get("/api/data/all/").has_header("Server-Timing"))
+
+    def test_timing_api_is_staff_only(self):
+        self.client.force_login(User.objects.create_user("bob", password="pass"))
+        self.assertEqual(self.client.get("/api/request-timing/").status_code, 302)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class UploadJobQueueTests(TestCase):
+
+    def test_jobs_are_claimed_once_in_order(self):
+        first = UploadJobDAO.enqueue(student_csv(3), UPLOAD_FORM)
+        second = UploadJobDAO.enqueue(student_csv(3), UPLOAD_FORM)
+        self.assertEqual(UploadJobDAO.claim_next("a").pk, first.pk)
+        self.assertEqual(UploadJobDAO.claim_next("b").pk, second.pk)
+        self.assertIsNone(UploadJobDAO.claim_next("c"))
+
+    def test_successful_job_records_rows_and_removes_file(self):
+        UploadJobDAO.enqueue(student_csv(25), UPLOAD_FORM)
+        job = UploadJobDAO.run(UploadJobDAO.claim_next())
+        self.assertEqual(job.status, UploadJob.SUCCEEDED)
+        self.assertEqual((job.total_rows, job.inserted_rows), (25, 25))
+        self.assertEqual(StudentResult.objects.filter(submission=job.submission).count(), 25)
+        self.assertFalse(job.file)
+
+    def test_stale_heartbeats_are_requeued(self):
+        UploadJobDAO.enqueue(student_csv(3), UPLOAD_FORM)
+        UploadJobDAO.enqueue(student_csv(3), UPLOAD_FORM)
+        long_running, abandoned = UploadJobDAO.claim_next("a"), UploadJobDAO.claim_next("b")
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        # A job started long ago whose worker is still beating is left alone
+        UploadJob.objects.filter(pk=long_running.pk).update(started_at=an_hour_ago)
+        UploadJob.objects.filter(pk=abandoned.pk).update(started_at=an_hour_ago, heartbeat_at=an_hour_ago)
+
+        self.assertEqual(UploadJobDAO.requeue_stale(timedelta(minutes=5)), 1)
+        self.assertEqual(UploadJobDAO.get(long_running.pk).status, UploadJob.RUNNING)
+        self.assertEqual(UploadJobDAO.get(abandoned.pk).status, UploadJob.QUEUED)
+
+    def test_rejected_job_keeps_errors(self):
+        UploadJobDAO.enqueue(student_csv(5), {**UPLOAD_FORM, "question_max": 0})
+        job = UploadJobDAO.run(UploadJobDAO.claim_next())
+        self.assertEqual(job.status, UploadJob.FAILED)
+        self.assertIn("question_max", job.form_errors)
+        self.assertFalse(StudentResult.objects.exists())
+
+
+class DatabaseProfileTests(SimpleTestCase):
+
+    def test_sqlite_path_is_separate_from_the_postgres_name(self):
+        env = {"ACCREDITATION_DB_PROFILE": "sqlite", "DB_NAME": "accreditation_db", "SQLITE_PATH": "/tmp/dev.sqlite3"}
+        self.assertEqual(database_settings(Path("/srv"), env)["default"]["NAME"], "/tmp/dev.sqlite3")
+        env = {"ACCREDITATION_DB_PROFILE": "sqlite", "DB_NAME": "accreditation_db"}
+        self.assertEqual(database_settings(Path("/srv"), env)["default"]["NAME"], "/srv/db.sqlite3")
+
+    def test_pool_requires_psycopg_pool(self):
+        env = {"DB_POOL_MAX_SIZE": "8"}
+        with mock.patch("bcit_accreditation.db_profiles.find_spec", return_value=None):
+            with self.assertRaises(ImproperlyConfigured):
+                database_settings(Path("/srv"), env)
+        with mock.patch("bcit_accreditation.db_profiles.find_spec", return_value=object()):
+            database = database_settings(Path("/srv"), env)["default"]
+        self.assertEqual((database["CONN_MAX_AGE"], database["OPTIONS"]["pool"]["max_size"]), (0, 8))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class UploadJobHeartbeatTests(TransactionTestCase):
+
+    def test_heartbeat_advances_while_the_job_runs(self):
+        UploadJobDAO.enqueue(student_csv(3), UPLOAD_FORM)
+        job = UploadJobDAO.claim_next("a")
+        UploadJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        with UploadJobDAO.heartbeat(job, interval=0.05):
+            time.sleep(0.5)
+        self.assertGreater(UploadJobDAO.get(job.pk).heartbeat_at, timezone.now() - timedelta(minutes=1))
+        self.assertEqual(UploadJobDAO.requeue_stale(timedelta(minutes=5)), 0)
+
+
+class BatchComputationTests(SimpleTestCase):
+    """The batch helpers must reproduce the scalar functions exactly."""
+
+    def test_achievement_levels_match_scalar(self):
+        scores = [cents / 100 for cents in range(1, 100000, 3)]
+        for question_max in (1, 3, 7, 10, 12, 30, 45, 99):
+            levels = get_achievement_levels(scores, question_max).tolist()
+            expected = [round(get_achievement_level(score, question_max), 2) for score in scores]
+            self.assertEqual([repr(level) for level in levels], [repr(level) for level in expected])
+
+    def test_decimals_match_scalar_conversion(self):
+        levels = get_achievement_levels([1, 5, 6.5, 10], 10)
+        self.assertEqual([str(d) for d in levels_to_decimals(levels)],
+                         [str(Decimal(str(level))) for level in levels.tolist()])
+
+    def test_cohorts_match_scalar(self):
+        pairs = [(program_term, f"{year}{term}") for program_term in range(1, 9)
+                 for year in range(2019, 2027) for term in (10, 20, 30)]
+        self.assertEqual(get_cohorts(*zip(*pairs)), [get_cohort(*pair) for pair in pairs])
+
+    def test_invalid_inputs_raise_like_scalar(self):
+        with self.assertRaises(ValueError):
+            get_cohorts([9], ["202410"])
+        with self.assertRaises(ValueError):
+            get_achievement_levels([1, 2], 0)
+
+
+class BatchValidationTests(SimpleTestCase):
+    """validate_result_rows() must accept and reject exactly what per-row full_clean() does."""
+
+    def full_clean_errors(self, student_id, gai_score):
+        try:
+            StudentResult(student_id=student_id, gai_score=gai_score, achievement_level=Decimal("0.5")).full_clean(
+                exclude=["submission"])
+        except ValidationError as e:
+            return e.message_dict
+        return {}
+
+    def test_errors_match_full_clean(self):
+        records = [("A00000001", 5), ("A0000001", "7.5"), ("A000001", 5), ("", 5), (None, 3), (123456789, 2),
+                   ("A00000002", 0), ("A00000003", "x"), ("A00000004", 1000), ("A00000005", Decimal("2.555")),
+                   ("A000000061", 5), ("A00000007", None)]
+        rows, row_errors = validate_result_rows(records, 10)
+        self.assertEqual(rows, [])
+        expected = [(number, errors) for number, errors in
+                    ((number, self.full_clean_errors(*record)) for number, record in enumerate(records, start=1))
+                    if errors]
+        self.assertEqual([(error["row"], error["errors"]) for error in row_errors], expected)
+
+    def test_valid_rows_are_converted_like_full_clean(self):
+        records = [("A00000001", 5), ("A00000002", "7.5"), (123456789, 10), ("A00000003", Decimal("5.00"))]
+        rows, row_errors = validate_result_rows(records, 10)
+        self.assertEqual(row_errors, [])
+        self.assertEqual([(student_id, str(score), str(level)) for student_id, score, level in rows],
+                         [("A00000001", "5", "0.5"), ("A00000002", "7.5", "0.75"), ("123456789", "10", "1.0"),
+                          ("A00000003", "5.00", "0.5")])
+
+
+class ReuploadTests(TestCase):
+
+    def setUp(self):
+        self.records = [(f"A{number:08d}", 5) for number in range(10)]
+        self.first = bulk_upload_data(self.records, **UPLOAD_FORM)
+
+    def test_identical_reupload_writes_nothing(self):
+        report = bulk_upload_data(list(reversed(self.records)), **UPLOAD_FORM)
+        self.assertTrue(report["duplicate"])
+        self.assertEqual(report["submission_id"], self.first["submission_id"])
+        self.assertEqual(StudentResult.objects.count(), 10)
+
+    def test_corrected_reupload_only_writes_changed_rows(self):
+        records = [*self.records[:9], ("A00000009", 7), ("A00000010", 6)]
+        report = bulk_upload_data(records, **UPLOAD_FORM)
+        self.assertEqual((report["inserted"], report["updated"], report["unchanged"]), (1, 1, 9))
+        self.assertEqual(Submission.objects.count(), 1)
+        self.assertEqual(StudentResult.objects.get(student_id="A00000009").gai_score, 7)
+
+    def test_unchanged_subset_reupload_keeps_the_data_version(self):
+        version = DataVersion.objects.get().version
+        report = bulk_upload_data(self.records[:3], **UPLOAD_FORM)
+        self.assertEqual((report["duplicate"], report["inserted"], report["updated"], report["unchanged"]),
+                         (False, 0, 0, 3))
+        self.assertEqual(DataVersion.objects.get().version, version)
+        # The new fingerprint is still recorded, so the same subset is a duplicate next time
+        self.assertTrue(bulk_upload_data(self.records[:3], **UPLOAD_FORM)["duplicate"])
+
+    def test_other_instructors_section_is_a_separate_assessment(self):
+        report = bulk_upload_data([("B00000001", 5)], **{**UPLOAD_FORM, "instr_first_name": "Sam",
+                                                          "instr_last_name": "Lee"})
+        self.assertNotEqual(report["submission_id"], self.first["submission_id"])
+        self.assertEqual(Submission.objects.get(pk=self.first["submission_id"]).instr_last_name, "Chen")
+        self.assertEqual(StudentResult.objects.filter(submission_id=self.first["submission_id"]).count(), 10)
+
+    def test_changed_question_max_recomputes_students_missing_from_reupload(self):
+        report = bulk_upload_data(self.records[:2], **{**UPLOAD_FORM, "question_max": 20})
+        self.assertEqual(report["updated"], 10)
+        self.assertEqual(set(StudentResult.objects.values_list("achievement_level", flat=True)), {Decimal("0.25")})
+        summary = GAIAchievementSummary.objects.get(program="ELEX", term="202410", ga="GA1", gai="1.1")
+        self.assertEqual((summary.count, summary.total), (10, Decimal("2.5")))
+
+    def test_natural_key_is_unique_for_uploads(self):
+        submission = Submission.objects.get(pk=self.first["submission_id"])
+        submission.pk, submission.fingerprint = None, "0" * 64
+        with self.assertRaises(IntegrityError):
+            submission.save()
+
+    def test_concurrent_insert_is_retried_as_reupload(self):
+        # The first lookup misses the committed assessment, as a racing worker's would
+        lookup = Submission.objects.select_for_update
+        calls = []
+
+        def racing_lookup(*args, **kwargs):
+            calls.append(1)
+            queryset = lookup(*args, **kwargs)
+            return queryset.none() if len(calls) == 1 else queryset
+
+        with mock.patch.object(Submission.objects, "select_for_update", side_effect=racing_lookup):
+            report = bulk_upload_data([*self.records, ("A00000010", 6)], **UPLOAD_FORM)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual((report["submission_id"], report["inserted"]), (self.first["submission_id"], 1))
+        self.assertEqual(Submission.objects.count(), 1)
+
+
+class BatchUploadTests(TestCase):
+
+    def archive(self, files, manifest):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as zip_file:
+            for name, data in files.items():
+                zip_file.writestr(name, data)
+            zip_file.writestr("manifest.json", json.dumps(manifest))
+        buffer.seek(0)
+        return buffer
+
+    def test_each_file_is_reported_separately(self):
+        files = {"quiz1.csv": student_csv(4).read(), "quiz2.csv": student_csv(6).read(), "notes.txt": b"x"}
+        manifest = [
+            {**UPLOAD_FORM, "file": "quiz1.csv"},
+            {**UPLOAD_FORM, "file": "quiz2.csv", "assess_title": "Quiz 2"},
+            {**UPLOAD_FORM, "file": "quiz1.csv", "question_max": 0},
+            {**UPLOAD_FORM, "file": "missing.csv"},
+        ]
+        report = process_batch(self.archive(files, manifest), workers=2)
+        self.assertEqual([result["status"] for result in report["results"]],
+                         ["inserted", "inserted", "failed", "failed"])
+        self.assertEqual((report["succeeded"], report["inserted"]), (2, 10))
+        self.assertEqual(report["unlisted"], ["notes.txt"])
+        self.assertEqual(Submission.objects.count(), 2)
+
+    def test_cohorts_are_looked_up_once_per_batch(self):
+        files = {f"quiz{number}.csv": student_csv(2).read() for number in range(3)}
+        manifest = [{**UPLOAD_FORM, "file": name, "assess_title": name, "prog_term": 3} for name in files]
+        with mock.patch.object(batch, "get_cohorts", wraps=get_cohorts) as lookup, \
+                mock.patch.object(database, "get_cohort", wraps=get_cohort) as scalar:
+            process_batch(self.archive(files, manifest), workers=1)
+        lookup.assert_called_once()
+        scalar.assert_not_called()
+        self.assertEqual(set(Submission.objects.values_list("cohort", flat=True)), {get_cohort(3, "202410")})
+
+        # An invalid pair anywhere in the batch leaves each file to derive, and report, its own cohort
+        manifest = [{**UPLOAD_FORM, "file": "quiz0.csv", "assess_title": "Quiz 9", "prog_term": 9},
+                    {**UPLOAD_FORM, "file": "quiz1.csv", "assess_title": "Quiz 10"}]
+        report = process_batch(self.archive(files, manifest), workers=1)
+        self.assertEqual([result["status"] for result in report["results"]], ["failed", "inserted"])
+        self.assertIn("prog_term", report["results"][0]["form_errors"])
+
+    def test_files_are_read_as_they_are_parsed(self):
+        files = {f"quiz{number}.csv": student_csv(2).read() for number in range(6)}
+        manifest = [{**UPLOAD_FORM, "file": name, "assess_title": name} for name in files]
+        read = []
+        real_read = zipfile.ZipFile.read
+        with mock.patch.object(zipfile.ZipFile, "read", lambda zip_file, name, *args: read.append(name) or
+                               real_read(zip_file, name, *args)):
+            with mock.patch.object(batch, "FILES_IN_FLIGHT_PER_WORKER", 1):
+                progress = []
+                report = process_batch(self.archive(files, manifest), workers=2,
+                                       progress=lambda done, inserted: progress.append((done, len(read))))
+        self.assertEqual(report["inserted"], 12)
+        # With two workers and one file each in flight, no more than three files are read ahead
+        self.assertTrue(all(count - done <= 3 for done, count in progress), progress)
+
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+    def test_upload_is_queued_for_the_worker(self):
+        self.client.force_login(User.objects.create_user("instructor", password="pass"))
+        files = {"quiz1.csv": student_csv(4).read()}
+        archive = SimpleUploadedFile("batch.zip", self.archive(files, [{**UPLOAD_FORM, "file": "quiz1.csv"}]).read())
+        response = self.client.post("/form/batch-submit/", {"zip_file": archive})
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(Submission.objects.exists())
+
+        job = UploadJobDAO.claim_next()
+        self.assertEqual(job.kind, UploadJob.BATCH)
+        job = batch.run_batch_job(job)
+        self.assertEqual((job.status, job.total_rows, job.processed_rows, job.inserted_rows),
+                         (UploadJob.SUCCEEDED, 1, 1, 4))
+        status = self.client.get(response.json()["status_url"]).json()
+        self.assertTrue(status["done"])
+        self.assertEqual(status["report"]["results"][0]["status"], "inserted")
+        self.assertFalse(job.file)
+
+    def test_unusable_archive_is_rejected_before_queueing(self):
+        self.client.force_login(User.objects.create_user("instructor", password="pass"))
+        response = self.client.post("/form/batch-submit/", {"zip_file": SimpleUploadedFile("batch.zip", b"not a zip")})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(UploadJob.objects.exists())
+
+
+class PaginationTests(TestCase):
+
+    def setUp(self):
+        # Scores repeat, so keyset pages have to break ties on id
+        bulk_upload_data([(f"A{number:08d}", number % 4 + 1) for number in range(10)], **UPLOAD_FORM)
+        self.client.force_login(User.objects.create_superuser("admin", password="pass"))
+        rows = StudentResult.objects.values_list("id", "gai_score")
+        self.by_score_desc = [id for id, _ in sorted(rows, key=lambda row: (-row[1], -row[0]))]
+
+    def page(self, **params):
+        response = self.client.get("/api/data/all/", {"sort_by": "gai_score", "sort_order": "desc", **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_offset_pages_are_sorted_and_numbered(self):
+        data = self.page(page=2, page_size=4)
+        self.assertEqual([row["id"] for row in data["results"]], self.by_score_desc[4:8])
+        pagination = data["pagination"]
+        self.assertEqual((pagination["current_page"], pagination["total_pages"], pagination["total_records"]),
+                         (2, 3, 10))
+        self.assertEqual((pagination["start_record"], pagination["end_record"]), (5, 8))
+
+        last = self.page(page=3, page_size=4)["pagination"]
+        self.assertEqual((last["start_record"], last["end_record"], last["next_cursor"]), (9, 10, None))
+
+    def test_cursor_pages_follow_on_from_each_other(self):
+        ids, positions = [], []
+        data = self.page(page_size=3)
+        while True:
+            ids += [row["id"] for row in data["results"]]
+            positions.append((data["pagination"]["start_record"], data["pagination"]["end_record"]))
+            if not data["pagination"]["next_cursor"]:
+                break
+            data = self.page(page_size=3, after=data["pagination"]["next_cursor"])
+        self.assertEqual(ids, self.by_score_desc)
+        self.assertEqual(positions, [(1, 3), (4, 6), (7, 9), (10, 10)])
+
+    def test_cursor_pages_do_not_count_the_remaining_rows(self):
+        first = database.get_flattened_page(page_size=3, sort_by="gai_score", sort_order="desc")
+        # The total is counted by count_flattened(), once per filters and data version
+        with mock.patch.object(database, "count_flattened", return_value=10) as count:
+            # Keys, then the page's results and their submissions
+            with self.assertNumQueries(3):
+                page = database.get_flattened_page(page_size=3, sort_by="gai_score", sort_order="desc",
+                                                   after=first["next_cursor"])
+        count.assert_called_once_with(filters=None)
+        self.assertEqual((page["offset"], page["total_records"]), (3, 10))
+
+    def test_invalid_cursor_is_rejected(self):
+        for cursor in ("not-a-cursor", "WzFd"):
+            response = self.client.get("/api/data/all/", {"after": cursor})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()["error"], "Invalid cursor.")
+
+    def test_table_scope_lists_its_columns(self):
+        for table, fields in TABLE_FIELDS.items():
+            data = self.client.get(f"/api/data/{table}/", {"program": "NONE"}).json()
+            self.assertEqual((data["fields"], data["results"]), (fields, []))
+            data = self.client.get(f"/api/data/{table}/").json()
+            self.assertEqual([list(row) for row in data["results"]], [fields] * len(data["results"]))
+        self.assertEqual(self.client.get("/api/data/students/").status_code, 404)
+
+
+class ChangeFeedTests(TestCase):
+
+    def setUp(self):
+        self.first = bulk_upload_data([(f"A{number:08d}", 5) for number in range(5)], **UPLOAD_FORM)
+        self.watermark = get_changes()["watermark"]
+
+    def test_feed_returns_only_the_delta(self):
+        second = bulk_upload_data([("B00000001", 6)], **{**UPLOAD_FORM, "assess_title": "Quiz 2"})
+        first_ids = list(StudentResult.objects.filter(submission_id=self.first["submission_id"])
+                         .order_by("id").values_list("id", flat=True))
+        StudentResultDAO.update(first_ids[0], gai_score=Decimal("7"))
+        StudentResultDAO.delete(first_ids[1])
+
+        changes = get_changes(since=self.watermark)
+        self.assertEqual(sorted(row["id"] for row in changes["rows"]),
+                         sorted([first_ids[0], *StudentResult.objects.filter(
+                             submission_id=second["submission_id"]).values_list("id", flat=True)]))
+        self.assertEqual(changes["deleted"], [first_ids[1]])
+        self.assertEqual(get_changes(since=changes["watermark"])["rows"], [])
+
+    def test_corrected_reupload_returns_only_the_corrected_row(self):
+        records = [(f"A{number:08d}", 5) for number in range(5)]
+        bulk_upload_data([*records[:4], ("A00000004", 8)], **UPLOAD_FORM)
+        changes = get_changes(since=self.watermark)
+        self.assertEqual([(row["student_id"], row["gai_score"]) for row in changes["rows"]],
+                         [("A00000004", Decimal("8.00"))])
+
+        bulk_upload_data(records[:3], **UPLOAD_FORM)
+        self.assertEqual(get_changes(since=changes["watermark"])["rows"], [])
+
+        bulk_upload_data(records[:3], **{**UPLOAD_FORM, "instr_comments": "Revised"})
+        self.assertEqual(len(get_changes(since=changes["watermark"])["rows"]), 5)
+
+    def test_header_update_and_delete_reach_every_row(self):
+        SubmissionDAO.update(self.first["submission_id"], instr_comments="Revised")
+        self.assertEqual(len(get_changes(since=self.watermark)["rows"]), 5)
+        watermark = get_changes()["watermark"]
+        SubmissionDAO.delete(self.first["submission_id"])
+        self.assertEqual(len(get_changes(since=watermark)["deleted"]), 5)
+
+    def test_cursor_pages_through_a_large_delta(self):
+        pages = [get_changes(page_size=2)]
+        while pages[-1]["next_cursor"]:
+            pages.append(get_changes(cursor=pages[-1]["next_cursor"], page_size=2))
+        self.assertEqual(len([row for page in pages for row in page["rows"]]), 5)
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        bulk_upload_data([("A00000001", 5)], **UPLOAD_FORM)
+        self.client.force_login(User.objects.create_superuser("admin", password="pass"))
+
+    def test_unchanged_data_is_not_resent(self):
+        response = self.client.get("/api/data/all/")
+        with self.assertNumQueries(3):  # session, user and the data version
+            revalidated = self.client.get("/api/data/all/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(revalidated.status_code, 304)
+
+        bulk_upload_data([("A00000002", 5)], **{**UPLOAD_FORM, "assess_title": "Quiz 2"})
+        changed = self.client.get("/api/data/all/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], response["ETag"])
+
+    def test_last_modified_moves_with_writes(self):
+        response = self.client.get("/api/data/all/")
+        DataVersion.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        stale = self.client.get("/api/data/all/")
+        self.assertLess(parse_http_date(stale["Last-Modified"]), parse_http_date(response["Last-Modified"]))
+
+        bulk_upload_data([("A00000002", 5)], **{**UPLOAD_FORM, "assess_title": "Quiz 2"})
+        changed = self.client.get("/api/data/all/", HTTP_IF_MODIFIED_SINCE=stale["Last-Modified"])
+        self.assertEqual(changed.status_code, 200)
+
+
+class CacheInvalidationTests(TransactionTestCase):
+    """Every DAO write must bump the data version, so no cached read outlives it."""
+
+    # TestCase wraps each test in a transaction, where versioned_cache is bypassed
+    READS = [
+        (database.get_flattened_page, ()),
+        (database.count_flattened, ()),
+        (database.get_achievement_summaries, ()),
+        (database.find_student_rows, ("A00000001",)),
+        (database.get_dashboard_stats, ()),
+        (get_student_profile, ("A00000001",)),
+    ]
+
+    def setUp(self):
+        caches["results"].clear()
+        self.addCleanup(caches["results"].clear)
+        bulk_upload_data([("A00000001", 5), ("A00000002", 6)], **UPLOAD_FORM)
+        self.submission = Submission.objects.get()
+        self.result = StudentResult.objects.get(student_id="A00000001")
+
+    def read_all(self):
+        return [read(*args) for read, args in self.READS]
+
+    def assertWriteInvalidates(self, write):
+        before = self.read_all()
+        write()
+        after = self.read_all()
+        self.assertNotEqual(after, before)
+        self.assertEqual(after, [read.uncached(*args) for read, args in self.READS])
+
+    def test_reads_are_cached_until_the_next_write(self):
+        before = self.read_all()
+        StudentResult.objects.filter(pk=self.result.pk).update(gai_score=9)
+        self.assertEqual(self.read_all(), before)
+
+    def test_bulk_upload_invalidates(self):
+        self.assertWriteInvalidates(lambda: bulk_upload_data([("A00000001", 9)],
+                                                             **{**UPLOAD_FORM, "assess_title": "Quiz 2"}))
+
+    def test_submission_writes_invalidate(self):
+        self.assertWriteInvalidates(lambda: SubmissionDAO.insert(
+            **{**UPLOAD_FORM, "cohort": self.submission.cohort, "course": "ELEX 3333"}))
+        self.assertWriteInvalidates(lambda: SubmissionDAO.update(self.submission.pk, course="ELEX 2222", gai="1.2"))
+        self.assertWriteInvalidates(lambda: SubmissionDAO.delete(self.submission.pk))
+
+    def test_student_result_writes_invalidate(self):
+        self.assertWriteInvalidates(lambda: StudentResultDAO.insert(
+            submission=self.submission, student_id="A00000001", gai_score=8, achievement_level=Decimal("0.80")))
+        self.assertWriteInvalidates(lambda: StudentResultDAO.update(
+            self.result.pk, gai_score=9, achievement_level=Decimal("0.90")))
+        self.assertWriteInvalidates(lambda: StudentResultDAO.delete(self.result.pk))
+
+    def test_rebuilds_invalidate(self):
+        # Skew the derived tables without a version bump, so each rebuild has something to correct
+        GAIAchievementSummary.objects.update(count=F("count") + 5, total=F("total") + 5)
+        StudentGAIProfile.objects.update(count=F("count") + 5, total=F("total") + 5)
+        self.assertWriteInvalidates(GAISummaryDAO.rebuild)
+        self.assertWriteInvalidates(StudentProfileDAO.rebuild)
+
+
+class AnalyticsSnapshotTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.settings_override = override_settings(ANALYTICS_SNAPSHOT_DIR=directory)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.client.force_login(User.objects.create_superuser("admin", password="pass"))
+
+    def test_api_serves_the_built_snapshot_without_refreshing(self):
+        self.assertEqual(self.client.get("/api/analytics-snapshot/").status_code, 404)
+
+        bulk_upload_data([(f"A{number:08d}", 5) for number in range(3)], **UPLOAD_FORM)
+        self.assertEqual(snapshot.refresh_snapshot()["mode"], "full")
+        bulk_upload_data([(f"B{number:08d}", 5) for number in range(2)], **{**UPLOAD_FORM, "assess_title": "Quiz 2"})
+
+        response = self.client.get("/api/analytics-snapshot/?format=csv")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Snapshot-Rows"], "3")
+        self.assertEqual(snapshot.read_meta()["rows"], 3)
+
+        meta = snapshot.refresh_snapshot()
+        self.assertEqual((meta["mode"], meta["rows"]), ("append", 5))
+
+    def test_add_only_reupload_is_appended(self):
+        records = [(f"A{number:08d}", 5) for number in range(3)]
+        bulk_upload_data(records, **UPLOAD_FORM)
+        snapshot.refresh_snapshot()
+        bulk_upload_data([*records, ("A00000003", 6)], **UPLOAD_FORM)
+        meta = snapshot.refresh_snapshot()
+        self.assertEqual((meta["mode"], meta["rows"]), ("append", 4))
+
+        bulk_upload_data([("A00000000", 7)], **UPLOAD_FORM)
+        self.assertEqual(snapshot.refresh_snapshot()["mode"], "full")
+
+    def test_refreshes_wait_for_the_lock(self):
+        started = []
+        with mock.patch.object(snapshot, "build_snapshot", side_effect=lambda full: started.append(full)):
+            with snapshot.snapshot_lock():
+                thread = threading.Thread(target=snapshot.refresh_snapshot)
+                thread.start()
+                thread.join(0.3)
+                self.assertEqual(started, [])
+            thread.join(5)
+        self.assertEqual(started, [False])
+
+
+class ColumnarResponseTests(TestCase):
+
+    def setUp(self):
+        bulk_upload_data([(f"A{number:08d}", 5) for number in range(3)], **UPLOAD_FORM)
+        self.client.force_login(User.objects.create_superuser("admin", password="pass"))
+
+    def test_columnar_page_decodes_to_the_row_page(self):
+        rows = self.client.get("/api/data/all/").json()["results"]
+        page = self.client.get("/api/data/all/?format=columnar").json()
+        decoded = [
+            {field: (page["dictionaries"][field][values[index]] if field in page["dictionaries"] else values[index])
+             for field, values in page["columns"].items()}
+            for index in range(page["row_count"])
+        ]
+        self.assertEqual(page["dictionaries"]["program"], ["ELEX"])
+        decimals = ("assess_weight", "total_score", "gai_score")
+        self.assertEqual([{**row, **{field: float(row[field]) for field in decimals}} for row in rows], decoded)
+
+    def test_large_responses_are_compressed(self):
+        response = self.client.get("/api/data/all/?format=columnar", HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertIn(response["Content-Encoding"], ("br", "gzip"))
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_compressed_content_is_passed_through(self):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip, br")
+        body = b"0" * 10000
+        for content_type, disposition in (
+                ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", ""),
+                ("application/zip", ""),
+                ("application/gzip", 'attachment; filename="results.csv.gz"'),
+                ("application/octet-stream", 'attachment; filename="scores.npz"'),
+                ("text/csv", 'attachment; filename="results.csv.gz"')):
+            response = HttpResponse(body, content_type=content_type)
+            if disposition:
+                response["Content-Disposition"] = disposition
+            response = CompressionMiddleware(lambda request: response)(request)
+            self.assertFalse(response.has_header("Content-Encoding"), content_type)
+            self.assertEqual(response.content, body)
+
+
+class GAISummaryTests(TestCase):
+
+    def summary_rows(self):
+        return sorted(GAIAchievementSummary.objects.filter(count__gt=0).values_list(
+            "program", "term", "ga", "gai", "count", "total", "total_sq", "below_count", "marginal_count",
+            "meets_count", "exceeds_count"))
+
+    def test_incremental_summaries_match_rebuild(self):
+        first = bulk_upload_data([("A00000001", 5), ("A00000002", 8), ("A00000003", 3)], **UPLOAD_FORM)
+        bulk_upload_data([("A00000001", 9)], **{**UPLOAD_FORM, "assess_title": "Quiz 2", "gai": "1.2"})
+        bulk_upload_data([("A00000001", 4)], **{**UPLOAD_FORM, "term": "202420", "assess_title": "Quiz 3"})
+        # Re-upload with a changed score and question_max, then edits and deletes through the DAOs
+        bulk_upload_data([("A00000001", 6), ("A00000002", 8), ("A00000004", 7)], **{**UPLOAD_FORM, "question_max": 9})
+        SubmissionDAO.update(first["submission_id"], term="202430")
+        StudentResultDAO.update(StudentResult.objects.get(student_id="A00000004").pk, achievement_level=Decimal("0.9"))
+        StudentResultDAO.delete(StudentResult.objects.get(student_id="A00000002").pk)
+
+        incremental = self.summary_rows()
+        self.assertEqual(GAISummaryDAO.rebuild(), 3)
+        self.assertEqual(incremental, self.summary_rows())
+
+    def test_migration_populates_summaries_from_results(self):
+        bulk_upload_data([("A00000001", 5), ("A00000002", 8)], **UPLOAD_FORM)
+        expected = self.summary_rows()
+        GAIAchievementSummary.objects.all().delete()
+
+        import_module("accreditation.migrations.0017_populate_gai_summaries").forwards(apps, None)
+        self.assertEqual(expected, self.summary_rows())
+
+
+class StudentProfileTests(TestCase):
+
+    def profile_rows(self):
+        return sorted(StudentGAIProfile.objects.values_list("student_id", "program", "term", "ga", "gai", "count",
+                                                            "total", "latest_level", "latest_result_id"))
+
+    def test_incremental_profiles_match_rebuild(self):
+        first = bulk_upload_data([("A00000001", 5), ("A00000002", 8)], **UPLOAD_FORM)
+        bulk_upload_data([("A00000001", 9)], **{**UPLOAD_FORM, "assess_title": "Quiz 2"})
+        bulk_upload_data([("A00000001", 4)], **{**UPLOAD_FORM, "term": "202420", "assess_title": "Quiz 3"})
+        bulk_upload_data([("A00000001", 6), ("A00000002", 8)], **UPLOAD_FORM)
+        SubmissionDAO.update(first["submission_id"], gai="1.2")
+        StudentResultDAO.delete(StudentResult.objects.get(student_id="A00000002").pk)
+
+        incremental = self.profile_rows()
+        StudentProfileDAO.rebuild()
+        self.assertEqual(incremental, self.profile_rows())
+
+        profile = get_student_profile("A00000001")
+        gais = {entry["gai"]: entry for entry in profile["gas"][0]["gais"]}
+        self.assertEqual(gais["1.1"]["count"], 2)
+        self.assertEqual([term["term"] for term in gais["1.1"]["terms"]], ["202410", "202420"])
+        self.assertEqual((gais["1.1"]["latest_term"], gais["1.1"]["latest"]), ("202420", 0.4))
+        self.assertEqual(gais["1.2"]["latest"], 0.6)
+        self.assertIsNone(get_student_profile("A00000002"))
+
+    def test_migration_populates_profiles_from_results(self):
+        bulk_upload_data([("A00000001", 5), ("A00000002", 8)], **UPLOAD_FORM)
+        bulk_upload_data([("A00000001", 9)], **{**UPLOAD_FORM, "assess_title": "Quiz 2"})
+        expected = self.profile_rows()
+        StudentGAIProfile.objects.all().delete()
+
+        import_module("accreditation.migrations.0018_populate_student_profiles").forwards(apps, None)
+        self.assertEqual(expected, self.profile_rows())
@@ -21,6 +21,7 @@ urlpatterns = [
     # path('form/step4/', views.form_step4_view, name='form_step4'),
     path('form/success/', views.form_success_view, name='form_success'),
     path('form/submit/', views.form_submit_view, name='form_submit'),
+    path('form/batch-submit/', views.batch_submit_view, name='batch_submit'),
     
     # Analytics page
     # path('analytics/', views.analytics_view, name='analytics'),
@@ -28,5 +29,11 @@ urlpatterns = [
     
     # API endpoint
     path('api/data/<str:table_name>/', views.api_data_view, name='api_data'),
+    path('api/changes/<str:table_name>/', views.api_changes_view, name='api_changes'),
     path('api/student-search/', views.student_search_api, name='api_student_search'),
+    path('api/students/<str:student_id>/profile/', views.student_profile_api, name='api_student_profile'),
+    path('api/achievement-summary/', views.achievement_summary_api, name='api_achievement_summary'),
+    path('api/upload-jobs/<int:job_id>/', views.upload_job_api, name='api_upload_job'),
+    path('api/analytics-snapshot/', views.analytics_snapshot_api, name='api_analytics_snapshot'),
+    path('api/request-timing/', views.request_timing_api, name='api_request_timing'),
 ]
\ No newline at end of file
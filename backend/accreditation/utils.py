@@ -1,6 +1,21 @@
 import openpyxl
-import io
+import numpy as np
+import codecs
 import csv
+import hashlib
+import io
+import json
+import logging
+from decimal import Decimal
+from itertools import islice
+
+logger = logging.getLogger(__name__)
+
+class UnsupportedFileType(ValueError):
+    """Raised when an upload is neither a .csv nor a .xlsx file."""
+
+# Student rows start on row 4 of the assessment template (title, header and a blank row above)
+FIRST_DATA_ROW = 4
 
 def get_cohort(program_term, academic_term):
     """
@@ -45,78 +60,188 @@ def get_achievement_level(gai_score, question_max):
         raise ValueError("Maximum question score cannot be zero.")
     return round(gai_score / question_max, 2)
 
+# (academic_term, program_term) -> cohort, filled from get_cohort() on first use
+_COHORT_TABLE = {}
+
+def get_cohorts(program_terms, academic_terms):
+    """
+    Batch version of get_cohort() for equal-length sequences of program and academic terms.
+    Each distinct pair is computed once by get_cohort() and served from a lookup table after that,
+    so results are identical to the scalar function. Raises the same ValueError for invalid pairs.
+    """
+    cohorts = []
+    for program_term, academic_term in zip(program_terms, academic_terms):
+        key = (int(academic_term), int(program_term))
+        cohort = _COHORT_TABLE.get(key)
+        if cohort is None:
+            cohort = _COHORT_TABLE[key] = get_cohort(program_term, academic_term)
+        cohorts.append(cohort)
+    return cohorts
+
+def get_achievement_levels(gai_scores, question_max):
+    """
+    Batch version of get_achievement_level() over an array of scores, returning a float64 array.
+    question_max may be a scalar or an array of the same length.
+
+    numpy rounds by scaling, which can differ from Python's correctly rounded round() when the scaled
+    value lands within float error of a .5 tie; those few elements are recomputed with the scalar function
+    so every result is bit-for-bit identical to get_achievement_level().
+    """
+    scores = np.asarray(gai_scores, dtype=np.float64)
+    maxima = np.broadcast_to(np.asarray(question_max, dtype=np.float64), scores.shape)
+    if (maxima == 0).any():
+        raise ValueError("Maximum question score cannot be zero.")
+
+    ratios = scores / maxima
+    levels = np.round(ratios, 2)
+    scaled = ratios * 100
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for index in np.flatnonzero(near_tie):
+        levels[index] = get_achievement_level(float(scores[index]), float(maxima[index]))
+    return levels
+
+def levels_to_decimals(levels):
+    """
+    Convert achievement levels to Decimal exactly as Decimal(str(level)) would, converting each distinct value once.
+    """
+    values = np.asarray(levels, dtype=np.float64).tolist()
+    decimals = {value: Decimal(str(value)) for value in set(values)}
+    return [decimals[value] for value in values]
+
+def canonical_value(value):
+    """Render a form or row value so equal values always hash the same (e.g. 10, 10.0 and Decimal('10.00'))."""
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return format(Decimal(str(value)).normalize(), 'f')
+    return str(value).strip()
+
+def upload_fingerprint(form, records):
+    """
+    Return a SHA-256 hex digest identifying an upload by its form fields and (student_id, gai_score) rows.
+    Rows are hashed in sorted order, so re-saving or re-sorting the same spreadsheet gives the same fingerprint.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps({key: canonical_value(value) for key, value in form.items()}, sort_keys=True).encode())
+    for student_id, gai_score in sorted((canonical_value(s), canonical_value(g)) for s, g in records):
+        digest.update(f"\n{student_id},{gai_score}".encode())
+    return digest.hexdigest()
+
+# bulk_upload_data() form fields, the form_submit_view POST names they are read from, and their converters
+UPLOAD_FORM_FIELDS = [
+    ('program', 'program', str),
+    ('course', 'course', str),
+    ('term', 'academicTerm', str),
+    ('prog_term', 'programTerm', int),
+    ('instr_first_name', 'facultyFirstName1', str),
+    ('instr_last_name', 'facultyFirstName2', str),
+    ('ga', 'graduateAttribute', str),
+    ('gai', 'graduateAttributeIndicator', str),
+    ('instr_level', 'instructionalLevel', str),
+    ('alignment', 'assessmentAlignment', str),
+    ('clos', 'courseLearningOutcomes', str),
+    ('assess_type', 'assessmentType', str),
+    ('assess_weight', 'courseWeighting', float),
+    ('assess_max', 'assessmentMaxScore', int),
+    ('total_score', 'assessmentTotalScore', float),
+    ('question_max', 'gaiMaxPoints', int),
+    ('assess_title', 'assessmentTitle', str),
+    ('assess_descript', 'assessmentDescription', str),
+    ('quest_text', 'questionText', str),
+    ('instr_comments', 'assessmentComments', str),
+]
+
+def upload_form(data):
+    """
+    Build the bulk_upload_data() form fields from a mapping keyed by either the form field names
+    or the POST names of the multi-step form. Raises ValueError or TypeError for missing or
+    non-numeric numeric fields; missing text fields are None and left to model validation.
+    """
+    form = {}
+    for field, post_name, convert in UPLOAD_FORM_FIELDS:
+        value = data.get(field, data.get(post_name))
+        form[field] = value if convert is str else convert(value)
+    return form
+
+def iter_sheet_rows(uploaded_file, first_row=FIRST_DATA_ROW):
+    """
+    Lazily yield the rows of an uploaded CSV or XLSX file as tuples, starting at first_row (1-based).
+    CSV is decoded incrementally and XLSX is streamed with openpyxl's read-only mode,
+    so memory stays flat regardless of file size.
+    Raises UnsupportedFileType for anything other than .csv or .xlsx.
+    """
+    file_name = uploaded_file.name.lower()
+
+    if file_name.endswith('.csv'):
+        lines = codecs.iterdecode(uploaded_file, 'utf-8')
+        yield from islice(csv.reader(lines), first_row - 1, None)
+
+    elif file_name.endswith('.xlsx'):
+        wb = openpyxl.load_workbook(uploaded_file, read_only=True, data_only=True)
+        try:
+            yield from wb.active.iter_rows(min_row=first_row, values_only=True)
+        finally:
+            wb.close()
+
+    else:
+        raise UnsupportedFileType("Unsupported file type. Please upload a .csv or .xlsx file.")
+
+def iter_student_records(uploaded_file):
+    """
+    Lazily yield validated (student_id, gai_score) tuples from an uploaded CSV or XLSX file.
+    Student IDs are read from column B and must be 9 characters; scores are read from column C.
+    Rows that do not match are skipped.
+    """
+    row_count = 0
+    valid_count = 0
+
+    for row in iter_sheet_rows(uploaded_file):
+        row_count += 1
+
+        # Handle possible empty rows
+        if not row or len(row) < 3:
+            continue
+
+        student_id = str(row[1]).strip() if row[1] is not None else None
+        gai_score_raw = str(row[2]).strip() if row[2] is not None else None
+
+        if not student_id or len(student_id) != 9:
+            continue
+
+        try:
+            gai_score = int(float(gai_score_raw))  # Handle scores that might be decimal
+        except (ValueError, TypeError):
+            continue
+
+        valid_count += 1
+        yield student_id, gai_score
+
+    logger.debug("Processed %d rows, found %d valid entries", row_count, valid_count)
+
+def parse_student_file(name, data):
+    """
+    Return the (student_id, gai_score) records of a spreadsheet given as its file name and bytes.
+    Module-level and free of database access, so it can run in a worker process.
+    """
+    uploaded_file = io.BytesIO(data)
+    uploaded_file.name = name
+    return list(iter_student_records(uploaded_file))
+
 def read_csv(uploaded_file):
     """
     Process a CSV or XLSX file and extract student data.
-    Returns a list of (student_id, gai_score) tuples.
+    Returns a list of (student_id, gai_score) tuples and an error message (or None).
     """
     if not uploaded_file or not hasattr(uploaded_file, 'name'):
         return [], "Invalid file or no file uploaded"
-        
-    file_name = uploaded_file.name.lower()
-    
+
     try:
-        # Convert uploaded file to rows: list of lists
-        if file_name.endswith('.csv'):
-            file_content = uploaded_file.read().decode('utf-8')
-            csvfile = io.StringIO(file_content)
-            rows = list(csv.reader(csvfile))
-
-        elif file_name.endswith('.xlsx'):
-            wb = openpyxl.load_workbook(uploaded_file, data_only=True)
-            sheet = wb.active
-            rows = []
-            for row in sheet.iter_rows(values_only=True):
-                rows.append(list(row))
-        else:
-            return [], "Unsupported file type. Please upload a .csv or .xlsx file."
-
-        # For debugging, print the first few rows
-        print(f"Total rows: {len(rows)}")
-        for i in range(min(5, len(rows))):
-            print(f"Row {i}: {rows[i]}")
-
-        # Extract data starting from row 4 (index 3)
-        extracted_data = []
-        row_count = 0
-        valid_count = 0
-
-        for row in rows[3:]:
-            row_count += 1
-            try:
-                # Handle possible empty rows
-                if not row or len(row) < 3:
-                    continue
-                    
-                student_id = str(row[1]).strip() if row[1] is not None else None
-                gai_score_raw = str(row[2]).strip() if row[2] is not None else None
-
-                # Print for debugging
-                print(f"Processing: ID={student_id}, Score={gai_score_raw}")
-
-                if student_id and len(student_id) == 9:
-                    try:
-                        print("ADDING TO EXTRACTED DATA")
-                        gai_score = int(float(gai_score_raw))  # Handle scores that might be decimal
-                        extracted_data.append((student_id, gai_score))
-                        valid_count += 1
-                    except (ValueError, TypeError):
-                        print(f"Invalid score format: {gai_score_raw}")
-                        continue 
-                else:
-                    print(f"Invalid ID format: {student_id} (length: {len(student_id) if student_id else 0})")
-            except IndexError:
-                print(f"Index error for row: {row}")
-                continue  # Skip incomplete rows
-
-        print(f"Processed {row_count} rows, found {valid_count} valid entries")
-        
-        if not extracted_data:
-            return [], "No valid student data found. Check that your file has student IDs (9 digits) in column B starting from row 4, and numeric scores in column C."
-            
-        return extracted_data, None  # Return data and no error
-    
+        extracted_data = list(iter_student_records(uploaded_file))
+    except UnsupportedFileType as e:
+        return [], str(e)
     except Exception as e:
-        import traceback
-        print(traceback.format_exc())
-        return [], f"Error processing file: {str(e)}"  # Return empty list and error message
\ No newline at end of file
+        logger.exception("Error processing uploaded file")
+        return [], f"Error processing file: {str(e)}"  # Return empty list and error message
+
+    if not extracted_data:
+        return [], "No valid student data found. Check that your file has student IDs (9 digits) in column B starting from row 4, and numeric scores in column C."
+
+    return extracted_data, None  # Return data and no error
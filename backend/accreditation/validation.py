@@ -0,0 +1,92 @@
+"""
+Batch validation of the per-row columns of an upload.
+
+bulk_upload_data() validates the columns shared by every row once, on the Submission header.
+The StudentResult columns are checked here for the whole upload at once: student ID lengths and
+computed achievement levels with array operations, and scores once per distinct value, since an
+upload repeats the same few scores. Only rows that fail go through the model field validators
+individually, so the error messages are exactly the ones full_clean() would give.
+"""
+
+import numpy as np
+from django.core.exceptions import ValidationError
+
+from .models import StudentResult
+from .utils import get_achievement_levels, levels_to_decimals
+
+
+def result_field(name):
+    return StudentResult._meta.get_field(name)
+
+
+def field_errors(field, value):
+    """Return (cleaned value, None) or (value, error messages) for one value of a model field."""
+    try:
+        return field.clean(value, None), None
+    except ValidationError as e:
+        return value, e.messages
+
+
+def length_bounds(field):
+    """Return the (min, max) length a CharField's validators allow."""
+    minimum = min((validator.limit_value for validator in field.validators if validator.code == "min_length"),
+                  default=1)
+    return max(minimum, 1), field.max_length
+
+
+def validate_result_rows(records, question_max):
+    """
+    Validate the (student_id, gai_score) records of one upload and compute their achievement levels.
+
+    Returns (rows, row_errors). rows holds (student_id, gai_score, achievement_level) tuples with the
+    values StudentResult stores; row_errors is a list of {"row", "student_id", "errors"} with 1-based
+    row numbers, and rows is empty whenever there are errors. As before, achievement levels are only
+    checked once every student ID and score is valid.
+    """
+    records = list(records)
+    if not records:
+        return [], []
+    student_field, score_field, level_field = (result_field(name) for name in
+                                               ("student_id", "gai_score", "achievement_level"))
+
+    # Student IDs: the CharField conversion plus one array comparison against the length bounds
+    student_ids = [value if value is None or isinstance(value, str) else str(value) for value, _ in records]
+    lengths = np.fromiter((-1 if value is None else len(value) for value in student_ids), dtype=np.int64,
+                          count=len(student_ids))
+    minimum, maximum = length_bounds(student_field)
+    bad_ids = (lengths < minimum) | (lengths > maximum)
+
+    # Scores: each distinct value (of each type, so 5 and Decimal("5.00") stay apart) is cleaned once
+    scores = {}
+    score_keys = [(type(value), value) for _, value in records]
+    for key in set(score_keys):
+        scores[key] = field_errors(score_field, key[1])
+    bad_scores = np.fromiter((scores[key][1] is not None for key in score_keys), dtype=bool, count=len(records))
+
+    row_errors = []
+    for index in np.flatnonzero(bad_ids | bad_scores).tolist():
+        errors = {}
+        student_id, messages = field_errors(student_field, records[index][0])
+        if messages:
+            errors["student_id"] = messages
+        gai_score, messages = scores[score_keys[index]]
+        if messages:
+            errors["gai_score"] = messages
+        row_errors.append({"row": index + 1, "student_id": student_id, "errors": errors})
+    if row_errors:
+        return [], row_errors
+
+    gai_scores = [scores[key][0] for key in score_keys]
+
+    # Achievement levels for the whole upload in one pass; only out-of-range levels are cleaned one by one
+    levels = get_achievement_levels([float(gai_score) for gai_score in gai_scores], question_max)
+    limit = 10 ** (level_field.max_digits - level_field.decimal_places)
+    for index in np.flatnonzero(np.abs(levels) >= limit).tolist():
+        level, messages = field_errors(level_field, levels_to_decimals(levels[index:index + 1])[0])
+        if messages:
+            row_errors.append({"row": index + 1, "student_id": student_ids[index],
+                               "errors": {"achievement_level": messages}})
+    if row_errors:
+        return [], row_errors
+
+    return list(zip(student_ids, gai_scores, levels_to_decimals(levels))), []
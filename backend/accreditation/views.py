@@ -4,13 +4,15 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponseRedirect, FileResponse
+from django.http import JsonResponse, HttpResponseRedirect, FileResponse, StreamingHttpResponse
 from django.conf import settings
 from django.urls import reverse
-from django.db.models import Q
+from django.db.models import Max, Q
 import csv
 import io
+import tempfile
 from datetime import datetime
+from itertools import chain
 from django.http import HttpResponse
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
@@ -21,16 +23,18 @@ from .database import *
 from openpyxl.workbook import Workbook
 import json
 from .utils import *
+from .middleware import timing_stats
+from .cache import data_version_condition
+from .snapshot import CSV_NAME, NPZ_NAME, read_meta, snapshot_dir
+from .batch import BatchUploadError, check_batch
 
 # Import models [NEEDS TO BE CHANGED/DELETED]
 from .models import (
-    DataProcess,
-    FacultyCI,
-    ProgramCI,
-    AssessValidity,
-    AccredReport,
-    AnnualReport,
+    Submission,
+    StudentResult,
     Faculty,
+    GAIAchievementSummary,
+    UploadJob,
 )
 
 
@@ -144,36 +148,20 @@ def admin_dashboard_view(request):
     """
     Display the admin dashboard (admin only)
     """
-    # Get all users except the current admin
-    users = User.objects.exclude(id=request.user.id).order_by('username')
-    
-    # For each user, get their last upload date
+    # Get all users except the current admin, with their last upload date in the same query
+    users = (User.objects.exclude(id=request.user.id)
+             .annotate(last_uploaded=Max('faculty__last_uploaded'))
+             .order_by('username'))
     for user in users:
-        try:
-            # Assuming we have a model that tracks uploads with a user foreign key and a date field
-            last_upload = Faculty.objects.filter(user=user).order_by('-last_uploaded').first()
-            if last_upload and last_upload.last_uploaded:
-                user.last_upload = last_upload.last_uploaded.strftime('%Y-%m-%d')
-            else:
-                user.last_upload = None
-        except Exception as e:
-            user.last_upload = None
+        user.last_upload = user.last_uploaded.strftime('%Y-%m-%d') if user.last_uploaded else None
     
-    # Get flattened data from all tables for the database explorer
-    # Call the function to get the actual data
-    database_entries = get_flattened_data()
-    
-    # Take only the first 10 entries for initial display
-    # The rest will be loaded via API pagination
-    display_entries = database_entries[:10] if database_entries else []
+    # Only the first page is rendered; the rest is loaded via API pagination
+    display_entries = get_flattened_page(page=1, page_size=10)['results']
     
     context = {
         'users': users,
         'database_entries': display_entries,
-        'total_courses': len(set(entry.get('course') for entry in database_entries if entry.get('course'))),
-        'total_faculty': len(set(f"{entry.get('instr_first_name')} {entry.get('instr_last_name')}" 
-                             for entry in database_entries 
-                             if entry.get('instr_first_name') and entry.get('instr_last_name'))),
+        **get_dashboard_stats(),
         'activities': [
             {'date': '2023-07-15', 'user': 'johndoe', 'action': 'Uploaded course data'},
             {'date': '2023-07-14', 'user': 'janedoe', 'action': 'Updated faculty records'},
@@ -189,44 +177,10 @@ def csv_upload_view(request):
     """
     if request.method == 'POST' and request.FILES.get('csv_file'):
         uploaded_file = request.FILES['csv_file']
-        file_name = uploaded_file.name.lower()
 
         try:
-            # Convert uploaded file to rows: list of lists
-            if file_name.endswith('.csv'):
-                file_content = uploaded_file.read().decode('utf-8')
-                csvfile = io.StringIO(file_content)
-                rows = list(csv.reader(csvfile))
-
-            elif file_name.endswith('.xlsx'):
-                wb = openpyxl.load_workbook(uploaded_file, data_only=True)
-                sheet = wb.active
-                csv_buffer = io.StringIO()
-                csv_writer = csv.writer(csv_buffer)
-                for row in sheet.iter_rows(values_only=True):
-                    csv_writer.writerow(row)
-                csv_buffer.seek(0)
-                rows = list(csv.reader(csv_buffer))
-
-            else:
-                return JsonResponse({'success': False, 'message': 'Unsupported file type. Please upload a .csv or .xlsx file.'})
-
-            # Extract data starting from row 4 (index 3)
-            extracted_data = []
-
-            for row in rows[3:]:
-                try:
-                    student_id = row[1].strip() if row[1] else None
-                    gai_score_raw = str(row[2]).strip() if row[2] else None
-
-                    if student_id and len(student_id) == 9:
-                        try:
-                            gai_score = int(gai_score_raw)
-                            extracted_data.append((student_id, gai_score))
-                        except ValueError:
-                            continue 
-                except IndexError:
-                    continue  # Skip incomplete rows
+            # Share the streaming parser used by form submissions
+            extracted_data = list(iter_student_records(uploaded_file))
 
             return JsonResponse({
                 'success': True,
@@ -236,6 +190,8 @@ def csv_upload_view(request):
                 'extracted': extracted_data
             })
 
+        except UnsupportedFileType as e:
+            return JsonResponse({'success': False, 'message': str(e)})
         except Exception as e:
             return JsonResponse({'success': False, 'message': f'Error processing file: {str(e)}'})
 
@@ -246,43 +202,49 @@ def download_student_assessment_view(request):
 
     return FileResponse(open(file_path, 'rb'), as_attachment=True, filename='Individual Student Assessment Data.xlsx')
 
+class Echo:
+    """File-like object whose write() hands the value back, so csv.writer can feed a streaming response."""
+    def write(self, value):
+        return value
+
+@login_required
+@user_passes_test(is_admin)
 def export_view(request):
-    # Data fetching logic goes here: (data = ...)
-    data = [
-        [f"val{i + 1}_1" for i in range(25)],  # instance 1
-        [f"val{i + 1}_2" for i in range(25)],  # instance 2
-        [f"val{i + 1}_3" for i in range(25)],  # instance 3
-        [f"val{i + 1}_4" for i in range(25)],  # instance 4
-        [f"val{i + 1}_5" for i in range(25)],  # instance 5
-        [f"val{i + 1}_6" for i in range(25)],  # instance 6
-        [f"val{i + 1}_7" for i in range(25)],  # instance 7
-        [f"val{i + 1}_8" for i in range(25)],  # instance 8
-        [f"val{i + 1}_9" for i in range(25)],  # instance 9
-        [f"val{i + 1}_10" for i in range(25)]  # instance 10
-    ]
-
-    field_names = [
-        "Field 1", "Field 2", "Field 3", "Field 4", "Field 5",
-        "Field 6", "Field 7", "Field 8", "Field 9", "Field 10",
-        "Field 11", "Field 12", "Field 13", "Field 14", "Field 15",
-        "Field 16", "Field 17", "Field 18", "Field 19", "Field 20",
-        "Field 21", "Field 22", "Field 23", "Field 24", "Field 25"
-    ]
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Exported Data"
-    ws.append(field_names)
-
-    for row in data:
+    """
+    Export flattened rows, optionally filtered with the same parameters as the data API.
+    ?format=csv streams the rows as they are read; the default xlsx uses a write-only workbook.
+    """
+    try:
+        filters = parse_filters(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    rows = ([row[field] for field in FLATTENED_FIELDS] for row in iter_flattened_rows(**filters))
+    timestamp = datetime.now().strftime('%Y%m%d')
+
+    if request.GET.get('format') == 'csv':
+        writer = csv.writer(Echo())
+        lines = (writer.writerow(row) for row in chain([FLATTENED_FIELDS], rows))
+        response = StreamingHttpResponse(lines, content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename=export_{timestamp}.csv'
+        return response
+
+    # Write-only workbooks keep rows on disk rather than in memory; the zip
+    # container has to be complete before it can be sent, so spool it to a temp file
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Exported Data")
+    ws.append(FLATTENED_FIELDS)
+    for row in rows:
         ws.append(row)
 
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    output = tempfile.TemporaryFile()
+    wb.save(output)
+    output.seek(0)
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=f'export_{timestamp}.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
     )
-    response['Content-Disposition'] = 'attachment; filename=export.xlsx'
-    wb.save(response)
-    return response
 
 @login_required
 def form_step1_view(request):
@@ -315,7 +277,7 @@ def form_success_view(request):
 @login_required
 def form_submit_view(request):
     """
-    Process the form submission
+    Queue the form submission; poll the returned status_url for the result
     """
     if request.method == 'POST':
         try:
@@ -324,76 +286,22 @@ def form_submit_view(request):
             if 'csv_file' not in request.FILES:
                 return JsonResponse({'success': False, 'message': 'No CSV file uploaded'})
 
-            # Get data as list of tuples from function in utils.py
-            extracted_data, error = read_csv(request.FILES['csv_file'])
-
-            if error:
-                return JsonResponse({'success': False, 'message': error})
-            
-            if not extracted_data:
-                return JsonResponse({'success': False, 'message': 'No valid student data found in uploaded file'})
-
-            program = request.POST.get("program")
-            course = request.POST.get("course")
-            term = request.POST.get("academicTerm")
-            prog_term = int(request.POST.get("programTerm"))
-            instr_first_name = request.POST.get("facultyFirstName1")
-            instr_last_name = request.POST.get("facultyFirstName2")
-            ga = request.POST.get("graduateAttribute")
-            gai = request.POST.get("graduateAttributeIndicator")
-            instr_level = request.POST.get("instructionalLevel")
-            alignment = request.POST.get("assessmentAlignment")
-            clos = request.POST.get("courseLearningOutcomes")
-            assess_type = request.POST.get("assessmentType")
-            assess_weight = float(request.POST.get("courseWeighting"))
-            assess_max = request.POST.get("assessmentMaxScore")
-            total_score = float(request.POST.get("assessmentTotalScore"))
-            question_max = request.POST.get("gaiMaxPoints")
-            assess_title = request.POST.get("assessmentTitle")
-            assess_descript = request.POST.get("assessmentDescription")
-            quest_text = request.POST.get("questionText")
-            instr_comments = request.POST.get("assessmentComments")
-
-            for student_id, gai_score in extracted_data:
-                res = upload_data(
-                    program=program,
-                    course=course,
-                    term=term,
-                    prog_term=prog_term,
-                    instr_first_name=instr_first_name,
-                    instr_last_name=instr_last_name,
-                    ga=ga,
-                    gai=gai,
-                    instr_level=instr_level,
-                    alignment=alignment,
-                    clos=clos,
-                    assess_type=assess_type,
-                    assess_weight=assess_weight,
-                    assess_max=int(assess_max),
-                    total_score=total_score,
-                    question_max=int(question_max),
-                    assess_title=assess_title,
-                    assess_descript=assess_descript,
-                    quest_text=quest_text,
-                    instr_comments=instr_comments,
-                    student_id=student_id,
-                    gai_score=float(gai_score))
-                
-                # if res.get("success") == False:
-                #     print(res.get("message"))
-                #     raise Exception
-            
-            # Change last_updated field
-            faculty = Faculty.objects.get(user=request.user)
-            faculty.last_uploaded = datetime.now()
-            faculty.save()
-            
-            # Return a success
-            print("request: ", request)
+            uploaded_file = request.FILES['csv_file']
+            if not uploaded_file.name.lower().endswith(('.csv', '.xlsx')):
+                return JsonResponse({'success': False,
+                                     'message': 'Unsupported file type. Please upload a .csv or .xlsx file.'})
+
+            form = upload_form(request.POST)
+
+            # Store the file and leave parsing and saving to the process_uploads worker
+            job = UploadJobDAO.enqueue(uploaded_file, form, user=request.user)
+
             return JsonResponse({
                 'success': True,
-                'message': 'Data saved successfully!'
-            })
+                'message': 'Upload received and queued for processing.',
+                'job_id': job.pk,
+                'status_url': reverse('api_upload_job', args=[job.pk]),
+            }, status=202)
         
         except Exception as e:
             import traceback
@@ -406,6 +314,33 @@ def form_submit_view(request):
     # If not POST, redirect to form step 1
     return redirect('form_step1')
 
+@login_required
+def batch_submit_view(request):
+    """
+    Queue a ZIP of assessment spreadsheets; poll the returned status_url for progress and the per-file report.
+    The form fields of each file come from the manifest file, or from manifest.csv/.json inside the ZIP.
+    """
+    if request.method != 'POST':
+        return render(request, 'bcit_accreditation/bcit_accred_batch_upload.html')
+    if 'zip_file' not in request.FILES:
+        return JsonResponse({'success': False, 'message': 'No ZIP file uploaded'}, status=400)
+
+    archive = request.FILES['zip_file']
+    manifest = request.FILES.get('manifest')
+    try:
+        # Only the archive's directory and the manifest are read here; the process_uploads worker does the rest
+        entries = check_batch(archive, manifest=(manifest.name, manifest.read()) if manifest else None)
+    except BatchUploadError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+
+    job = UploadJobDAO.enqueue_batch(archive, entries, user=request.user)
+    return JsonResponse({
+        'success': True,
+        'message': f'Batch of {len(entries)} files received and queued for processing.',
+        'job_id': job.pk,
+        'status_url': reverse('api_upload_job', args=[job.pk]),
+    }, status=202)
+
 # @login_required
 # def analytics_view(request):
 #     """
@@ -422,75 +357,116 @@ def analysis_view(request):
 
 @login_required
 @user_passes_test(is_admin)
+@data_version_condition
 def api_data_view(request, table_name):
-    """API endpoint for fetching paginated data for the admin dashboard"""
-    # Get pagination parameters
-    page = int(request.GET.get('page', 1))
-    page_size = int(request.GET.get('page_size', 10))
+    """
+    API endpoint for fetching paginated data for the admin dashboard.
+    Accepts the filters in FILTER_PARAMS (program, term, course, ga, gai, cohort, assess_type,
+    instructor, created_from, created_to) alongside page, page_size, sort_by, sort_order and after.
+    ?format=columnar returns the page as column arrays (see to_columnar) instead of one object per row;
+    otherwise 'fields' lists the table's columns in display order.
+    """
+    try:
+        # Get pagination parameters
+        page = int(request.GET.get('page', 1))
+        page_size = int(request.GET.get('page_size', 10))
+    except ValueError:
+        return JsonResponse({'error': 'page and page_size must be integers'}, status=400)
     sort_by = request.GET.get('sort_by', 'id')
     sort_order = request.GET.get('sort_order', 'asc')
-    
-    # Calculate offsets for pagination
-    start_idx = (page - 1) * page_size
-    end_idx = start_idx + page_size
-    
+    after = request.GET.get('after')
+    response_format = request.GET.get('format', 'rows')
+    if response_format not in RESPONSE_FORMATS:
+        return JsonResponse({'error': f"format must be one of: {', '.join(RESPONSE_FORMATS)}"}, status=400)
+
+    # table_name selects the columns of one report view; 'all' returns every flattened column
+    fields = TABLE_FIELDS.get(table_name)
+    if fields is None:
+        return JsonResponse({'error': f"Unknown table '{table_name}'. Expected one of: {', '.join(TABLE_FIELDS)}"},
+                            status=404)
+
     try:
-        # Get all data using the flattened data function
-        all_data = get_flattened_data()
-        total_records = len(all_data)
-        
-        # Custom sorting function to handle different data types
-        def get_sort_key(item):
-            value = item.get(sort_by, '')
-            # Handle None values
-            if value is None:
-                return '' if sort_order == 'asc' else 'zzzzzzzzzz'  # Empty string for asc, high value for desc
-            return value
-        
-        # Sort the data
-        all_data = sorted(all_data, key=get_sort_key, reverse=(sort_order == 'desc'))
-        
-        # Paginate the data
-        paginated_data = all_data[start_idx:end_idx]
-        
-        # Calculate pagination details
-        total_pages = (total_records + page_size - 1) // page_size
-        start_record = start_idx + 1 if paginated_data else 0
-        end_record = start_idx + len(paginated_data)
-        
-        # Prepare the response
-        response_data = {
-            'results': paginated_data,
-            'pagination': {
-                'current_page': page,
-                'total_pages': total_pages,
-                'page_size': page_size,
-                'total_records': total_records,
-                'start_record': start_record,
-                'end_record': end_record
-            }
-        }
-        
-        return JsonResponse(response_data)
-    
+        # Filtering, sorting and slicing happen in the database; only one page is hydrated
+        data = get_flattened_page(page=page, page_size=page_size, sort_by=sort_by, sort_order=sort_order,
+                                  after=after, filters=parse_filters(request.GET), fields=fields)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
+    paginated_data = data['results']
+    total_records = data['total_records']
+    page_size = data['page_size']
+    start_idx = data['offset']
+
+    # Calculate pagination details
+    total_pages = (total_records + page_size - 1) // page_size
+    start_record = start_idx + 1 if paginated_data else 0
+    end_record = start_idx + len(paginated_data)
+
+    # Prepare the response
+    if response_format == 'columnar':
+        response_data = {'format': 'columnar', 'row_count': len(paginated_data),
+                         **to_columnar(paginated_data, fields)}
+    else:
+        response_data = {'fields': fields, 'results': paginated_data}
+    response_data.update({
+        'pagination': {
+            'current_page': data['page'],
+            'total_pages': total_pages,
+            'page_size': page_size,
+            'total_records': total_records,
+            'start_record': start_record,
+            'end_record': end_record,
+            'next_cursor': data['next_cursor'],
+        }
+    })
+
+    return JsonResponse(response_data)
+
+@login_required
+@user_passes_test(is_admin)
+@data_version_condition
+def api_changes_view(request, table_name):
+    """
+    Change feed for the admin explorer and BI extracts: rows created or changed, and ids deleted,
+    since the `since` watermark of a previous response (omit it for a full load). Follow
+    next_cursor with ?cursor= until it is null, then keep the returned watermark.
+    ?format=columnar returns the changed rows as column arrays, as api_data_view does.
+    """
+    fields = TABLE_FIELDS.get(table_name)
+    if fields is None:
+        return JsonResponse({'error': f"Unknown table '{table_name}'. Expected one of: {', '.join(TABLE_FIELDS)}"},
+                            status=404)
+    response_format = request.GET.get('format', 'rows')
+    if response_format not in RESPONSE_FORMATS:
+        return JsonResponse({'error': f"format must be one of: {', '.join(RESPONSE_FORMATS)}"}, status=400)
+
+    try:
+        data = get_changes(since=request.GET.get('since'), cursor=request.GET.get('cursor'),
+                           page_size=request.GET.get('page_size', 1000), fields=fields)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    if response_format == 'columnar':
+        rows = data.pop('rows')
+        data.update(format='columnar', row_count=len(rows), **to_columnar(rows, fields))
+    return JsonResponse(data)
+
 @login_required
 @user_passes_test(is_admin)
+@data_version_condition
 def student_search_api(request):
-    """API endpoint for searching student data by ID"""
-    student_id = request.GET.get('student_id', '')
+    """API endpoint for searching student data by ID (?match=prefix for partial IDs)"""
+    student_id = request.GET.get('student_id', '').strip()
+    prefix = request.GET.get('match') == 'prefix'
     
     if not student_id:
         return JsonResponse({'error': 'Student ID is required'}, status=400)
     
     try:
-        # Get all data using the flattened data function
-        all_data = get_flattened_data()
-        
-        # Filter data by student ID
-        results = [entry for entry in all_data if entry.get('student_id') == student_id]
+        # Look up matching rows through the student_id index
+        results = find_student_rows(student_id, prefix=prefix)
         
         # Prepare the response
         response_data = {
@@ -501,3 +477,83 @@ def student_search_api(request):
     
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
+
+@login_required
+@user_passes_test(is_admin)
+@data_version_condition
+def student_profile_api(request, student_id):
+    """API endpoint for one student's GA/GAI achievement by term (count, mean and latest level per GAI)"""
+    profile = get_student_profile(student_id.strip())
+    if profile is None:
+        return JsonResponse({'error': 'No results found for this student'}, status=404)
+    return JsonResponse(profile)
+
+@login_required
+@data_version_condition
+def achievement_summary_api(request):
+    """API endpoint for GA/GAI achievement statistics, optionally filtered by program, term, ga and gai"""
+    filters = {key: request.GET[key] for key in ('program', 'term', 'ga', 'gai') if request.GET.get(key)}
+
+    results = get_achievement_summaries(**filters)
+
+    return JsonResponse({'results': results})
+
+@login_required
+def upload_job_api(request, job_id):
+    """API endpoint reporting the progress and outcome of a queued upload"""
+    job = UploadJobDAO.get(job_id)
+    if job is None or (job.user_id != request.user.id and not is_admin(request.user)):
+        return JsonResponse({'error': 'Upload job not found'}, status=404)
+
+    return JsonResponse({
+        'job_id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'done': job.status in (UploadJob.SUCCEEDED, UploadJob.FAILED),
+        'success': job.status == UploadJob.SUCCEEDED,
+        'file_name': job.file_name,
+        'total_rows': job.total_rows,
+        'processed_rows': job.processed_rows,
+        'inserted_rows': job.inserted_rows,
+        'message': job.message,
+        'form_errors': job.form_errors,
+        'row_errors': job.row_errors,
+        'report': job.report,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'heartbeat_at': job.heartbeat_at,
+        'finished_at': job.finished_at,
+    })
+
+@login_required
+@user_passes_test(is_admin)
+def analytics_snapshot_api(request):
+    """Download the columnar analytics snapshot (?format=npz, the default, or ?format=csv for .csv.gz)"""
+    file_format = request.GET.get('format', 'npz')
+    if file_format not in ('npz', 'csv'):
+        return JsonResponse({'error': 'format must be npz or csv'}, status=400)
+
+    # Serve the snapshot as last built; process_uploads and build_analytics_snapshot keep it current
+    meta = read_meta()
+    name = NPZ_NAME if file_format == 'npz' else CSV_NAME
+    try:
+        snapshot_file = open(snapshot_dir() / name, 'rb') if meta else None
+    except FileNotFoundError:
+        snapshot_file = None
+    if snapshot_file is None:
+        return JsonResponse({'error': 'No analytics snapshot has been built yet; '
+                                      'run manage.py build_analytics_snapshot'}, status=404)
+    response = FileResponse(snapshot_file, as_attachment=True, filename=name)
+    response['X-Snapshot-Version'] = meta['version']
+    response['X-Snapshot-Rows'] = meta['rows']
+    response['X-Snapshot-Built-At'] = meta['built_at']
+    return response
+
+@staff_member_required
+def request_timing_api(request):
+    """API endpoint for rolling p50/p95/p99 request times per URL name (this worker process only)"""
+    return JsonResponse({
+        'enabled': settings.REQUEST_TIMING_ENABLED,
+        'window': timing_stats.window,
+        'results': timing_stats.summary(),
+    })
@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from pathlib import Path
 
+from .db_profiles import database_settings
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,14 +45,23 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Compresses responses (Brotli for JSON/CSV when available, else gzip); keep above body-editing middleware
+    'accreditation.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'accreditation.middleware.RequestTimingMiddleware',
 ]
 
+# Per-request timing (Server-Timing headers, slow-request log, /api/request-timing/).
+# Off by default; the middleware removes itself when disabled.
+REQUEST_TIMING_ENABLED = os.environ.get('REQUEST_TIMING_ENABLED', '') == '1'
+SLOW_REQUEST_MS = 500
+REQUEST_TIMING_WINDOW = 1000
+
 ROOT_URLCONF = 'bcit_accreditation.urls'
 
 TEMPLATES = [
@@ -79,16 +90,30 @@ WSGI_APPLICATION = 'bcit_accreditation.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+# Selected with ACCREDITATION_DB_PROFILE: 'postgres' (default, persistent health-checked connections)
+# or 'sqlite' (local WAL database for development, benchmarks and CI). See db_profiles.py.
+DATABASES = database_settings(BASE_DIR)
+
+
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# "results" holds versioned read results (see accreditation/cache.py). Entries are keyed by a data
+# version stored in the database, so per-process locmem caches stay correct under several workers.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'accreditation_db',
-        'USER': 'basic_user',
-        'PASSWORD': 'proj1047', # hide with .env file later
-        'HOST': 'localhost',    # change to server IP
-        'PORT': '1047'
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'results': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'accreditation-results',
+        'OPTIONS': {
+            'MAX_ENTRIES': 500,
+            'CULL_FREQUENCY': 4,
+        },
+    },
 }
+RESULT_CACHE_TIMEOUT = 300
 
 
 # Password validation
@@ -135,6 +160,13 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Columnar analytics snapshot (accreditation/snapshot.py), refreshed by the upload worker
+ANALYTICS_SNAPSHOT_DIR = os.path.join(BASE_DIR, 'snapshots')
+ANALYTICS_SNAPSHOT_AUTO_REFRESH = True
+
+# Processes parsing the spreadsheets of a ZIP batch upload (accreditation/batch.py); None uses every CPU
+BATCH_UPLOAD_WORKERS = int(os.environ['BATCH_UPLOAD_WORKERS']) if os.environ.get('BATCH_UPLOAD_WORKERS') else None
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 